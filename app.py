@@ -1,6 +1,4 @@
 import streamlit as st
-import time
-from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -8,28 +6,22 @@ load_dotenv()
 
 # Import core modules
 from core import (
-    ASSISTANT_SYSTEM_PROMPT,
-    compose_chat_prompt,
     get_suggested_prompts,
-    should_refuse,
-    redact_pi,
-    medical_disclaimer,
-    retrieve_documents,
     is_rag_available,
     get_rag_stats,
-    web_search,
     is_search_available,
-    reformulate_query_for_search,
     is_voice_available,
-    add_to_listening_mode,
-    log_turn,
     get_session_metrics,
     check_token_limit,
-    should_allow_streaming,
     get_token_usage_summary,
-    MAX_TOKENS_PER_SESSION
+    get_admission_metrics,
+    get_chat_pipeline,
+    ChatSession,
+    start_warmup,
+    get_warmup_state
 )
-from core.llm import stream_chat_to_streamlit
+from core.llm import CancellationToken
+from components.chat_sink import StreamlitChatSink
 from components.voice_input import simple_voice_button
 from components.listening_mode import listening_mode_sidebar, listening_mode_panel
 
@@ -54,6 +46,7 @@ def initialize_session_state():
         st.session_state.settings = {
             "model": "gpt-4o-mini",
             "temperature": 0.7,
+            "auto_route": True,
         "search_on": False,
         "rag_on": False,
         "voice_on": False
@@ -70,6 +63,40 @@ def initialize_session_state():
 
 initialize_session_state()
 
+# Opt-in (WARMUP_ON_START): load models and open connections in the background
+start_warmup()
+
+def feature_status(available: bool, component: str, unavailable: str) -> str:
+    """Sidebar status label for a feature, reflecting background warm-up."""
+    if not available:
+        return unavailable
+    state = get_warmup_state(component)
+    if state == "warming":
+        return "⏳ Warming up"
+    if state == "ready":
+        return "✅ Ready"
+    return "✅ Available"
+
+def record_abandoned_generation():
+    """
+    Log a turn whose generation was abandoned mid-stream by a new action
+    (new message or Clear Chat) in the previous run, with the tokens saved.
+    """
+    token = st.session_state.get("generation_token")
+    st.session_state.generation_token = None
+    if token is None:
+        return
+    
+    token.cancel("new_action")
+    session = ChatSession(
+        messages=st.session_state.messages,
+        settings=st.session_state.settings,
+        metrics=st.session_state.metrics
+    )
+    get_chat_pipeline().record_cancelled(session, token)
+
+record_abandoned_generation()
+
 # Disclaimer Banner
 st.markdown("""
 <div style="background-color: #FFF3CD; padding: 15px; border-radius: 5px; border-left: 5px solid #FFC107; margin-bottom: 20px;">
@@ -98,6 +125,13 @@ with st.sidebar:
         index=model_options.index(st.session_state.settings["model"])
     )
     
+    # Per-turn model routing (selected model is the default when no rule matches)
+    st.session_state.settings["auto_route"] = st.toggle(
+        "Auto-select model per question",
+        value=st.session_state.settings.get("auto_route", True),
+        help="Route simple questions to a faster, cheaper model and fall back to another model on errors"
+    )
+    
     # Temperature slider
     st.session_state.settings["temperature"] = st.slider(
         "Temperature",
@@ -113,7 +147,7 @@ with st.sidebar:
     # Feature toggles
     st.subheader("Features")
     search_available = is_search_available()
-    search_status = "✅ Available" if search_available else "❌ Not configured"
+    search_status = feature_status(search_available, "search", "❌ Not configured")
     
     st.session_state.settings["search_on"] = st.toggle(
         f"Use Google Search in answers - {search_status}",
@@ -123,7 +157,7 @@ with st.sidebar:
     )
     
     rag_available = is_rag_available()
-    rag_status = "✅ Available" if rag_available else "❌ Not available"
+    rag_status = feature_status(rag_available, "rag", "❌ Not available")
     
     st.session_state.settings["rag_on"] = st.toggle(
         f"Use RAG (vector store) - {rag_status}",
@@ -134,7 +168,7 @@ with st.sidebar:
     
     # Voice input toggle
     voice_available = is_voice_available()
-    voice_status = "✅ Available" if voice_available else "❌ Not configured"
+    voice_status = feature_status(voice_available, "voice", "❌ Not configured")
     
     st.session_state.settings["voice_on"] = st.toggle(
         f"Enable Voice Input - {voice_status}",
@@ -191,6 +225,17 @@ with st.sidebar:
         with col3:
             st.metric("Total", f"{session_metrics['total_tokens']:,}")
         
+        # Rate-limit queue (process-wide)
+        admission = get_admission_metrics()
+        st.markdown("**Request Queue:**")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Queued Now", admission["total_queued_now"])
+        with col2:
+            st.metric("Avg Wait", f"{admission['avg_wait']:.2f}s")
+        with col3:
+            st.metric("p95 Wait", f"{admission['p95_wait']:.2f}s")
+        
         # Feature usage
         st.markdown("**Feature Usage:**")
         col1, col2, col3 = st.columns(3)
@@ -324,161 +369,22 @@ else:
     user_input = st.chat_input(chat_placeholder)
 
 if user_input:
-    # Check for PI and redact if necessary
-    original_input = user_input
-    user_input = redact_pi(user_input)
-    
-    # Add user message to chat
-    st.session_state.messages.append({
-        "role": "user",
-        "content": user_input,
-        "meta": {
-            "timestamp": datetime.now().isoformat(),
-            "settings": st.session_state.settings.copy(),
-            "redacted": original_input != user_input
-        }
-    })
-    
-    # Display user message
-    with st.chat_message("user"):
-        st.markdown(user_input)
-    
-    # Safety check
-    should_refuse_request, refusal_message = should_refuse(user_input)
-    
-    # Generate assistant response
-    with st.chat_message("assistant"):
-        message_placeholder = st.empty()
-        
-        if should_refuse_request:
-            # Show refusal message (no API call needed)
-            response = refusal_message
-            message_placeholder.markdown(response)
-            
-            # Add medical disclaimer
-            st.markdown("---")
-            st.info(medical_disclaimer())
-            
-            # Minimal metrics for refusal
-            token_in = len(user_input) // 4
-            token_out = len(response) // 4
-            cost = 0.0  # No API cost for refusals
-            latency = 0.0
-            
-        else:
-            # Check token limit before processing
-            limit_status = check_token_limit()
-            
-            if limit_status["exceeded"]:
-                # Token limit exceeded - show gentle nudge
-                response = (
-                    f"⚠️ **Session token limit reached ({MAX_TOKENS_PER_SESSION:,} tokens).**\n\n"
-                    f"You've reached the session token limit to help maintain optimal performance "
-                    f"and cost efficiency. Please clear your chat history to continue.\n\n"
-                    f"Click the **🗑️ Clear Chat** button in the sidebar to start fresh."
-                )
-                message_placeholder.markdown(response)
-                
-                # Minimal metrics
-                token_in = len(user_input) // 4
-                token_out = len(response) // 4
-                cost = 0.0
-                latency = 0.0
-                retrieved_docs = []
-                web_results = []
-                citations = []
-                
-            else:
-                # Retrieve RAG context if enabled
-                retrieved_docs = []
-                if st.session_state.settings["rag_on"] and is_rag_available():
-                    try:
-                        retrieved_docs = retrieve_documents(user_input, k=5)
-                    except Exception as e:
-                        st.warning(f"RAG retrieval failed: {e}")
-                        retrieved_docs = []
-                
-                # Perform web search if enabled
-                web_results = []
-                if st.session_state.settings["search_on"] and is_search_available():
-                    try:
-                        # Reformulate query for better search results
-                        search_query = reformulate_query_for_search(user_input)
-                        web_results = web_search(search_query, k=3)
-                    except Exception as e:
-                        st.warning(f"Web search failed: {e}")
-                        web_results = []
-                
-                # Build messages for OpenAI API
-                messages, citations = compose_chat_prompt(
-                    history=st.session_state.messages[:-1],  # Exclude current user message
-                    user_input=user_input,
-                    retrieved=retrieved_docs if st.session_state.settings["rag_on"] else None,
-                    web_results=web_results if st.session_state.settings["search_on"] else None,
-                    settings=st.session_state.settings
-                )
-                
-                # Stream response from LLM
-                response, metadata = stream_chat_to_streamlit(
-                    messages=messages,
-                    placeholder=message_placeholder,
-                    model=st.session_state.settings["model"],
-                    temperature=st.session_state.settings["temperature"]
-                )
-            
-            # Extract metrics from metadata
-            token_in = metadata.get("tokens_in", 0)
-            token_out = metadata.get("tokens_out", 0)
-            cost = metadata.get("cost", 0.0)
-            latency = metadata.get("latency", 0.0)
-            
-            # Display citations if RAG was used
-            if citations and st.session_state.settings["rag_on"]:
-                st.markdown("---")
-                st.markdown("### 📚 Sources")
-                for citation in citations:
-                    if citation['type'] == 'knowledge_base':
-                        st.markdown(f"**{citation['source']}** - {citation['title']}")
-                    else:
-                        st.markdown(f"**{citation['source']}** - {citation.get('url', 'Web source')}")
-        
-        # Update metrics
-        st.session_state.metrics["token_in"] += token_in
-        st.session_state.metrics["token_out"] += token_out
-        st.session_state.metrics["cost"] += cost
-        st.session_state.metrics["latency"] = latency
-    
-    # Add assistant message to chat
-    meta = {
-        "timestamp": time.time(),
-        "model": st.session_state.settings["model"],
-        "temperature": st.session_state.settings["temperature"],
-        "token_in": token_in,
-        "token_out": token_out,
-        "cost": cost,
-        "latency": latency,
-        "search_used": st.session_state.settings["search_on"],
-        "rag_used": st.session_state.settings["rag_on"],
-        "rag_docs_retrieved": len(retrieved_docs) if 'retrieved_docs' in locals() else 0,
-        "search_results": len(web_results) if 'web_results' in locals() else 0,
-        "citations": citations if 'citations' in locals() else [],
-        "refused": should_refuse_request,
-        "voice_used": st.session_state.settings.get("voice_on", False),
-        "listening_mode": st.session_state.get("listening_mode_enabled", False),
-    }
-    
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": response,
-        "meta": meta
-    })
-    
-    # Log turn to JSON lines
-    log_turn(meta)
+    session = ChatSession(
+        messages=st.session_state.messages,
+        settings=st.session_state.settings,
+        metrics=st.session_state.metrics,
+        listening_mode=st.session_state.get("listening_mode_enabled", False)
+    )
     
-    # Add to listening mode if enabled
-    if st.session_state.get("listening_mode_enabled", False):
-        add_to_listening_mode(user_input)
+    # The token lets the next action in this session stop the generation
+    st.session_state.generation_token = CancellationToken()
+    get_chat_pipeline().run(
+        user_input,
+        session,
+        sink=StreamlitChatSink(),
+        cancel_token=st.session_state.generation_token
+    )
+    st.session_state.generation_token = None
     
     st.rerun()
 
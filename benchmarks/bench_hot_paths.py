@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for WellNavigator's hot paths.
+Times each function on realistic synthetic inputs (long messages, 1k+ message
+histories) and compares against the stored baseline.
+
+Usage:
+    python benchmarks/bench_hot_paths.py                 # compare to baseline.json
+    python benchmarks/bench_hot_paths.py --save          # record a new baseline
+    python benchmarks/bench_hot_paths.py --filter redact --threshold 0.10
+
+Exits with status 1 if any benchmark is slower than baseline by more than the
+threshold. Baselines are machine-specific: record them on the machine that runs
+the comparison.
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import random
+import itertools
+import platform
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Time the safety checks themselves; the decision cache has its own benchmarks
+os.environ["SAFETY_CACHE_SIZE"] = "0"
+
+from core.safety import should_refuse, redact_pi
+from core.keywords import KeywordAutomaton
+from core.text_analysis import analyze_text
+from core.search import reformulate_query_for_search
+from core.output_guard import OutputGuard
+from core.prompts import compose_chat_prompt
+from core.observe import SessionObserver
+from core.llm import count_message_tokens
+
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+REGRESSION_THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.25"))  # 25% slower
+MIN_BATCH_SECONDS = 0.05
+REPEATS = 7
+
+
+class SkipBenchmark(Exception):
+    """Raised by a benchmark's setup when its dependencies are unavailable."""
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+_rng = random.Random(1234)
+
+HEALTH_SENTENCES = [
+    "I have been trying to keep my blood pressure under control with more walking.",
+    "My last checkup showed slightly elevated cholesterol and my doctor suggested diet changes.",
+    "I want to understand what my lab results mean before my next appointment.",
+    "Sleep has been difficult lately and I wake up tired most mornings.",
+    "My insurance sent an explanation of benefits that I find confusing.",
+    "I am preparing a list of questions for the specialist my doctor referred me to.",
+    "We have a family history of type 2 diabetes so I try to eat fewer refined carbs.",
+    "The pharmacy said my prescription refill needs a new authorization.",
+]
+
+PI_SNIPPETS = [
+    "you can reach me at jane.doe{n}@example.com",
+    "my number is (555) 01{n:02d}-4321",
+    "SSN 123-45-{n:04d}",
+    "card 4111 1111 1111 {n:04d}",
+]
+
+
+def make_message(n_chars: int, pi_every: int = 0) -> str:
+    """A long, benign user message (optionally with PI sprinkled in)."""
+    parts, length, i = [], 0, 0
+    while length < n_chars:
+        sentence = _rng.choice(HEALTH_SENTENCES)
+        if pi_every and i % pi_every == 0:
+            sentence += " " + _rng.choice(PI_SNIPPETS).format(n=i % 100)
+        parts.append(sentence)
+        length += len(sentence) + 1
+        i += 1
+    return " ".join(parts)[:n_chars]
+
+
+def make_history(n_messages: int) -> List[Dict[str, Any]]:
+    """Alternating user/assistant messages with app-style meta."""
+    history = []
+    for i in range(n_messages):
+        if i % 2 == 0:
+            history.append({"role": "user", "content": make_message(200), "meta": {"redacted": False}})
+        else:
+            history.append({
+                "role": "assistant",
+                "content": make_message(900),
+                "meta": {
+                    "latency": _rng.uniform(0.5, 4.0),
+                    "token_in": _rng.randint(300, 3000),
+                    "token_out": _rng.randint(100, 600),
+                    "rag_used": i % 3 == 0,
+                    "search_used": i % 5 == 0,
+                    "refused": i % 17 == 0,
+                },
+            })
+    return history
+
+
+RETRIEVED = [
+    {"text": make_message(600), "source": source, "title": f"{source} overview", "score": 0.8 - i * 0.05}
+    for i, source in enumerate(["Diabetes", "Hypertension", "Test Results", "Doctor Visit Prep", "Insurance Navigation"])
+]
+WEB_RESULTS = [
+    {"title": f"Result {i}", "snippet": make_message(250), "url": f"https://medlineplus.gov/{i}", "source": "MedlinePlus"}
+    for i in range(3)
+]
+
+
+def make_logs_dir() -> Path:
+    """Temporary logs directory, removed when the run ends."""
+    logs_dir = Path(tempfile.mkdtemp(prefix="wn-bench-"))
+    atexit.register(shutil.rmtree, logs_dir, ignore_errors=True)
+    return logs_dir
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks: each setup returns the zero-argument callable to time
+# ---------------------------------------------------------------------------
+
+def bench_should_refuse_short():
+    text = "What are the early symptoms of type 2 diabetes?"
+    return lambda: should_refuse(text)
+
+
+def bench_should_refuse_long():
+    text = make_message(10_000)
+    return lambda: should_refuse(text)
+
+
+def bench_safety_cache_hit():
+    # Repeated message (suggested prompt, retry): normalize, hash, LRU lookup
+    from core import safety
+    # The caches were sized from SAFETY_CACHE_SIZE=0 above; give them room
+    safety._refusal_cache.max_entries = safety._redaction_cache.max_entries = 1024
+    text = make_message(2_000, pi_every=5)
+    def hit():
+        safety._cached_refusal_category(text)
+        safety._cached_redaction(text)
+    hit()
+    return hit
+
+
+def bench_text_analysis_turn():
+    # Per-turn keyword work: one scan shared by safety, search and listening mode
+    text = make_message(2_000)
+    def turn():
+        analysis = analyze_text(text)
+        should_refuse(text, analysis)
+        reformulate_query_for_search(text, analysis=analysis)
+        analysis.categories("coach")
+    return turn
+
+
+def bench_keyword_automaton_5k():
+    # The clinical safety team's lists run to thousands of keywords
+    words = [w.strip(".,").lower() for w in " ".join(HEALTH_SENTENCES).split()]
+    keywords = {" ".join(_rng.sample(words, 3)) for _ in range(5_000)}
+    automaton = KeywordAutomaton([("synthetic", sorted(keywords))])
+    text = make_message(10_000)
+    return lambda: automaton.find_all(text)
+
+
+def bench_output_guard_per_token():
+    # One streamed token through the output guard (the per-token overhead)
+    guard = OutputGuard(mode="annotate")
+    tokens = itertools.cycle(make_message(4_000).split(" "))
+    return lambda: guard.feed(next(tokens) + " ")
+
+
+def bench_redact_pi_short():
+    text = "Hi, I'm Jane, email jane.doe@example.com, phone (555) 012-3456. What does an A1C test measure?"
+    return lambda: redact_pi(text)
+
+
+def bench_redact_pi_long():
+    text = make_message(20_000, pi_every=5)
+    return lambda: redact_pi(text)
+
+
+def bench_split_large_section():
+    try:
+        import ingest
+    except SystemExit:
+        raise SkipBenchmark("ingest.py dependencies (faiss, sentence-transformers) not installed")
+    content = "\n\n".join(make_message(700) for _ in range(70))  # ~50k characters
+    # _split_large_section doesn't use instance state; skip loading the embedder
+    ingester = ingest.DocumentIngester.__new__(ingest.DocumentIngester)
+    return lambda: ingester._split_large_section(content, "Section", "Benchmark")
+
+
+def bench_retrieve_with_text():
+    from core.rag import RAGRetriever, _backends_installed
+    if not _backends_installed():
+        raise SkipBenchmark("faiss / sentence-transformers not installed")
+    retriever = RAGRetriever(str(ROOT / "data" / "index"))
+    if not retriever.load_index():
+        raise SkipBenchmark("RAG index not built (run python ingest.py)")
+    return lambda: retriever.retrieve_with_text("How can I lower my blood pressure?", k=5)
+
+
+def bench_semantic_safety():
+    import core.semantic_safety as semantic_safety
+    from core.rag import get_retriever
+    encoder = get_retriever().get_embedder()
+    if encoder is None:
+        raise SkipBenchmark("sentence-transformers not installed")
+    classifier = semantic_safety.SemanticSafetyClassifier(cache_path=make_logs_dir() / "exemplars.npz")
+    classifier.prepare(encoder, get_retriever().embedding_model_name())
+    return lambda: classifier.classify("My chest feels tight when I climb stairs lately", encoder)
+
+
+def bench_compose_chat_prompt_1k():
+    history = make_history(1_000)
+    return lambda: compose_chat_prompt(history, "What should I ask my doctor?", RETRIEVED, WEB_RESULTS)
+
+
+def bench_compose_chat_prompt_5k():
+    history = make_history(5_000)
+    return lambda: compose_chat_prompt(history, "What should I ask my doctor?", RETRIEVED, WEB_RESULTS)
+
+
+def bench_count_message_tokens_1k():
+    messages = [{"role": m["role"], "content": m["content"]} for m in make_history(1_000)]
+    return lambda: count_message_tokens(messages, "gpt-4o-mini")
+
+
+def bench_log_turn():
+    observer = SessionObserver(logs_dir=make_logs_dir())
+    meta = {
+        "timestamp": time.time(), "model": "gpt-4o-mini", "temperature": 0.7,
+        "token_in": 1200, "token_out": 350, "cost": 0.0004, "latency": 2.1, "queue_wait": 0.0,
+        "routing_rule": "short_question", "requested_model": "gpt-4o-mini",
+        "routing_features": {"prompt_tokens": 1200, "history_length": 6, "has_rag": True},
+        "context_timings": {"rag": 0.12, "search": 0.4}, "context_timed_out": [],
+        "rag_used": True, "search_used": True, "citations": RETRIEVED[:3],
+        "stage_timings": {"redact": 0.0001, "safety": 0.0002, "generate": 2.0},
+    }
+    return lambda: observer.log_turn(meta)
+
+
+def bench_get_session_metrics_2k():
+    observer = SessionObserver(logs_dir=make_logs_dir())
+    messages = make_history(2_000)
+    metrics = {"token_in": 500_000, "token_out": 120_000, "cost": 1.2, "latency": 1.0}
+    return lambda: observer.get_session_metrics(messages, metrics)
+
+
+BENCHMARKS: List[Tuple[str, Callable[[], Callable[[], Any]]]] = [
+    ("should_refuse.short", bench_should_refuse_short),
+    ("should_refuse.long_10k", bench_should_refuse_long),
+    ("safety_cache.hit_2k", bench_safety_cache_hit),
+    ("text_analysis.turn_2k", bench_text_analysis_turn),
+    ("keyword_automaton.5k_keywords_10k", bench_keyword_automaton_5k),
+    ("output_guard.per_token", bench_output_guard_per_token),
+    ("redact_pi.short", bench_redact_pi_short),
+    ("redact_pi.long_20k", bench_redact_pi_long),
+    ("ingest._split_large_section.50k", bench_split_large_section),
+    ("rag.retrieve_with_text", bench_retrieve_with_text),
+    ("semantic_safety.classify", bench_semantic_safety),
+    ("compose_chat_prompt.history_1k", bench_compose_chat_prompt_1k),
+    ("compose_chat_prompt.history_5k", bench_compose_chat_prompt_5k),
+    ("count_message_tokens.history_1k", bench_count_message_tokens_1k),
+    ("observe.log_turn", bench_log_turn),
+    ("observe.get_session_metrics.2k", bench_get_session_metrics_2k),
+]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def measure(fn: Callable[[], Any], repeats: int = REPEATS) -> Dict[str, float]:
+    """
+    Time a callable: calibrate a batch size, then time several batches.
+
+    Returns:
+        Dictionary with per-call 'min_us' and 'median_us' and the batch size
+    """
+    fn()  # Warm-up (caches, lazy imports)
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_BATCH_SECONDS:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(MIN_BATCH_SECONDS / elapsed) + 1)
+
+    per_call = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number * 1e6)
+
+    return {"min_us": min(per_call), "median_us": statistics.median(per_call), "number": number}
+
+
+def run(filter_text: Optional[str] = None) -> Tuple[Dict[str, Dict[str, float]], Dict[str, str]]:
+    """Run the (filtered) benchmarks; returns (results, skipped reasons)."""
+    results, skipped = {}, {}
+    for name, setup in BENCHMARKS:
+        if filter_text and filter_text not in name:
+            continue
+        try:
+            fn = setup()
+        except SkipBenchmark as e:
+            skipped[name] = str(e)
+            continue
+        results[name] = measure(fn)
+    return results, skipped
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print the comparison table; returns names of regressed benchmarks."""
+    regressions = []
+    print(f"\n{'benchmark':<36} {'per call':>12} {'baseline':>12} {'change':>9}")
+    for name, result in results.items():
+        current = result["min_us"]
+        base = baseline.get("results", {}).get(name, {}).get("min_us")
+        if base is None:
+            print(f"{name:<36} {_fmt_us(current):>12} {'-':>12} {'new':>9}")
+            continue
+        change = (current - base) / base
+        status = ""
+        if change > threshold:
+            status = "  ❌ regression"
+            regressions.append(name)
+        elif change < -threshold:
+            status = "  ✅ faster"
+        print(f"{name:<36} {_fmt_us(current):>12} {_fmt_us(base):>12} {change * 100:>+8.1f}%{status}")
+    return regressions
+
+
+def _fmt_us(us: float) -> str:
+    if us >= 1000:
+        return f"{us / 1000:.2f} ms"
+    return f"{us:.1f} µs"
+
+
+def main():
+    """Parse arguments, run benchmarks and compare or save."""
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks")
+    parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this")
+    args = parser.parse_args()
+
+    print("🚀 Running hot-path benchmarks...")
+    results, skipped = run(args.filter)
+    for name, reason in skipped.items():
+        print(f"  ⏭️ {name}: {reason}")
+
+    if args.save:
+        baseline = {}
+        if args.baseline.exists() and args.filter:
+            baseline = json.loads(args.baseline.read_text())  # Keep unfiltered entries
+        baseline.setdefault("results", {}).update(results)
+        baseline["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                               "processor": platform.processor() or platform.machine()}
+        baseline["recorded_at"] = time.strftime("%Y-%m-%d")
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        compare(results, {}, args.threshold)
+        print(f"\n💾 Baseline saved to: {args.baseline}")
+        return
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if not baseline:
+        print("⚠️ No baseline found; run with --save to record one")
+    regressions = compare(results, baseline, args.threshold)
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
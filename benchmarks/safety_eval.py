@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Accuracy and speed of WellNavigator's safety rules on a labeled corpus.
+Scores the refusal classifier and PI redaction against safety_corpus.jsonl and
+reports precision, recall and messages per second per category, so a keyword
+or pattern edit can be judged on both.
+
+Usage:
+    python benchmarks/safety_eval.py                   # compare to safety_eval.json
+    python benchmarks/safety_eval.py --save            # record new reference results
+    python benchmarks/safety_eval.py --processes 4 --repeat 200
+    python benchmarks/safety_eval.py --semantic --save # also calibrate the embedding check
+
+Corpus lines:
+    {"id": "s001", "text": "I'm having chest pain", "category": "emergency", "pi": []}
+    ("category" is a REFUSAL_TEMPLATES key or null; "pi" lists PI_PATTERNS types)
+
+Throughput is measured on the corpus repeated --repeat times through the batch
+APIs (should_refuse_batch, redact_pi_batch); per-category msgs/s is timed
+message by message in this process.
+
+--semantic scores the embedding check (core/semantic_safety.py) with the real
+RAG encoder at a sweep of thresholds: each message is refused if the keyword
+pass or the embedding check flags it, so the numbers show what switching
+SEMANTIC_SAFETY_ACTION to refuse would do at each threshold.
+"""
+
+import sys
+import json
+import time
+import argparse
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from core.safety import (
+    get_refusal_category,
+    redact_pi_with_audit,
+    should_refuse_batch,
+    redact_pi_batch,
+    REFUSAL_CATEGORY_KEYWORDS,
+    PI_PATTERNS,
+)
+
+
+CORPUS_PATH = Path(__file__).parent / "safety_corpus.jsonl"
+RESULTS_PATH = Path(__file__).parent / "safety_eval.json"
+ALLOWED = "allowed"  # Label for messages that should not be refused
+SEMANTIC_THRESHOLDS = [0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9]  # Cosine, for --semantic
+
+
+def load_corpus(path: Path) -> List[Dict[str, Any]]:
+    """Read the labeled corpus (one JSON object per line)."""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                items.append(json.loads(line))
+    return items
+
+
+def _scores(tp: int, fp: int, fn: int) -> Dict[str, Any]:
+    precision = tp / (tp + fp) if tp + fp else None
+    recall = tp / (tp + fn) if tp + fn else None
+    return {"tp": tp, "fp": fp, "fn": fn, "precision": precision, "recall": recall}
+
+
+def _refuse_counts(items: List[Dict[str, Any]], predictions: List[Optional[str]]) -> List[int]:
+    """tp/fp/fn of refuse vs allow, regardless of which template."""
+    counts = [0, 0, 0]
+    for item, predicted in zip(items, predictions):
+        gold_refuse, predicted_refuse = bool(item.get("category")), predicted is not None
+        if gold_refuse and predicted_refuse:
+            counts[0] += 1
+        elif predicted_refuse:
+            counts[1] += 1
+        elif gold_refuse:
+            counts[2] += 1
+    return counts
+
+
+def _timed(func, items: List[Dict[str, Any]], label_of) -> Dict[str, Any]:
+    """Run func on each item's text; returns predictions and msgs/s per gold label."""
+    func(items[0]["text"])  # Build matchers outside the timing
+    predictions = []
+    seconds = defaultdict(float)
+    counts = defaultdict(int)
+    for item in items:
+        start = time.perf_counter()
+        predictions.append(func(item["text"]))
+        seconds[label_of(item)] += time.perf_counter() - start
+        counts[label_of(item)] += 1
+    rates = {label: counts[label] / seconds[label] if seconds[label] else None for label in counts}
+    return {"predictions": predictions, "msgs_per_sec": rates}
+
+
+def evaluate_refusals(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-category precision/recall/msgs/s of get_refusal_category."""
+    label_of = lambda item: item.get("category") or ALLOWED
+    run = _timed(get_refusal_category, items, label_of)
+
+    labels = [category for category, _ in REFUSAL_CATEGORY_KEYWORDS] + [ALLOWED]
+    counts = {label: [0, 0, 0] for label in labels}  # tp, fp, fn
+    misses = []
+    for item, predicted in zip(items, run["predictions"]):
+        gold, predicted = label_of(item), predicted or ALLOWED
+        if gold == predicted:
+            counts[gold][0] += 1
+            continue
+        counts.setdefault(predicted, [0, 0, 0])[1] += 1
+        counts.setdefault(gold, [0, 0, 0])[2] += 1
+        misses.append({"id": item.get("id"), "expected": gold, "predicted": predicted})
+
+    # Refuse vs allow, regardless of which template
+    refuse = _refuse_counts(items, run["predictions"])
+
+    categories = {}
+    for label, (tp, fp, fn) in counts.items():
+        categories[label] = _scores(tp, fp, fn)
+        categories[label]["msgs_per_sec"] = run["msgs_per_sec"].get(label)
+    return {
+        "categories": categories,
+        "refuse": _scores(*refuse),
+        "accuracy": sum(c["tp"] for c in categories.values()) / len(items),
+        "misses": misses,
+    }
+
+
+def evaluate_pi(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-type precision/recall/msgs/s of PI redaction (type present in a message or not)."""
+    label_of = lambda item: "with_pi" if item.get("pi") else "without_pi"
+    run = _timed(redact_pi_with_audit, items, label_of)
+
+    types = {}
+    for pi_type in PI_PATTERNS:
+        tp = fp = fn = 0
+        for item, (_, audit) in zip(items, run["predictions"]):
+            expected, found = pi_type in item.get("pi", []), audit["counts"][pi_type] > 0
+            tp += expected and found
+            fp += found and not expected
+            fn += expected and not found
+        types[pi_type] = _scores(tp, fp, fn)
+    return {"types": types, "msgs_per_sec": run["msgs_per_sec"]}
+
+
+def evaluate_semantic(items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Refuse-vs-allow precision/recall of keyword + embedding check per threshold."""
+    from core.rag import get_retriever
+    from core.semantic_safety import SemanticSafetyClassifier
+
+    retriever = get_retriever()
+    encoder = retriever.get_embedder()
+    if encoder is None:
+        return None
+    model_name = retriever.embedding_model_name()
+
+    classifier = SemanticSafetyClassifier(threshold=1.0)
+    classifier.prepare(encoder, model_name)
+    keyword = [get_refusal_category(item["text"]) for item in items]
+    # Per-category best scores; the check only runs when the keyword pass is clean
+    scored = [classifier.classify(item["text"], encoder)["scores"] if kw is None else None
+              for item, kw in zip(items, keyword)]
+
+    sweep = []
+    for threshold in SEMANTIC_THRESHOLDS:
+        semantic = [max(scores, key=scores.get) if scores and max(scores.values()) >= threshold else None
+                    for scores in scored]
+        predictions = [kw or sem for kw, sem in zip(keyword, semantic)]
+        sweep.append({
+            "threshold": threshold,
+            **_scores(*_refuse_counts(items, predictions)),
+            "semantic_false_refusals": [item.get("id") for item, sem in zip(items, semantic)
+                                        if sem and not item.get("category")],
+        })
+    return {"model": model_name, "keyword_only": _scores(*_refuse_counts(items, keyword)), "sweep": sweep}
+
+
+def measure_throughput(items: List[Dict[str, Any]], repeat: int, processes: int) -> Dict[str, Any]:
+    """Messages per second through the batch APIs on the corpus repeated `repeat` times."""
+    texts = [item["text"] for item in items]
+    total = len(texts) * repeat
+    result = {"messages": total, "processes": processes}
+    for name, batch in (("should_refuse", should_refuse_batch), ("redact_pi", redact_pi_batch)):
+        start = time.perf_counter()
+        for _ in batch((text for _ in range(repeat) for text in texts), processes=processes):
+            pass
+        result[f"{name}_msgs_per_sec"] = total / (time.perf_counter() - start)
+    return result
+
+
+def _fmt(value: Optional[float], pct: bool = True) -> str:
+    if value is None:
+        return "-"
+    return f"{value:.0%}" if pct else f"{value:,.0f}"
+
+
+def _change(value: Optional[float], reference: Optional[float]) -> str:
+    if value is None or reference is None or value == reference:
+        return ""
+    return f" ({value - reference:+.0%})"
+
+
+def print_report(results: Dict[str, Any], reference: Optional[Dict[str, Any]] = None):
+    """Print the tables, with precision/recall changes against reference results."""
+    ref_categories = (reference or {}).get("refusals", {}).get("categories", {})
+    print(f"{'category':<20} {'precision':>16} {'recall':>16} {'msgs/s':>12}   tp/fp/fn")
+    for label, s in results["refusals"]["categories"].items():
+        ref = ref_categories.get(label, {})
+        print(f"{label:<20} {_fmt(s['precision']) + _change(s['precision'], ref.get('precision')):>16} "
+              f"{_fmt(s['recall']) + _change(s['recall'], ref.get('recall')):>16} "
+              f"{_fmt(s['msgs_per_sec'], pct=False):>12}   {s['tp']}/{s['fp']}/{s['fn']}")
+    refuse = results["refusals"]["refuse"]
+    print(f"\nRefuse vs allow: precision {_fmt(refuse['precision'])}, recall {_fmt(refuse['recall'])}; "
+          f"exact category accuracy {results['refusals']['accuracy']:.0%}")
+
+    ref_types = (reference or {}).get("pi", {}).get("types", {})
+    print(f"\n{'PI type':<20} {'precision':>16} {'recall':>16}   tp/fp/fn")
+    for pi_type, s in results["pi"]["types"].items():
+        ref = ref_types.get(pi_type, {})
+        print(f"{pi_type:<20} {_fmt(s['precision']) + _change(s['precision'], ref.get('precision')):>16} "
+              f"{_fmt(s['recall']) + _change(s['recall'], ref.get('recall')):>16}   "
+              f"{s['tp']}/{s['fp']}/{s['fn']}")
+
+    throughput = results["throughput"]
+    print(f"\nBatch throughput ({throughput['messages']:,} messages, {throughput['processes']} process(es)): "
+          f"should_refuse {_fmt(throughput['should_refuse_msgs_per_sec'], pct=False)} msgs/s, "
+          f"redact_pi {_fmt(throughput['redact_pi_msgs_per_sec'], pct=False)} msgs/s")
+
+    semantic = results.get("semantic")
+    if semantic:
+        keyword_only = semantic["keyword_only"]
+        print(f"\nKeyword + embedding check ({semantic['model']}); keyword only: "
+              f"precision {_fmt(keyword_only['precision'])}, recall {_fmt(keyword_only['recall'])}")
+        print(f"{'threshold':<12} {'precision':>10} {'recall':>8}   false refusals added")
+        for row in semantic["sweep"]:
+            print(f"{row['threshold']:<12} {_fmt(row['precision']):>10} {_fmt(row['recall']):>8}   "
+                  f"{', '.join(row['semantic_false_refusals']) or '-'}")
+
+    if results["refusals"]["misses"]:
+        print("\nMisclassified:")
+        for miss in results["refusals"]["misses"]:
+            print(f"  {miss['id']}: expected {miss['expected']}, got {miss['predicted']}")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Score WellNavigator's safety rules on a labeled corpus")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH, help="Labeled JSONL corpus")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes for the batch run")
+    parser.add_argument("--repeat", type=int, default=100, help="Corpus repetitions for the batch run")
+    parser.add_argument("--semantic", action="store_true",
+                        help="Also sweep thresholds for the embedding check (loads the RAG encoder)")
+    parser.add_argument("--save", action="store_true", help=f"Write results to {RESULTS_PATH.name}")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    items = load_corpus(args.corpus)
+    results = {
+        "corpus": args.corpus.name,
+        "messages": len(items),
+        "refusals": evaluate_refusals(items),
+        "pi": evaluate_pi(items),
+        "throughput": measure_throughput(items, args.repeat, args.processes),
+    }
+    if args.semantic:
+        results["semantic"] = evaluate_semantic(items)
+        if results["semantic"] is None:
+            print("⚠️ sentence-transformers not installed; skipping the embedding check")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        reference = None
+        if RESULTS_PATH.exists() and not args.save:
+            with open(RESULTS_PATH, "r") as f:
+                reference = json.load(f)
+        print_report(results, reference)
+
+    if args.save:
+        with open(RESULTS_PATH, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Saved results to {RESULTS_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Cold-start profile for the WellNavigator app.
+Runs the app's startup imports and sidebar availability checks in a fresh
+interpreter under ``python -X importtime`` and reports the import time per
+module, so a heavy library creeping back into the startup path shows up.
+
+Usage:
+    python benchmarks/startup_profile.py            # print the profile
+    python benchmarks/startup_profile.py --save     # also update startup_profile.json
+    python benchmarks/startup_profile.py --runs 5 --budget 1.0
+
+"First paint" is the time from interpreter start-up to the end of the sidebar
+checks (is_rag_available, is_search_available, is_voice_available, ...), i.e.
+roughly what a new Streamlit session waits for before anything is drawn.
+Exits with status 1 if the median first paint is over the budget.
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Dict, Any, List
+
+ROOT = Path(__file__).resolve().parent.parent
+PROFILE_PATH = Path(__file__).parent / "startup_profile.json"
+FIRST_PAINT_BUDGET = float(os.getenv("STARTUP_BUDGET_SECONDS", "1.0"))
+
+# Third-party packages worth tracking; reported when they appear in the import log
+HEAVY_MODULES = ["streamlit", "openai", "tiktoken", "requests", "numpy", "faiss",
+                 "sentence_transformers", "torch"]
+
+# Executed in the child interpreter: the app's imports, then the sidebar checks
+CHILD_SCRIPT = """
+import json, time
+t0 = time.perf_counter()
+import streamlit
+t_streamlit = time.perf_counter()
+from core import (get_suggested_prompts, is_rag_available, get_rag_stats, is_search_available,
+                  is_voice_available, get_session_metrics, check_token_limit,
+                  get_token_usage_summary, get_admission_metrics, get_chat_pipeline, ChatSession)
+from core.llm import CancellationToken
+from components.chat_sink import StreamlitChatSink
+from components.voice_input import simple_voice_button
+from components.listening_mode import listening_mode_sidebar, listening_mode_panel
+t_imports = time.perf_counter()
+status = {
+    "search": is_search_available(),
+    "rag": is_rag_available(),
+    "voice": is_voice_available(),
+}
+get_admission_metrics()
+get_chat_pipeline()
+t_checks = time.perf_counter()
+print(json.dumps({
+    "streamlit_s": t_streamlit - t0,
+    "core_imports_s": t_imports - t_streamlit,
+    "sidebar_checks_s": t_checks - t_imports,
+    "in_process_s": t_checks - t0,
+    "available": status,
+}))
+"""
+
+
+def parse_importtime(stderr: str) -> Dict[str, float]:
+    """Cumulative import time in seconds per module from ``-X importtime`` output."""
+    cumulative = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        parts = line.split("|")
+        if len(parts) != 3:
+            continue
+        cumulative_us, name = parts[1].strip(), parts[2].strip()
+        # A module appears once, when first imported; keep the largest if repeated
+        cumulative[name] = max(cumulative.get(name, 0.0), int(cumulative_us) / 1e6)
+    return cumulative
+
+
+def profile_once(env: Dict[str, str]) -> Dict[str, Any]:
+    """Run one cold start in a fresh interpreter."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD_SCRIPT],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "child failed")
+
+    timings = json.loads(proc.stdout.strip().splitlines()[-1])
+    imports = parse_importtime(proc.stderr)
+    return {"wall_s": wall, "timings": timings, "imports": imports}
+
+
+def summarize(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Median timings across runs, plus per-module import times."""
+    def median(values):
+        return round(statistics.median(values), 4)
+
+    modules = {}
+    names = set().union(*(run["imports"] for run in runs))
+    tracked = [n for n in names if n == "core" or n.startswith("core.") or n.startswith("components.")]
+    tracked += [n for n in HEAVY_MODULES if n in names]
+    for name in tracked:
+        modules[name] = median([run["imports"].get(name, 0.0) for run in runs])
+
+    timing_keys = runs[0]["timings"].keys() - {"available"}
+    return {
+        "first_paint_s": median([run["wall_s"] for run in runs]),
+        **{key: median([run["timings"][key] for run in runs]) for key in sorted(timing_keys)},
+        "available": runs[0]["timings"]["available"],
+        "not_imported": [n for n in HEAVY_MODULES if n not in names],
+        "modules": dict(sorted(modules.items(), key=lambda item: -item[1])),
+    }
+
+
+def print_profile(summary: Dict[str, Any], budget: float):
+    """Print the per-module table and the first-paint verdict."""
+    print(f"\n{'module':<36} {'cumulative':>12}")
+    for name, seconds in summary["modules"].items():
+        print(f"{name:<36} {seconds * 1000:>9.1f} ms")
+    if summary["not_imported"]:
+        print(f"\nNot imported at startup: {', '.join(summary['not_imported'])}")
+
+    available = ", ".join(f"{k}={'on' if v else 'off'}" for k, v in summary["available"].items())
+    print(f"\nAvailability: {available}")
+    print(f"streamlit import:  {summary['streamlit_s'] * 1000:.0f} ms")
+    print(f"app imports:       {summary['core_imports_s'] * 1000:.0f} ms")
+    print(f"sidebar checks:    {summary['sidebar_checks_s'] * 1000:.0f} ms")
+    print(f"first paint:       {summary['first_paint_s'] * 1000:.0f} ms (budget {budget * 1000:.0f} ms)")
+
+
+def main():
+    """Parse arguments, profile cold starts and optionally save the profile."""
+    parser = argparse.ArgumentParser(description="Cold-start import profile")
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts to take the median of")
+    parser.add_argument("--budget", type=float, default=FIRST_PAINT_BUDGET,
+                        help="Maximum first paint in seconds")
+    parser.add_argument("--save", action="store_true", help=f"Write the profile to {PROFILE_PATH.name}")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(ROOT), env.get("PYTHONPATH")]))
+
+    print(f"🚀 Profiling {args.runs} cold start(s)...")
+    try:
+        runs = [profile_once(env) for _ in range(args.runs)]
+    except RuntimeError as e:
+        print(f"❌ Startup failed: {e}")
+        sys.exit(1)
+
+    summary = summarize(runs)
+    print_profile(summary, args.budget)
+
+    if args.save:
+        summary["machine"] = {"python": platform.python_version(), "platform": platform.platform(),
+                              "processor": platform.processor() or platform.machine()}
+        summary["recorded_at"] = time.strftime("%Y-%m-%d")
+        PROFILE_PATH.write_text(json.dumps(summary, indent=2) + "\n")
+        print(f"\n💾 Profile saved to: {PROFILE_PATH}")
+
+    if summary["first_paint_s"] > args.budget:
+        print(f"\n❌ First paint {summary['first_paint_s']:.2f}s is over the {args.budget:.2f}s budget")
+        sys.exit(1)
+    print(f"\n✅ First paint within {args.budget:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
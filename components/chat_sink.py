@@ -0,0 +1,40 @@
+"""
+Streamlit sink for the chat pipeline.
+Renders a turn's user message, streamed answer, notices and sources as chat bubbles.
+"""
+
+import streamlit as st
+from typing import List, Dict
+from core.sinks import PlaceholderSink
+
+
+class StreamlitChatSink(PlaceholderSink):
+    """Streams a chat turn into st.chat_message containers."""
+
+    def __init__(self):
+        self.container = None
+        super().__init__(None)
+
+    def on_user_message(self, text: str):
+        with st.chat_message("user"):
+            st.markdown(text)
+
+        # Assistant bubble for everything that follows
+        self.container = st.chat_message("assistant")
+        self.placeholder = self.container.empty()
+
+    def on_notice(self, level: str, message: str):
+        if level == "warning":
+            self.container.warning(message)
+        else:
+            self.container.markdown("---")
+            self.container.info(message)
+
+    def on_citations(self, citations: List[Dict]):
+        self.container.markdown("---")
+        self.container.markdown("### 📚 Sources")
+        for citation in citations:
+            if citation['type'] == 'knowledge_base':
+                self.container.markdown(f"**{citation['source']}** - {citation['title']}")
+            else:
+                self.container.markdown(f"**{citation['source']}** - {citation.get('url', 'Web source')}")
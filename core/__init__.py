@@ -3,27 +3,67 @@ WellNavigator Core Module
 Contains LLM, RAG, safety, and utility components.
 """
 
-from .prompts import ASSISTANT_SYSTEM_PROMPT, compose_chat_prompt, get_suggested_prompts
-from .safety import (
-    should_refuse,
-    redact_pi,
-    medical_disclaimer,
-    escalation_message,
-    is_safe_query,
-    REFUSAL_TEMPLATES
-)
-from .llm import stream_chat, stream_chat_to_streamlit, get_available_models
-from .rag import retrieve_documents, is_rag_available, get_rag_stats
-from .search import web_search, is_search_available, get_search_status, reformulate_query_for_search
-from .voice import is_voice_available, transcribe_audio_file, add_to_listening_mode
-from .observe import (
-    log_turn, 
-    get_session_metrics, 
-    check_token_limit, 
-    should_allow_streaming,
-    get_token_usage_summary,
-    MAX_TOKENS_PER_SESSION
-)
+import sys
+
+# Public names are resolved on first access (PEP 562) so "import core" doesn't
+# load every submodule; heavy third-party libraries are also deferred inside
+# the submodules themselves (see benchmarks/startup_profile.py).
+_EXPORTS = {
+    "prompts": ["ASSISTANT_SYSTEM_PROMPT", "compose_chat_prompt", "get_suggested_prompts"],
+    "safety": [
+        "should_refuse",
+        "redact_pi",
+        "redact_pi_with_audit",
+        "redact_pi_stream",
+        "should_refuse_batch",
+        "redact_pi_batch",
+        "medical_disclaimer",
+        "escalation_message",
+        "is_safe_query",
+        "find_refusal_matches",
+        "reload_safety_rules",
+        "get_safety_cache_metrics",
+        "REFUSAL_TEMPLATES",
+    ],
+    "keywords": ["KeywordAutomaton", "KeywordMatch"],
+    "text_analysis": ["TextAnalysis", "analyze_text"],
+    "output_guard": ["OutputGuard", "get_output_guard_metrics"],
+    "semantic_safety": ["check_semantic_safety", "get_semantic_safety_metrics"],
+    "llm": ["stream_chat", "stream_chat_to_streamlit", "stream_chat_to_sink", "get_available_models", "get_admission_metrics"],
+    "rag": ["retrieve_documents", "is_rag_available", "get_rag_stats"],
+    "search": ["web_search", "is_search_available", "get_search_status", "reformulate_query_for_search"],
+    "context": ["gather_context"],
+    "voice": ["is_voice_available", "transcribe_audio_file", "add_to_listening_mode"],
+    "observe": [
+        "log_turn",
+        "get_session_metrics",
+        "check_token_limit",
+        "should_allow_streaming",
+        "get_token_usage_summary",
+        "plan_turn_budget",
+        "MAX_TOKENS_PER_SESSION",
+    ],
+    "sinks": ["TokenSink", "PlaceholderSink", "CollectingSink"],
+    "pipeline": ["ChatPipeline", "ChatSession", "Turn", "get_chat_pipeline"],
+    "warmup": ["start_warmup", "get_warmup_state", "get_warmup_status"],
+}
+_ATTR_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+
+def __getattr__(name):
+    module = _ATTR_MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # __import__ (unlike importlib.import_module) shows up in -X importtime
+    qualified = f"{__name__}.{module}"
+    __import__(qualified)
+    value = getattr(sys.modules[qualified], name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 __all__ = [
     "ASSISTANT_SYSTEM_PROMPT",
@@ -31,13 +71,30 @@ __all__ = [
     "get_suggested_prompts",
     "should_refuse",
     "redact_pi",
+    "redact_pi_with_audit",
+    "redact_pi_stream",
+    "should_refuse_batch",
+    "redact_pi_batch",
     "medical_disclaimer",
     "escalation_message",
     "is_safe_query",
+    "find_refusal_matches",
+    "reload_safety_rules",
+    "get_safety_cache_metrics",
     "REFUSAL_TEMPLATES",
+    "KeywordAutomaton",
+    "KeywordMatch",
+    "TextAnalysis",
+    "analyze_text",
+    "OutputGuard",
+    "get_output_guard_metrics",
+    "check_semantic_safety",
+    "get_semantic_safety_metrics",
     "stream_chat",
     "stream_chat_to_streamlit",
+    "stream_chat_to_sink",
     "get_available_models",
+    "get_admission_metrics",
     "retrieve_documents",
     "is_rag_available",
     "get_rag_stats",
@@ -45,6 +102,7 @@ __all__ = [
     "is_search_available",
     "get_search_status",
     "reformulate_query_for_search",
+    "gather_context",
     "is_voice_available",
     "transcribe_audio_file",
     "add_to_listening_mode",
@@ -53,6 +111,17 @@ __all__ = [
     "check_token_limit",
     "should_allow_streaming",
     "get_token_usage_summary",
+    "plan_turn_budget",
     "MAX_TOKENS_PER_SESSION",
+    "TokenSink",
+    "PlaceholderSink",
+    "CollectingSink",
+    "ChatPipeline",
+    "ChatSession",
+    "Turn",
+    "get_chat_pipeline",
+    "start_warmup",
+    "get_warmup_state",
+    "get_warmup_status",
 ]
 
@@ -0,0 +1,114 @@
+"""
+Context gathering for WellNavigator.
+Runs RAG retrieval and web search concurrently under a per-turn deadline.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Any, Callable, Optional
+
+from .rag import retrieve_documents
+from .search import web_search, reformulate_query_for_search
+from .text_analysis import TextAnalysis
+
+
+# Configuration
+CONTEXT_DEADLINE_SECONDS = float(os.getenv("CONTEXT_DEADLINE_SECONDS", "5.0"))
+CONTEXT_MAX_WORKERS = int(os.getenv("CONTEXT_MAX_WORKERS", "8"))
+CONTEXT_SEARCH_MARGIN = 0.05  # Seconds search gives back so its fallback lands before the deadline
+
+# Shared pool for context sources; sized for a few concurrent turns
+_executor = ThreadPoolExecutor(max_workers=CONTEXT_MAX_WORKERS, thread_name_prefix="context")
+
+
+def _timed(source: str, fn: Callable[[], List[Dict]], timings: Dict[str, float]) -> List[Dict]:
+    """Run a context source and record how long it took."""
+    start_time = time.time()
+    try:
+        return fn()
+    finally:
+        timings[source] = time.time() - start_time
+
+
+def _search(user_input: str, k: int, analysis: Optional[TextAnalysis] = None,
+            deadline: Optional[float] = None) -> List[Dict]:
+    """Reformulate the query and run web search within the deadline."""
+    search_query = reformulate_query_for_search(user_input, analysis=analysis)
+    return web_search(search_query, k=k, deadline=deadline)
+
+
+def gather_context(
+    user_input: str,
+    rag_on: bool,
+    search_on: bool,
+    k_docs: int = 5,
+    k_web: int = 3,
+    deadline: float = CONTEXT_DEADLINE_SECONDS,
+    analysis: Optional[TextAnalysis] = None
+) -> Dict[str, Any]:
+    """
+    Gather RAG and web search context concurrently.
+
+    Both sources start at once on the shared pool; whatever has finished when
+    the deadline passes is returned. Sources that miss the deadline keep running
+    in the background but are not waited for. Web search gets the same budget
+    and falls back to cached or stub results just before it.
+
+    Args:
+        user_input: The (redacted) user message
+        rag_on: Whether to retrieve from the knowledge base
+        search_on: Whether to run web search
+        k_docs: Number of RAG documents to retrieve
+        k_web: Number of web results to return
+        deadline: Seconds to wait for all sources
+        analysis: The turn's TextAnalysis of user_input (reused by search)
+
+    Returns:
+        Dictionary with:
+            - retrieved_docs: List of RAG documents (empty if off, failed or late)
+            - web_results: List of web results (empty if off, failed or late)
+            - timings: Seconds per source; for a source that missed the
+              deadline, the time it had run when the stage stopped waiting
+            - timed_out: Sources that missed the deadline
+            - errors: Error message per failed source
+            - wall_time: Seconds spent in this stage
+    """
+    start_time = time.time()
+    timings: Dict[str, float] = {}
+    futures = {}
+
+    if rag_on:
+        futures["rag"] = _executor.submit(_timed, "rag", lambda: retrieve_documents(user_input, k=k_docs), timings)
+    if search_on:
+        search_deadline = max(0.0, deadline - CONTEXT_SEARCH_MARGIN)
+        futures["search"] = _executor.submit(
+            _timed, "search", lambda: _search(user_input, k_web, analysis, search_deadline), timings
+        )
+
+    if futures:
+        wait(list(futures.values()), timeout=deadline)
+
+    results = {"rag": [], "search": []}
+    timed_out = []
+    errors = {}
+
+    waited = time.time() - start_time
+    for source, future in futures.items():
+        if not future.done():
+            timed_out.append(source)
+            timings.setdefault(source, waited)
+            continue
+        try:
+            results[source] = future.result()
+        except Exception as e:
+            errors[source] = str(e)
+
+    return {
+        "retrieved_docs": results["rag"],
+        "web_results": results["search"],
+        "timings": {source: timings[source] for source in futures if source in timings},
+        "timed_out": timed_out,
+        "errors": errors,
+        "wall_time": time.time() - start_time,
+    }
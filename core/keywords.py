@@ -0,0 +1,259 @@
+"""
+Multi-pattern keyword matching for WellNavigator.
+An Aho-Corasick automaton finds every occurrence of every keyword, with its
+category and span, in a single pass over the text. Cost per message depends
+on the text length, not on how many keywords there are.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """One keyword occurrence; start/end index the original text."""
+    keyword: str
+    category: str
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over categorized keywords.
+
+    Transitions are resolved through failure links the first time a
+    (state, character) pair is seen and then memoized, so scanning costs one
+    dict lookup per character while memory only grows with the pairs that
+    actually occur in real text.
+    """
+
+    def __init__(self, categories: Iterable[Tuple[str, Iterable[str]]],
+                 case_sensitive: bool = False, word_boundary: bool = False):
+        """
+        Build the automaton.
+
+        Args:
+            categories: (category, keywords) pairs; a keyword may appear in
+                several categories
+            case_sensitive: Match case exactly (default: lowercase both sides)
+            word_boundary: Default for find_all; only report matches that
+                don't start or end inside a word
+        """
+        self.case_sensitive = case_sensitive
+        self.word_boundary = word_boundary
+        self.categories = []
+
+        self._goto: List[Dict[str, int]] = [{}]
+        # Per state: (keyword, category, length, needs_left_boundary, needs_right_boundary)
+        self._outputs: List[tuple] = [()]
+        self._keyword_count = 0
+        self.max_length = 0
+
+        for category, keywords in categories:
+            if category not in self.categories:
+                self.categories.append(category)
+            for keyword in keywords:
+                self._add(keyword, category)
+        self._build_failure_links()
+
+        # Memoized transitions, seeded with the trie edges
+        self._delta = [dict(edges) for edges in self._goto]
+
+    def _add(self, keyword: str, category: str):
+        """Insert one keyword into the trie."""
+        key = keyword if self.case_sensitive else keyword.lower()
+        if not key:
+            return
+        state = 0
+        for ch in key:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._outputs.append(())
+            state = next_state
+        self.max_length = max(self.max_length, len(key))
+        output = (keyword, category, len(key), _is_word_char(key[0]), _is_word_char(key[-1]))
+        if output not in self._outputs[state]:
+            self._outputs[state] += (output,)
+            self._keyword_count += 1
+
+    def _build_failure_links(self):
+        """Breadth-first failure links; outputs inherit their suffix states' outputs."""
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] += self._outputs[self._fail[next_state]]
+
+    def _resolve(self, state: int, ch: str) -> int:
+        """Follow failure links to find the transition from state on ch."""
+        while True:
+            next_state = self._goto[state].get(ch)
+            if next_state is not None:
+                return next_state
+            if state == 0:
+                return 0
+            state = self._fail[state]
+
+    def __len__(self) -> int:
+        return self._keyword_count
+
+    def _scan(self, text: str, state: int = 0) -> Tuple[List[Tuple[int, tuple]], int]:
+        """Run the automaton over text from state; returns (end index, outputs) hits and the final state."""
+        delta, outputs, resolve = self._delta, self._outputs, self._resolve
+        hits = []
+        for i, ch in enumerate(text):
+            next_state = delta[state].get(ch)
+            if next_state is None:
+                next_state = resolve(state, ch)
+                delta[state][ch] = next_state
+            state = next_state
+            if outputs[state]:
+                hits.append((i, outputs[state]))
+        return hits, state
+
+    def stream(self, word_boundary: Optional[bool] = None) -> "KeywordStream":
+        """Start an incremental scan, e.g. over streamed LLM tokens."""
+        return KeywordStream(self, self.word_boundary if word_boundary is None else word_boundary)
+
+    def find_all(self, text: str, word_boundary: Optional[bool] = None) -> List[KeywordMatch]:
+        """
+        Find every keyword occurrence in one pass (overlapping matches included).
+
+        Args:
+            text: Text to scan
+            word_boundary: Override the automaton's default boundary setting
+
+        Returns:
+            Matches in order of end position
+        """
+        if word_boundary is None:
+            word_boundary = self.word_boundary
+
+        scanned = text if self.case_sensitive else text.lower()
+        # Lowercasing can change length for a few characters (e.g. "İ"); map back
+        index_map = None
+        if len(scanned) != len(text):
+            index_map = [i for i, ch in enumerate(text) for _ in ch.lower()] + [len(text)]
+
+        hits, _ = self._scan(scanned)
+
+        matches = []
+        length = len(scanned)
+        for i, found in hits:
+            end = i + 1
+            for keyword, category, key_length, left, right in found:
+                start = end - key_length
+                if word_boundary and (
+                    (left and start > 0 and _is_word_char(scanned[start - 1]))
+                    or (right and end < length and _is_word_char(scanned[end]))
+                ):
+                    continue
+                if index_map is not None:
+                    matches.append(KeywordMatch(keyword, category, index_map[start], index_map[end]))
+                else:
+                    matches.append(KeywordMatch(keyword, category, start, end))
+        return matches
+
+    def find_categories(self, text: str, word_boundary: Optional[bool] = None) -> List[str]:
+        """Matched categories, in the order they were given to the constructor."""
+        found = {match.category for match in self.find_all(text, word_boundary)}
+        return [category for category in self.categories if category in found]
+
+
+class KeywordStream:
+    """
+    Incremental scan over text that arrives in chunks.
+
+    The automaton state carries partial matches across chunk boundaries, so
+    each chunk is scanned once and nothing already seen is rescanned. Only a
+    short tail (the longest keyword plus one character) is kept, for
+    word-boundary checks on matches that started in an earlier chunk.
+    Positions are offsets into the whole original stream, as in find_all.
+    """
+
+    def __init__(self, automaton: KeywordAutomaton, word_boundary: bool = False):
+        self.automaton = automaton
+        self.word_boundary = word_boundary
+        self.position = 0  # Characters consumed so far
+        self._scanned = 0  # Characters scanned so far (differs once lowercasing grew a character)
+        # (scanned offset, extra characters) of each character that grew when lowercased
+        self._expansions: List[Tuple[int, int]] = []
+        self._state = 0
+        self._tail = ""
+        self._pending: List[KeywordMatch] = []  # Waiting on the next character (right boundary)
+
+    def _source_offset(self, offset: int) -> int:
+        """Map an offset into the scanned (lowercased) stream back to the original stream."""
+        if not self._expansions:
+            return offset
+        return offset - sum(min(extra, offset - start) for start, extra in self._expansions if start < offset)
+
+    def feed(self, chunk: str) -> List[KeywordMatch]:
+        """
+        Scan the next chunk.
+
+        Returns:
+            Matches completed by this chunk (with word boundaries, a match
+            ending exactly at the chunk end is reported with the next chunk
+            or by flush())
+        """
+        if not chunk:
+            return []
+        scanned = chunk if self.automaton.case_sensitive else chunk.lower()
+        if len(scanned) != len(chunk):
+            # Lowercasing grew some characters (e.g. "İ"); note where, to map back
+            offset = self._scanned
+            for ch in chunk:
+                lowered = len(ch.lower())
+                if lowered > 1:
+                    self._expansions.append((offset, lowered - 1))
+                offset += lowered
+
+        matches = []
+        if self._pending:
+            if not _is_word_char(scanned[0]):
+                matches.extend(self._pending)
+            self._pending = []
+
+        hits, self._state = self.automaton._scan(scanned, self._state)
+        window = self._tail + scanned
+        base = self._scanned - len(self._tail)  # Scanned offset of window[0]
+        for i, found in hits:
+            end = len(self._tail) + i + 1
+            for keyword, category, key_length, left, right in found:
+                start = end - key_length
+                match = KeywordMatch(keyword, category, self._source_offset(base + start),
+                                     self._source_offset(base + end))
+                if self.word_boundary:
+                    if left and start > 0 and _is_word_char(window[start - 1]):
+                        continue
+                    if right and end == len(window):
+                        self._pending.append(match)
+                        continue
+                    if right and _is_word_char(window[end]):
+                        continue
+                matches.append(match)
+
+        self.position += len(chunk)
+        self._scanned += len(scanned)
+        self._tail = window[-(self.automaton.max_length + 1):]
+        return matches
+
+    def flush(self) -> List[KeywordMatch]:
+        """End of stream: release matches that were waiting on a right boundary."""
+        matches, self._pending = self._pending, []
+        return matches
@@ -4,18 +4,31 @@ Handles OpenAI API calls with streaming support.
 """
 
 import os
+import json
 import time
-from typing import List, Dict, Tuple, Iterator, Optional
+import queue
+import hashlib
+import heapq
+import random
+import itertools
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Iterator, Optional, Callable
 
 try:
     import streamlit as st
 except ImportError:
     st = None
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+# openai and tiktoken are imported on first use (see _load_openai/_load_tiktoken)
+# so importing core stays fast; openai alone costs ~0.4s
+openai = None
+OpenAI = None
+tiktoken = None
+_tiktoken_missing = False
+
+from .sinks import TokenSink, PlaceholderSink
+from .output_guard import create_output_guard
 
 
 # Token pricing per 1K tokens (USD) - updated as of late 2024
@@ -47,14 +60,132 @@ MODEL_PRICING = {
 }
 
 
-def get_openai_client() -> Optional[OpenAI]:
+# Provider rate limits per model (requests and tokens per minute).
+# Override for every model with OPENAI_RPM / OPENAI_TPM, or per model with
+# e.g. OPENAI_RPM_GPT_4O_MINI / OPENAI_TPM_GPT_4O_MINI.
+MODEL_RATE_LIMITS = {
+    "gpt-4o": {"rpm": 500, "tpm": 30000},
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+    "gpt-4-turbo": {"rpm": 500, "tpm": 30000},
+    "gpt-4-turbo-preview": {"rpm": 500, "tpm": 30000},
+    "gpt-3.5-turbo": {"rpm": 500, "tpm": 200000},
+    "gpt-3.5-turbo-0125": {"rpm": 500, "tpm": 200000}
+}
+
+# Context window (prompt + answer tokens) per model
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4-turbo-preview": 128000,
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-0125": 16385
+}
+DEFAULT_CONTEXT_WINDOW = 16385  # For models not listed above
+
+# Longest a request may wait in the admission queue before giving up (seconds)
+ADMISSION_MAX_WAIT = float(os.getenv("OPENAI_ADMISSION_MAX_WAIT", "20"))
+ADMISSION_TIMEOUT_MESSAGE = (
+    "⏳ WellNavigator is handling a lot of requests right now and your message "
+    "could not be started in time. Please try again in a moment."
+)
+
+# Output tokens reserved up front when the caller does not set max_tokens
+DEFAULT_OUTPUT_RESERVATION = 500
+
+# Queue priorities (lower is admitted first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+# Retry policy for transient failures before the first token arrives
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+RETRY_MAX_ATTEMPTS = int(os.getenv("OPENAI_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = 0.5  # seconds, doubled per attempt before jitter
+RETRY_MAX_DELAY = 8.0
+
+# Hedged requests: if no first token arrives within the p95 time-to-first-token,
+# a second request is fired and whichever starts streaming first is used.
+HEDGING_ENABLED = os.getenv("OPENAI_HEDGING", "false").lower() == "true"
+HEDGE_DEFAULT_DEADLINE = 4.0  # seconds, used until enough TTFT samples exist
+HEDGE_MIN_DEADLINE = 0.5
+HEDGE_MIN_SAMPLES = 20
+
+# Model routing rules, evaluated in order: the first rule whose conditions all
+# match picks the model for the turn; if none match, the selected model is used.
+# Supported conditions: min/max_prompt_tokens, min/max_history, has_context,
+# has_rag, has_web, safety_category (name or list of names; the refusal
+# category an allowed turn came close to, from the semantic safety check).
+# Override with MODEL_ROUTER_CONFIG=path/to/router.json ({"rules": [...], "fallbacks": {...}}).
+# Prompts of LARGE_PROMPT_TOKENS or more go to the stronger model; the turn
+# budget only limits them by the context window (see plan_turn_budget).
+LARGE_PROMPT_TOKENS = 6000
+MODEL_ROUTING_RULES = [
+    {
+        "name": "sensitive_topic",
+        "when": {"safety_category": ["emergency", "harmful", "diagnosis", "prescription"]},
+        "model": "gpt-4o"
+    },
+    {
+        "name": "long_conversation",
+        "when": {"min_history": 12},
+        "model": "gpt-4o"
+    },
+    {
+        "name": "large_prompt",
+        "when": {"min_prompt_tokens": LARGE_PROMPT_TOKENS},
+        "model": "gpt-4o"
+    },
+    {
+        "name": "grounded_answer",
+        "when": {"has_context": True, "max_prompt_tokens": LARGE_PROMPT_TOKENS},
+        "model": "gpt-4o-mini"
+    },
+    {
+        "name": "short_question",
+        "when": {"has_context": False, "max_prompt_tokens": 1500, "max_history": 6},
+        "model": "gpt-4o-mini"
+    }
+]
+
+# Models to try, in order, when a model errors after retries
+MODEL_FALLBACKS = {
+    "gpt-4o": ["gpt-4o-mini"],
+    "gpt-4-turbo": ["gpt-4o", "gpt-4o-mini"],
+    "gpt-4-turbo-preview": ["gpt-4o", "gpt-4o-mini"],
+    "gpt-4o-mini": ["gpt-3.5-turbo"],
+    "gpt-3.5-turbo": ["gpt-4o-mini"],
+    "gpt-3.5-turbo-0125": ["gpt-4o-mini"]
+}
+
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+def _load_openai() -> bool:
+    """Import the openai library on first use."""
+    global openai, OpenAI
+    if OpenAI is None:
+        try:
+            import openai as openai_module
+        except ImportError:
+            return False
+        openai, OpenAI = openai_module, openai_module.OpenAI
+    return True
+
+
+def get_openai_client() -> Optional["OpenAI"]:
     """
     Initialize and return OpenAI client.
     
+    The client is shared by the whole process so its HTTP connection pool is
+    reused across turns and sessions; it is rebuilt if the API key or
+    OPENAI_BASE_URL changes.
+    
     Returns:
         OpenAI client instance or None if API key not found
     """
-    if OpenAI is None:
+    if not _load_openai():
         if st:
             st.error("❌ OpenAI library not installed. Run: `pip install openai`")
         return None
@@ -65,13 +196,22 @@ def get_openai_client() -> Optional[OpenAI]:
             st.error("❌ OPENAI_API_KEY not found in environment variables. Please set it in your .env file.")
         return None
     
-    return OpenAI(api_key=api_key)
+    # Optional alternative endpoint, e.g. the local mock server (mock_openai.py)
+    base_url = os.getenv("OPENAI_BASE_URL") or None
+    
+    global _client, _client_key
+    with _client_lock:
+        if _client is None or _client_key != (api_key, base_url):
+            # Retries are handled by open_chat_stream so they can pass through admission control
+            _client = OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+            _client_key = (api_key, base_url)
+        return _client
 
 
 def estimate_tokens(text: str) -> int:
     """
     Rough estimation of token count from text.
-    More accurate would use tiktoken, but this is a reasonable approximation.
+    Fallback for count_tokens when no BPE encoding is available.
     
     Args:
         text: Input text to estimate
@@ -83,6 +223,103 @@ def estimate_tokens(text: str) -> int:
     return len(text) // 4
 
 
+# BPE encodings by model family (tiktoken), with per-message counts memoized
+MODEL_ENCODINGS = {
+    "gpt-4o": "o200k_base",
+    "gpt-4o-mini": "o200k_base",
+}
+DEFAULT_ENCODING = "cl100k_base"
+TOKENS_PER_MESSAGE = 3  # Chat format overhead per message
+TOKENS_PER_REPLY = 3  # Every reply is primed with <|start|>assistant<|message|>
+TOKEN_CACHE_SIZE = 4096
+
+_encodings: Dict[str, any] = {}
+_token_cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+
+def _load_tiktoken() -> bool:
+    """Import tiktoken on first use, remembering if it is not installed."""
+    global tiktoken, _tiktoken_missing
+    if tiktoken is None and not _tiktoken_missing:
+        try:
+            import tiktoken as tiktoken_module
+            tiktoken = tiktoken_module
+        except ImportError:
+            _tiktoken_missing = True
+    return tiktoken is not None
+
+
+def _get_encoding(model: str):
+    """Get the BPE encoding for a model, or None if tiktoken is unavailable."""
+    if not _load_tiktoken():
+        return None
+    
+    name = MODEL_ENCODINGS.get(model, DEFAULT_ENCODING)
+    if name not in _encodings:
+        try:
+            _encodings[name] = tiktoken.get_encoding(name)
+        except Exception as e:
+            # Encoding files are downloaded on first use; remember the failure
+            print(f"❌ Could not load tokenizer {name}, falling back to estimates: {e}")
+            _encodings[name] = None
+    return _encodings[name]
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count tokens in text with the model's BPE tokenizer.
+    Counts are memoized by content hash, so repeated text is tokenized once.
+    
+    Args:
+        text: Text to count
+        model: Model whose tokenizer to use
+    
+    Returns:
+        Token count (character-based estimate if no tokenizer is available)
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    
+    key = (encoding.name, hashlib.sha1(text.encode("utf-8")).hexdigest())
+    with _token_cache_lock:
+        if key in _token_cache:
+            _token_cache.move_to_end(key)
+            return _token_cache[key]
+    
+    count = len(encoding.encode(text, disallowed_special=()))
+    
+    with _token_cache_lock:
+        _token_cache[key] = count
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return count
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str = "gpt-4o-mini") -> int:
+    """
+    Count prompt tokens for a list of chat messages, including format overhead.
+    History messages hit the memo cache, so only new content is tokenized each turn.
+    
+    Args:
+        messages: List of message dicts with 'role' and 'content'
+        model: Model whose tokenizer to use
+    
+    Returns:
+        Prompt token count
+    """
+    total = TOKENS_PER_REPLY
+    for msg in messages:
+        total += TOKENS_PER_MESSAGE + count_tokens(msg["content"], model)
+    return total
+
+
+def get_context_window(model: str) -> int:
+    """Tokens (prompt + answer) the model accepts in one request."""
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
 def calculate_cost(input_tokens: int, output_tokens: int, model: str) -> float:
     """
     Calculate cost based on token usage and model pricing.
@@ -104,6 +341,706 @@ def calculate_cost(input_tokens: int, output_tokens: int, model: str) -> float:
     return input_cost + output_cost
 
 
+def _get_rate_limits(model: str) -> Dict[str, int]:
+    """
+    Resolve the RPM/TPM limits for a model from defaults and environment overrides.
+    
+    Args:
+        model: Model name
+    
+    Returns:
+        Dictionary with 'rpm' and 'tpm' keys
+    """
+    limits = dict(MODEL_RATE_LIMITS.get(model, MODEL_RATE_LIMITS["gpt-4o-mini"]))
+    env_suffix = model.upper().replace("-", "_").replace(".", "_")
+    
+    for key in ("rpm", "tpm"):
+        override = os.getenv(f"OPENAI_{key.upper()}_{env_suffix}") or os.getenv(f"OPENAI_{key.upper()}")
+        if override:
+            try:
+                limits[key] = max(1, int(override))
+            except ValueError:
+                print(f"❌ Ignoring invalid OPENAI_{key.upper()} value: {override}")
+    
+    return limits
+
+
+class TokenBucket:
+    """Continuously refilling token bucket."""
+    
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self.available = float(capacity)
+        self.updated_at = time.monotonic()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.available = min(self.capacity, self.available + elapsed * self.refill_per_second)
+            self.updated_at = now
+    
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` can be consumed (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # Oversized requests wait for a full bucket
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.refill_per_second
+    
+    def consume(self, amount: float, now: float):
+        """Take `amount` from the bucket (may go negative when settling usage)."""
+        self._refill(now)
+        self.available -= min(amount, self.capacity)
+    
+    def refund(self, amount: float, now: float):
+        """Return unused capacity to the bucket."""
+        self._refill(now)
+        self.available = min(self.capacity, self.available + amount)
+
+
+class AdmissionTimeout(Exception):
+    """Raised when a request cannot be admitted within its maximum wait."""
+
+
+class AdmissionController:
+    """
+    Process-wide admission control for OpenAI calls.
+    
+    Each model gets a request bucket (RPM) and a token bucket (TPM). Requests
+    wait in a per-model priority queue until both buckets have room, instead of
+    being sent to the provider and failing with a 429.
+    """
+    
+    def __init__(self, max_wait: float = ADMISSION_MAX_WAIT):
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._queues: Dict[str, List[list]] = {}
+        self._sequence = itertools.count()
+        self._waits: List[float] = []
+        self._stats = {
+            "admitted": 0,
+            "queued": 0,
+            "timeouts": 0,
+            "total_wait": 0.0,
+            "max_wait": 0.0,
+            "max_queue_depth": 0,
+        }
+    
+    def _get_buckets(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        if model not in self._buckets:
+            limits = _get_rate_limits(model)
+            self._buckets[model] = (
+                TokenBucket(limits["rpm"], limits["rpm"] / 60.0),
+                TokenBucket(limits["tpm"], limits["tpm"] / 60.0),
+            )
+        return self._buckets[model]
+    
+    def _ready_in(self, model: str, entry: list, tokens: int, now: float) -> Optional[float]:
+        """Seconds until `entry` can be admitted, or None if it is not at the head of the queue."""
+        if self._queues[model][0] is not entry:
+            return None
+        request_bucket, token_bucket = self._get_buckets(model)
+        return max(request_bucket.time_until(1, now), token_bucket.time_until(tokens, now))
+    
+    def acquire(
+        self,
+        model: str,
+        tokens: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        max_wait: Optional[float] = None,
+        on_queued: Optional[Callable[[int, float], None]] = None
+    ) -> float:
+        """
+        Wait until a request for `model` estimated at `tokens` tokens may be sent.
+        
+        Args:
+            model: Model the request will be sent to
+            tokens: Estimated total tokens (prompt + expected output)
+            priority: Queue priority (lower is admitted first)
+            max_wait: Maximum seconds to wait (default: controller max_wait)
+            on_queued: Optional callback(queue_depth, estimated_wait) invoked once
+                       if the request has to wait
+        
+        Returns:
+            Seconds spent waiting in the queue
+        
+        Raises:
+            AdmissionTimeout: If the request could not be admitted in time
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        start = time.monotonic()
+        deadline = start + max_wait
+        entry = [priority, next(self._sequence)]
+        
+        with self._cond:
+            queue = self._queues.setdefault(model, [])
+            heapq.heappush(queue, entry)
+            depth = len(queue)
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], depth)
+            ready_in = self._ready_in(model, entry, tokens, start)
+        
+        queued = ready_in is None or ready_in > 0
+        if queued and on_queued is not None:
+            on_queued(depth, ready_in if ready_in is not None else 0.0)
+        
+        with self._cond:
+            try:
+                while True:
+                    now = time.monotonic()
+                    ready_in = self._ready_in(model, entry, tokens, now)
+                    
+                    if ready_in is not None and ready_in <= 0:
+                        request_bucket, token_bucket = self._get_buckets(model)
+                        request_bucket.consume(1, now)
+                        token_bucket.consume(tokens, now)
+                        heapq.heappop(self._queues[model])
+                        break
+                    
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise AdmissionTimeout(
+                            f"Rate limit queue for {model} did not clear within {max_wait:.0f}s"
+                        )
+                    
+                    # The head of the queue sleeps until its buckets refill;
+                    # everyone else waits to be notified when the head moves.
+                    self._cond.wait(remaining if ready_in is None else min(ready_in, remaining))
+            finally:
+                queue = self._queues[model]
+                if entry in queue:
+                    queue.remove(entry)
+                    heapq.heapify(queue)
+                self._cond.notify_all()
+            
+            waited = time.monotonic() - start
+            self._stats["admitted"] += 1
+            if queued:
+                self._stats["queued"] += 1
+            self._stats["total_wait"] += waited
+            self._stats["max_wait"] = max(self._stats["max_wait"], waited)
+            self._waits.append(waited)
+            del self._waits[:-1000]  # Keep a bounded window for percentiles
+        
+        return waited
+    
+    def try_acquire(self, model: str, tokens: int) -> bool:
+        """
+        Admit a request only if capacity is available right now and nobody is queued.
+        Used for optional extra requests (e.g. hedges) that should never wait.
+        
+        Returns:
+            True if the request was admitted
+        """
+        with self._cond:
+            if self._queues.get(model):
+                return False
+            request_bucket, token_bucket = self._get_buckets(model)
+            now = time.monotonic()
+            if request_bucket.time_until(1, now) > 0 or token_bucket.time_until(tokens, now) > 0:
+                return False
+            request_bucket.consume(1, now)
+            token_bucket.consume(tokens, now)
+            self._stats["admitted"] += 1
+            return True
+    
+    def settle(self, model: str, reserved_tokens: int, actual_tokens: int):
+        """
+        Reconcile a reservation with the tokens a request actually used.
+        
+        Args:
+            model: Model the request was sent to
+            reserved_tokens: Tokens taken from the bucket at admission
+            actual_tokens: Tokens the request really consumed
+        """
+        with self._cond:
+            _, token_bucket = self._get_buckets(model)
+            now = time.monotonic()
+            difference = actual_tokens - reserved_tokens
+            if difference > 0:
+                token_bucket.consume(difference, now)
+            elif difference < 0:
+                token_bucket.refund(-difference, now)
+            self._cond.notify_all()
+    
+    def get_metrics(self) -> Dict[str, any]:
+        """Get queue depth and wait-time metrics."""
+        with self._cond:
+            waits = sorted(self._waits)
+            admitted = self._stats["admitted"]
+            return {
+                "queue_depth": {model: len(queue) for model, queue in self._queues.items()},
+                "total_queued_now": sum(len(queue) for queue in self._queues.values()),
+                "admitted": admitted,
+                "queued": self._stats["queued"],
+                "timeouts": self._stats["timeouts"],
+                "max_queue_depth": self._stats["max_queue_depth"],
+                "avg_wait": self._stats["total_wait"] / admitted if admitted else 0.0,
+                "p95_wait": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                "max_wait": self._stats["max_wait"],
+            }
+
+
+# Global admission controller instance
+_admission_controller = None
+_admission_lock = threading.Lock()
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the process-wide admission controller."""
+    global _admission_controller
+    with _admission_lock:
+        if _admission_controller is None:
+            _admission_controller = AdmissionController()
+    return _admission_controller
+
+def get_admission_metrics() -> Dict[str, any]:
+    """Convenience function to get admission queue metrics."""
+    return get_admission_controller().get_metrics()
+
+def _reserve_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int], model: str) -> int:
+    """Estimate the tokens a request will consume, for admission control."""
+    return count_message_tokens(messages, model) + (max_tokens or DEFAULT_OUTPUT_RESERVATION)
+
+
+def _resolve_usage(usage, messages: List[Dict[str, str]], response: str, model: str) -> Tuple[int, int, str]:
+    """
+    Get token counts for a completed call, preferring server-reported usage.
+    
+    Returns:
+        Tuple of (tokens_in, tokens_out, usage_source) where usage_source is
+        'api' or 'tokenizer'
+    """
+    if usage is not None:
+        return usage.prompt_tokens, usage.completion_tokens, "api"
+    return count_message_tokens(messages, model), count_tokens(response, model), "tokenizer"
+
+
+def _used_tokens(usage, messages: List[Dict[str, str]], response: str, model: str) -> int:
+    """Tokens a failed call consumed: none if it failed before streaming, else prompt plus partial answer."""
+    if usage is None and not response:
+        return 0
+    tokens_in, tokens_out, _ = _resolve_usage(usage, messages, response, model)
+    return tokens_in + tokens_out
+
+
+class RollingSamples:
+    """Rolling window of per-model samples (e.g. time-to-first-token, output tokens)."""
+    
+    def __init__(self, window: int = 200, min_samples: int = HEDGE_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+    
+    def record(self, model: str, value: float):
+        with self._lock:
+            samples = self._samples.setdefault(model, [])
+            samples.append(value)
+            del samples[:-self.window]
+    
+    def percentile(self, model: str, pct: float) -> Optional[float]:
+        """Get a percentile of recent samples, or None if there are too few."""
+        with self._lock:
+            samples = sorted(self._samples.get(model, []))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[int(pct * (len(samples) - 1))]
+    
+    def mean(self, model: str) -> Optional[float]:
+        """Get the mean of recent samples, or None if there are too few."""
+        with self._lock:
+            samples = list(self._samples.get(model, []))
+        if len(samples) < self.min_samples:
+            return None
+        return sum(samples) / len(samples)
+
+
+_ttft_tracker = RollingSamples()
+_output_tokens_tracker = RollingSamples(min_samples=5)
+
+def get_hedge_deadline(model: str) -> float:
+    """Seconds to wait for a first token before hedging (p95 of recent TTFT)."""
+    p95 = _ttft_tracker.percentile(model, 0.95)
+    if p95 is None:
+        return HEDGE_DEFAULT_DEADLINE
+    return max(HEDGE_MIN_DEADLINE, p95)
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation flag for one in-flight generation.
+    
+    The streaming loop checks the token between chunks and closes the upstream
+    HTTP stream once it is cancelled. If the loop is interrupted instead (e.g. a
+    Streamlit rerun), the partial response and its metadata are left on the
+    token so the caller can log the abandoned turn later.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self.partial: Optional[Tuple[str, Dict[str, any]]] = None
+    
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+def estimate_tokens_saved(tokens_out: int, model: str, max_tokens: Optional[int] = None) -> int:
+    """
+    Estimate how many output tokens a cancelled generation did not produce.
+    
+    Args:
+        tokens_out: Tokens generated before cancellation
+        model: Model that was generating
+        max_tokens: Output cap for the call, if any
+    
+    Returns:
+        Estimated tokens saved (never negative)
+    """
+    expected = _output_tokens_tracker.mean(model)
+    if expected is None:
+        expected = DEFAULT_OUTPUT_RESERVATION
+    if max_tokens:
+        expected = min(expected, max_tokens)
+    return max(0, int(expected) - tokens_out)
+
+
+def _cancelled_metadata(
+    messages: List[Dict[str, str]],
+    response: str,
+    model: str,
+    max_tokens: Optional[int],
+    start_time: float,
+    reason: str,
+    extra: Dict[str, any]
+) -> Dict[str, any]:
+    """Build metadata for a generation that was cancelled mid-stream."""
+    tokens_in = count_message_tokens(messages, model)
+    tokens_out = count_tokens(response, model)
+    tokens_saved = estimate_tokens_saved(tokens_out, model, max_tokens)
+    pricing = MODEL_PRICING.get(model, MODEL_PRICING["gpt-4o-mini"])
+    
+    return {
+        "tokens_in": tokens_in,
+        "tokens_out": tokens_out,
+        "cost": calculate_cost(tokens_in, tokens_out, model),
+        "latency": time.time() - start_time,
+        "model": model,
+        "error": False,
+        "usage_source": "tokenizer",
+        "cancelled": True,
+        "cancel_reason": reason,
+        "tokens_saved": tokens_saved,
+        "cost_saved": (tokens_saved / 1000) * pricing["output"],
+        **extra
+    }
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Check whether an OpenAI error is transient and worth retrying."""
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return True  # Includes APITimeoutError
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def _backoff_delay(attempt: int, error: Exception) -> float:
+    """
+    Exponential backoff with full jitter, honouring Retry-After when present.
+    
+    Args:
+        attempt: Zero-based retry number
+        error: The error that triggered the retry
+    
+    Returns:
+        Seconds to sleep before retrying
+    """
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+    
+    response = getattr(error, "response", None)
+    retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, min(float(retry_after), RETRY_MAX_DELAY))
+        except ValueError:
+            pass
+    
+    return delay
+
+
+def _open_single(client, request: Dict) -> Tuple[any, any, Iterator]:
+    """Start one streaming completion and wait for its first chunk."""
+    stream = client.chat.completions.create(**request)
+    chunks = iter(stream)
+    try:
+        first_chunk = next(chunks, None)
+    except BaseException:
+        stream.close()  # Release the pooled connection before any retry
+        raise
+    return stream, first_chunk, chunks
+
+
+def _open_hedged(client, request: Dict, model: str, reserved_tokens: int, stats: Dict) -> Tuple[any, any, Iterator]:
+    """
+    Start a streaming completion, firing a second (hedge) request if the first
+    chunk does not arrive before the hedge deadline. The first stream to produce
+    a chunk wins; the other is closed.
+    
+    The losing request's reservation is settled here: it is charged its prompt
+    tokens (recorded in stats['hedge_tokens']), or nothing if it failed, and
+    taken out of stats['reserved_tokens'].
+    """
+    results = queue.Queue()
+    lock = threading.Lock()
+    state = {"winner": None, "streams": {}}
+    
+    def attempt(attempt_id: int):
+        try:
+            stream = client.chat.completions.create(**request)
+            with lock:
+                if state["winner"] is not None:
+                    stream.close()
+                    return
+                state["streams"][attempt_id] = stream
+            chunks = iter(stream)
+            first_chunk = next(chunks, None)
+        except Exception as e:
+            with lock:
+                failed = state["streams"].pop(attempt_id, None)
+            if failed is not None:
+                failed.close()  # Release the pooled connection
+            results.put(("error", attempt_id, e))
+            return
+        
+        with lock:
+            won = state["winner"] is None
+            if won:
+                state["winner"] = attempt_id
+        if won:
+            results.put(("ok", attempt_id, (stream, first_chunk, chunks)))
+        else:
+            stream.close()
+    
+    threading.Thread(target=attempt, args=(0,), daemon=True).start()
+    launched = 1
+    errors = []
+    timeout = get_hedge_deadline(model)
+    
+    while True:
+        try:
+            kind, attempt_id, payload = results.get(timeout=timeout)
+        except queue.Empty:
+            timeout = None
+            if get_admission_controller().try_acquire(model, reserved_tokens):
+                threading.Thread(target=attempt, args=(1,), daemon=True).start()
+                launched += 1
+                stats["hedged"] = True
+                stats["reserved_tokens"] += reserved_tokens
+                print(f"⚠️ No first token from {model} within hedge deadline; sent hedge request")
+            continue
+        
+        if kind == "ok":
+            stats["hedge_won"] = attempt_id == 1
+            with lock:
+                losers = [s for i, s in state["streams"].items() if i != attempt_id]
+            for loser in losers:
+                try:
+                    loser.close()  # Cancel the slower request
+                except Exception:
+                    pass
+            if launched > 1:
+                # The loser was sent unless it failed; its prompt was processed upstream
+                charged = 0 if errors else count_message_tokens(request["messages"], model)
+                get_admission_controller().settle(model, reserved_tokens, charged)
+                stats["reserved_tokens"] -= reserved_tokens
+                stats["hedge_tokens"] = charged
+            return payload
+        
+        errors.append(payload)
+        if len(errors) == launched:
+            raise errors[0]
+
+
+def open_chat_stream(
+    client,
+    request: Dict,
+    model: str,
+    reserved_tokens: int,
+    stats: Dict[str, any],
+    hedge: Optional[bool] = None
+) -> Tuple[any, Iterator]:
+    """
+    Open a streaming chat completion with retries and optional hedging.
+    
+    Transient errors (429, 5xx, connection errors) that happen before the first
+    chunk are retried with jittered exponential backoff; each retry goes back
+    through admission control. Errors after streaming has started are not retried.
+    Every retry and hedge reserves tokens again; the running total is kept in
+    stats['reserved_tokens'], and the caller settles all of it against the
+    tokens actually used.
+    
+    Args:
+        client: OpenAI client
+        request: Keyword arguments for chat.completions.create
+        model: Model name (for admission control and TTFT tracking)
+        reserved_tokens: Tokens reserved per attempt (the first one by the caller)
+        stats: Dict updated in place with 'retries', 'hedged', 'hedge_won', 'ttft'
+               and 'reserved_tokens' (total reserved across attempts)
+        hedge: Enable hedging (default: OPENAI_HEDGING)
+    
+    Returns:
+        Tuple of (stream, iterator over all chunks including the first)
+    """
+    hedge = HEDGING_ENABLED if hedge is None else hedge
+    stats.setdefault("retries", 0)
+    stats.setdefault("hedged", False)
+    stats.setdefault("hedge_won", False)
+    stats.setdefault("reserved_tokens", reserved_tokens)
+    
+    attempt = 0
+    while True:
+        start_time = time.time()
+        try:
+            if hedge:
+                stream, first_chunk, chunks = _open_hedged(client, request, model, reserved_tokens, stats)
+            else:
+                stream, first_chunk, chunks = _open_single(client, request)
+        except Exception as e:
+            if attempt + 1 >= RETRY_MAX_ATTEMPTS or not _is_retryable(e):
+                raise
+            delay = _backoff_delay(attempt, e)
+            print(f"⚠️ OpenAI call failed ({e}); retry {attempt + 1}/{RETRY_MAX_ATTEMPTS - 1} in {delay:.2f}s")
+            time.sleep(delay)
+            attempt += 1
+            stats["retries"] = attempt
+            get_admission_controller().acquire(model, reserved_tokens)
+            stats["reserved_tokens"] += reserved_tokens
+            continue
+        
+        ttft = time.time() - start_time
+        _ttft_tracker.record(model, ttft)
+        stats["ttft"] = ttft
+        
+        if first_chunk is None:
+            return stream, chunks
+        return stream, itertools.chain([first_chunk], chunks)
+
+
+_routing_config = None
+
+def get_routing_config() -> Dict[str, any]:
+    """
+    Get the model routing rules and fallback chains.
+    Loaded once from MODEL_ROUTER_CONFIG if set, otherwise the built-in defaults.
+    
+    Returns:
+        Dictionary with 'rules' and 'fallbacks' keys
+    """
+    global _routing_config
+    if _routing_config is None:
+        config = {"rules": MODEL_ROUTING_RULES, "fallbacks": MODEL_FALLBACKS}
+        config_path = os.getenv("MODEL_ROUTER_CONFIG")
+        if config_path:
+            try:
+                with open(config_path, "r", encoding="utf-8") as f:
+                    config.update(json.load(f))
+            except Exception as e:
+                print(f"❌ Error loading router config {config_path}, using defaults: {e}")
+        _routing_config = config
+    return _routing_config
+
+
+def extract_routing_features(
+    messages: List[Dict[str, str]],
+    model: str,
+    history_length: int,
+    retrieved: Optional[List[Dict]] = None,
+    web_results: Optional[List[Dict]] = None,
+    safety_category: Optional[str] = None
+) -> Dict[str, any]:
+    """
+    Compute the cheap per-turn features the router decides on.
+    
+    Args:
+        messages: Composed chat messages (system + history + user)
+        model: Model whose tokenizer to count with
+        history_length: Number of earlier messages in the session
+        retrieved: RAG documents included in the prompt
+        web_results: Web results included in the prompt
+        safety_category: Refusal category the (allowed) request came close
+                         to, if any (semantic safety near miss)
+    
+    Returns:
+        Feature dictionary
+    """
+    has_rag = bool(retrieved)
+    has_web = bool(web_results)
+    return {
+        "prompt_tokens": count_message_tokens(messages, model),
+        "history_length": history_length,
+        "has_rag": has_rag,
+        "has_web": has_web,
+        "has_context": has_rag or has_web,
+        "safety_category": safety_category,
+    }
+
+
+def _rule_matches(conditions: Dict[str, any], features: Dict[str, any]) -> bool:
+    """Check whether every condition of a routing rule holds for the features."""
+    for key, expected in conditions.items():
+        if key == "min_prompt_tokens" and features["prompt_tokens"] < expected:
+            return False
+        if key == "max_prompt_tokens" and features["prompt_tokens"] > expected:
+            return False
+        if key == "min_history" and features["history_length"] < expected:
+            return False
+        if key == "max_history" and features["history_length"] > expected:
+            return False
+        if key in ("has_context", "has_rag", "has_web") and features[key] != expected:
+            return False
+        if key == "safety_category":
+            allowed = expected if isinstance(expected, list) else [expected]
+            if features["safety_category"] not in allowed:
+                return False
+    return True
+
+
+def route_model(features: Dict[str, any], default_model: str, enabled: bool = True) -> Dict[str, any]:
+    """
+    Pick a model for this turn from the routing rules.
+    
+    Args:
+        features: Output of extract_routing_features
+        default_model: Model to use when no rule matches (the user's selection)
+        enabled: If False, keep the default model (fallbacks still apply)
+    
+    Returns:
+        Routing decision with 'model', 'rule', 'fallbacks' and 'features'
+    """
+    config = get_routing_config()
+    model, rule_name = default_model, "default" if enabled else "manual"
+    
+    for rule in config["rules"] if enabled else []:
+        if rule.get("model") in MODEL_PRICING and _rule_matches(rule.get("when", {}), features):
+            model, rule_name = rule["model"], rule.get("name", "unnamed")
+            break
+    
+    return {
+        "model": model,
+        "rule": rule_name,
+        "requested_model": default_model,
+        "fallbacks": list(config["fallbacks"].get(model, [])),
+        "features": features,
+    }
+
+
 def stream_chat(
     messages: List[Dict[str, str]],
     model: str = "gpt-4o-mini",
@@ -139,37 +1076,93 @@ def stream_chat(
             "error": True
         }
     
+    # Wait for rate-limit capacity instead of failing with a 429
+    reserved_tokens = _reserve_tokens(messages, max_tokens, model)
+    controller = get_admission_controller()
+    try:
+        queue_wait = controller.acquire(model, reserved_tokens)
+    except AdmissionTimeout as e:
+        error_msg = f"⏳ Too many requests right now: {str(e)}"
+        return error_msg, {
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "cost": 0.0,
+            "latency": 0.0,
+            "model": model,
+            "error": True,
+            "error_message": str(e),
+            "queue_wait": controller.max_wait
+        }
+    
     start_time = time.time()
     full_response = ""
+    resilience = {"reserved_tokens": reserved_tokens}  # Retries and hedges add their reservations
+    usage = None
+    finish_reason = None
+    settled = False
     
     try:
-        # Create streaming completion
-        stream = client.chat.completions.create(
+        # Create streaming completion (with retries and optional hedging)
+        stream, chunks = open_chat_stream(
+            client,
+            request={
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "stream": True,
+                "stream_options": {"include_usage": True}
+            },
             model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            stream=True
+            reserved_tokens=reserved_tokens,
+            stats=resilience
         )
         
-        # Stream tokens
-        for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                token = chunk.choices[0].delta.content
-                full_response += token
-                yield token
+        # Stream tokens (the final chunk carries usage and no choices).
+        # Closing the stream on exit stops generation if the consumer stops early.
+        guard = create_output_guard()
+        shown = 0  # Characters yielded so far
+        try:
+            for chunk in chunks:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    token = chunk.choices[0].delta.content
+                    full_response += token
+                    # Output safety check on the new token only, before it is shown
+                    if guard is not None and guard.feed(token):
+                        finish_reason = "output_guard"
+                        break
+                    release = guard.releasable(len(full_response)) if guard is not None else len(full_response)
+                    if release > shown:
+                        yield full_response[shown:release]
+                        shown = release
+        finally:
+            stream.close()
         
         end_time = time.time()
         latency = end_time - start_time
         
-        # Estimate token counts (more accurate would be to use tiktoken)
-        # Calculate input tokens from all messages
-        input_text = " ".join([msg["content"] for msg in messages])
-        tokens_in = estimate_tokens(input_text)
-        tokens_out = estimate_tokens(full_response)
+        # Use server-reported usage, falling back to the local tokenizer
+        # (counted before the guard edits the text; a stopped stream has no usage)
+        tokens_in, tokens_out, usage_source = _resolve_usage(usage, messages, full_response, model)
+        settled = True
+        controller.settle(model, resilience["reserved_tokens"], tokens_in + tokens_out)
+        
+        guard_stats = {}
+        if guard is not None:
+            guarded = guard.finish(full_response)
+            # Held-back text, the annotation or the stop message
+            yield guarded[len(os.path.commonprefix([guarded, full_response[:shown]])):]
+            full_response = guarded
+            guard_stats = {"output_guard": guard.get_stats()}
         
         # Calculate cost
         cost = calculate_cost(tokens_in, tokens_out, model)
+        if finish_reason != "output_guard":
+            _output_tokens_tracker.record(model, tokens_out)
         
         metadata = {
             "tokens_in": tokens_in,
@@ -177,17 +1170,48 @@ def stream_chat(
             "cost": cost,
             "latency": latency,
             "model": model,
-            "error": False
+            "error": False,
+            "usage_source": usage_source,
+            "finish_reason": finish_reason,
+            "max_tokens": max_tokens,
+            "queue_wait": queue_wait,
+            **guard_stats,
+            **resilience
         }
         
         return full_response, metadata
+    
+    except GeneratorExit:
+        # The consumer stopped reading; the stream is closed, settle what was used
+        if not settled:
+            controller.settle(model, resilience["reserved_tokens"], _used_tokens(usage, messages, full_response, model))
+        raise
+    
+    except AdmissionTimeout as e:
+        # A retry could not get back through the rate-limit queue in time
+        controller.settle(model, resilience["reserved_tokens"], 0)
+        error_msg = f"⏳ Too many requests right now: {str(e)}"
+        return error_msg, {
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "cost": 0.0,
+            "latency": time.time() - start_time,
+            "model": model,
+            "error": True,
+            "error_message": str(e),
+            "queue_wait": queue_wait,
+            **resilience
+        }
         
     except Exception as e:
         end_time = time.time()
         latency = end_time - start_time
+        if not settled:
+            controller.settle(model, resilience["reserved_tokens"], _used_tokens(usage, messages, full_response, model))
         
         error_msg = f"❌ Error calling OpenAI API: {str(e)}"
-        st.error(error_msg)
+        if st:
+            st.error(error_msg)
         
         return error_msg, {
             "tokens_in": 0,
@@ -196,26 +1220,34 @@ def stream_chat(
             "latency": latency,
             "model": model,
             "error": True,
-            "error_message": str(e)
+            "error_message": str(e),
+            "queue_wait": queue_wait,
+            **resilience
         }
 
 
-def stream_chat_to_streamlit(
+def stream_chat_to_sink(
     messages: List[Dict[str, str]],
-    placeholder,  # st.delta_generator.DeltaGenerator
+    sink: TokenSink,
     model: str = "gpt-4o-mini",
     temperature: float = 0.7,
-    max_tokens: Optional[int] = None
+    max_tokens: Optional[int] = None,
+    fallback_models: Optional[List[str]] = None,
+    cancel_token: Optional[CancellationToken] = None
 ) -> Tuple[str, Dict[str, any]]:
     """
-    Stream chat completion directly to a Streamlit placeholder.
+    Stream chat completion into a TokenSink.
     
     Args:
         messages: List of message dicts with 'role' and 'content'
-        placeholder: Streamlit empty() placeholder to stream into
+        sink: Receives queued state, tokens and the final text
         model: OpenAI model to use
         temperature: Sampling temperature (0.0 - 2.0)
         max_tokens: Maximum tokens to generate (None = no limit)
+        fallback_models: Models to try in order if this one errors before
+                         any tokens were streamed
+        cancel_token: Optional token; once cancelled, the upstream stream is
+                      closed and the partial response returned
     
     Returns:
         Tuple of (full_response: str, metadata: dict)
@@ -223,7 +1255,7 @@ def stream_chat_to_streamlit(
     client = get_openai_client()
     if client is None:
         error_msg = "⚠️ OpenAI client not available. Check API key configuration."
-        placeholder.markdown(error_msg)
+        sink.on_complete(error_msg)
         return error_msg, {
             "tokens_in": 0,
             "tokens_out": 0,
@@ -233,40 +1265,128 @@ def stream_chat_to_streamlit(
             "error": True
         }
     
+    # Wait for rate-limit capacity instead of failing with a 429
+    reserved_tokens = _reserve_tokens(messages, max_tokens, model)
+    controller = get_admission_controller()
+    
+    try:
+        queue_wait = controller.acquire(model, reserved_tokens, on_queued=sink.on_queued)
+    except AdmissionTimeout as e:
+        error_msg = ADMISSION_TIMEOUT_MESSAGE
+        sink.on_complete(error_msg)
+        return error_msg, {
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "cost": 0.0,
+            "latency": 0.0,
+            "model": model,
+            "error": True,
+            "error_message": str(e),
+            "queue_wait": controller.max_wait
+        }
+    
     start_time = time.time()
     full_response = ""
+    resilience = {"reserved_tokens": reserved_tokens}  # Retries and hedges add their reservations
+    usage = None
+    finish_reason = None
+    guard = None
+    settled = False
+    
+    def settle(used_tokens: int):
+        """Return unused reserved tokens to the rate-limit buckets (once per call)."""
+        nonlocal settled
+        if not settled:
+            settled = True
+            controller.settle(model, resilience["reserved_tokens"], used_tokens)
+    
+    def finish_guard(metadata: Dict[str, any]) -> str:
+        """Check held-back text on the way out; the guard's result is what may be shown."""
+        nonlocal guard
+        if guard is None:
+            return full_response
+        guarded = guard.finish(full_response)
+        metadata["output_guard"] = guard.get_stats()
+        guard = None  # Finished once per answer
+        return guarded
     
     try:
-        # Create streaming completion
-        stream = client.chat.completions.create(
+        # Create streaming completion (with retries and optional hedging)
+        stream, chunks = open_chat_stream(
+            client,
+            request={
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+                "stream": True,
+                "stream_options": {"include_usage": True}
+            },
             model=model,
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            stream=True
+            reserved_tokens=reserved_tokens,
+            stats=resilience
         )
         
-        # Stream tokens to placeholder
-        for chunk in stream:
-            if chunk.choices[0].delta.content is not None:
-                token = chunk.choices[0].delta.content
-                full_response += token
-                # Update placeholder with accumulated response
-                placeholder.markdown(full_response + "▌")
+        # Stream tokens to the sink (the final chunk carries usage and no choices)
+        cancelled = False
+        guard = create_output_guard()
+        
+        shown = 0  # Characters sent to the sink so far
+        try:
+            for chunk in chunks:
+                if cancel_token is not None and cancel_token.cancelled:
+                    cancelled = True
+                    break
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    finish_reason = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    token = chunk.choices[0].delta.content
+                    full_response += token
+                    # Output safety check on the new token only, before it is shown
+                    if guard is not None and guard.feed(token):
+                        finish_reason = "output_guard"
+                        break
+                    # In stop mode the guard holds back a possible phrase's length
+                    # (sent with on_complete)
+                    release = guard.releasable(len(full_response)) if guard is not None else len(full_response)
+                    if release > shown:
+                        sink.on_token(full_response[shown:release], full_response[:release])
+                        shown = release
+        finally:
+            # Stop paying for tokens nobody will read
+            stream.close()
+        
+        if cancelled:
+            metadata = _cancelled_metadata(
+                messages, full_response, model, max_tokens, start_time,
+                cancel_token.reason, {"queue_wait": queue_wait, **resilience}
+            )
+            settle(metadata["tokens_in"] + metadata["tokens_out"])
+            full_response = finish_guard(metadata)
+            sink.on_complete(full_response + "\n\n*⏹️ Generation stopped.*")
+            return full_response, metadata
+        
+        # Use server-reported usage, falling back to the local tokenizer
+        # (counted before the guard edits the text; a stopped stream has no usage)
+        tokens_in, tokens_out, usage_source = _resolve_usage(usage, messages, full_response, model)
+        
+        guard_stats = {}
+        full_response = finish_guard(guard_stats)
         
         # Final update without cursor
-        placeholder.markdown(full_response)
+        sink.on_complete(full_response)
         
         end_time = time.time()
         latency = end_time - start_time
         
-        # Estimate token counts
-        input_text = " ".join([msg["content"] for msg in messages])
-        tokens_in = estimate_tokens(input_text)
-        tokens_out = estimate_tokens(full_response)
-        
         # Calculate cost
         cost = calculate_cost(tokens_in, tokens_out, model)
+        settle(tokens_in + tokens_out)
+        if finish_reason != "output_guard":
+            # A stopped answer says nothing about how long answers run
+            _output_tokens_tracker.record(model, tokens_out)
         
         metadata = {
             "tokens_in": tokens_in,
@@ -274,14 +1394,55 @@ def stream_chat_to_streamlit(
             "cost": cost,
             "latency": latency,
             "model": model,
-            "error": False
+            "error": False,
+            "usage_source": usage_source,
+            "finish_reason": finish_reason,
+            "max_tokens": max_tokens,
+            "queue_wait": queue_wait,
+            **guard_stats,
+            **resilience
         }
         
         return full_response, metadata
+    
+    except AdmissionTimeout as e:
+        # A retry could not get back through the rate-limit queue in time
+        settle(0)
+        sink.on_complete(ADMISSION_TIMEOUT_MESSAGE)
+        return ADMISSION_TIMEOUT_MESSAGE, {
+            "tokens_in": 0,
+            "tokens_out": 0,
+            "cost": 0.0,
+            "latency": time.time() - start_time,
+            "model": model,
+            "error": True,
+            "error_message": str(e),
+            "queue_wait": queue_wait,
+            **resilience
+        }
         
     except Exception as e:
         end_time = time.time()
         latency = end_time - start_time
+        settle(_used_tokens(usage, messages, full_response, model))
+        if guard is not None and full_response:
+            guard.finish(full_response)  # Held-back text is dropped with the partial answer
+        
+        # Fall back to the next model if nothing has been shown yet
+        if fallback_models and not full_response:
+            next_model = fallback_models[0]
+            print(f"⚠️ {model} failed ({e}); falling back to {next_model}")
+            response, metadata = stream_chat_to_sink(
+                messages=messages,
+                sink=sink,
+                model=next_model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                fallback_models=fallback_models[1:],
+                cancel_token=cancel_token
+            )
+            metadata["fallback_from"] = [model] + metadata.get("fallback_from", [])
+            return response, metadata
         
         error_msg = f"❌ Error calling OpenAI API: {str(e)}\n\n"
         error_msg += "Please check:\n"
@@ -289,7 +1450,7 @@ def stream_chat_to_streamlit(
         error_msg += "2. Your API key has available credits\n"
         error_msg += "3. You have access to the selected model"
         
-        placeholder.markdown(error_msg)
+        sink.on_complete(error_msg)
         
         return error_msg, {
             "tokens_in": 0,
@@ -298,8 +1459,60 @@ def stream_chat_to_streamlit(
             "latency": latency,
             "model": model,
             "error": True,
-            "error_message": str(e)
+            "error_message": str(e),
+            "queue_wait": queue_wait,
+            **resilience
         }
+    
+    except BaseException:
+        # Interrupted anywhere after admission (e.g. a Streamlit rerun during a
+        # retry backoff, the hedge wait or the stream): settle the reservation and
+        # leave the partial turn on the token for logging. The token is not
+        # cancelled here so the caller's reason is kept.
+        metadata = _cancelled_metadata(
+            messages, full_response, model, max_tokens, start_time,
+            (cancel_token.reason if cancel_token is not None else None) or "interrupted",
+            {"queue_wait": queue_wait, **resilience}
+        )
+        settle(metadata["tokens_in"] + metadata["tokens_out"])
+        if cancel_token is not None:
+            cancel_token.partial = (finish_guard(metadata), metadata)
+        raise
+
+
+def stream_chat_to_streamlit(
+    messages: List[Dict[str, str]],
+    placeholder,  # st.delta_generator.DeltaGenerator
+    model: str = "gpt-4o-mini",
+    temperature: float = 0.7,
+    max_tokens: Optional[int] = None,
+    fallback_models: Optional[List[str]] = None,
+    cancel_token: Optional[CancellationToken] = None
+) -> Tuple[str, Dict[str, any]]:
+    """
+    Stream chat completion directly to a Streamlit placeholder.
+    
+    Args:
+        messages: List of message dicts with 'role' and 'content'
+        placeholder: Streamlit empty() placeholder to stream into
+        model: OpenAI model to use
+        temperature: Sampling temperature (0.0 - 2.0)
+        max_tokens: Maximum tokens to generate (None = no limit)
+        fallback_models: Models to try in order if this one errors
+        cancel_token: Optional token to stop the generation
+    
+    Returns:
+        Tuple of (full_response: str, metadata: dict)
+    """
+    return stream_chat_to_sink(
+        messages=messages,
+        sink=PlaceholderSink(placeholder),
+        model=model,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        fallback_models=fallback_models,
+        cancel_token=cancel_token
+    )
 
 
 def get_available_models() -> List[str]:
@@ -7,15 +7,23 @@ import os
 import json
 import time
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from pathlib import Path
-import streamlit as st
+
+try:
+    import streamlit as st
+except ImportError:
+    st = None
+
+from .llm import get_context_window
 
 
 # Configuration
 LOGS_DIR = Path("logs")
 MAX_TOKENS_PER_SESSION = 50000  # Soft cap for POC
 TOKEN_WARNING_THRESHOLD = 0.8  # Warn at 80% of max
+MAX_OUTPUT_TOKENS_PER_TURN = int(os.getenv("MAX_OUTPUT_TOKENS_PER_TURN", "1500"))
+MIN_ANSWER_TOKENS = 150  # Below this, an answer isn't worth starting
 
 
 class SessionObserver:
@@ -49,6 +57,21 @@ class SessionObserver:
                 - search_used: Whether search was used
                 - cost: Turn cost in USD
                 - refused: Whether request was refused
+                - queue_wait: Seconds spent in the rate-limit queue
+                - usage_source: 'api' if token counts were reported by the server
+                - retries / hedged / hedge_won / ttft: LLM call resilience stats
+                - routing_rule / requested_model / routing_features / fallback_from:
+                  model router decision for the turn
+                - cancelled / cancel_reason / tokens_saved / cost_saved:
+                  generation abandoned mid-stream and the estimated savings
+                - max_tokens / budget_capped_by / finish_reason: output budget
+                  applied to the turn and whether the answer hit it
+                - context_timings / context_timed_out / context_wall_time:
+                  per-source timing of the concurrent context stage
+                - stage_timings: seconds per chat pipeline stage
+                - pi_redactions: count of redacted items per PI type
+                - output_guard: output safety guard result and per-token overhead
+                - semantic_safety: embedding safety check result and added latency
         """
         # Create log entry
         log_entry = {
@@ -57,18 +80,42 @@ class SessionObserver:
             "tokens_in": meta.get("token_in", 0),
             "tokens_out": meta.get("token_out", 0),
             "total_tokens": meta.get("token_in", 0) + meta.get("token_out", 0),
+            "usage_source": meta.get("usage_source", "tokenizer"),
             "latency": meta.get("latency", 0.0),
+            "queue_wait": meta.get("queue_wait", 0.0),
+            "ttft": meta.get("ttft"),
+            "retries": meta.get("retries", 0),
+            "hedged": meta.get("hedged", False),
+            "hedge_won": meta.get("hedge_won", False),
             "model": meta.get("model", "unknown"),
+            "requested_model": meta.get("requested_model", meta.get("model", "unknown")),
+            "routing_rule": meta.get("routing_rule"),
+            "routing_features": meta.get("routing_features", {}),
+            "fallback_from": meta.get("fallback_from", []),
             "temperature": meta.get("temperature", 0.7),
             "rag_used": meta.get("rag_used", False),
             "rag_docs_retrieved": meta.get("rag_docs_retrieved", 0),
             "search_used": meta.get("search_used", False),
             "search_results": meta.get("search_results", 0),
+            "context_timings": meta.get("context_timings", {}),
+            "context_timed_out": meta.get("context_timed_out", []),
+            "context_wall_time": meta.get("context_wall_time", 0.0),
             "voice_used": meta.get("voice_used", False),
             "listening_mode": meta.get("listening_mode", False),
             "cost": meta.get("cost", 0.0),
             "refused": meta.get("refused", False),
+            "max_tokens": meta.get("max_tokens"),
+            "budget_capped_by": meta.get("budget_capped_by"),
+            "finish_reason": meta.get("finish_reason"),
+            "cancelled": meta.get("cancelled", False),
+            "cancel_reason": meta.get("cancel_reason"),
+            "tokens_saved": meta.get("tokens_saved", 0),
+            "cost_saved": meta.get("cost_saved", 0.0),
             "citations_count": len(meta.get("citations", [])),
+            "stage_timings": meta.get("stage_timings", {}),
+            "pi_redactions": meta.get("pi_redactions", {}),
+            "output_guard": meta.get("output_guard"),
+            "semantic_safety": meta.get("semantic_safety", {}),
         }
         
         # Determine log file (one per day)
@@ -82,46 +129,36 @@ class SessionObserver:
         except Exception as e:
             print(f"❌ Error writing to log file: {e}")
     
-    def get_session_metrics(self) -> Dict[str, Any]:
+    def get_session_metrics(
+        self,
+        messages: Optional[List[Dict[str, Any]]] = None,
+        metrics: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Calculate session metrics from session state.
         
+        Args:
+            messages: Conversation messages; read from the Streamlit session if None
+                (empty metrics when Streamlit isn't installed)
+            metrics: Running token/cost totals; read from the Streamlit session if None
+        
         Returns:
             Dictionary with session statistics
         """
-        if "messages" not in st.session_state or "metrics" not in st.session_state:
-            return {
-                "total_requests": 0,
-                "total_tokens_in": 0,
-                "total_tokens_out": 0,
-                "total_tokens": 0,
-                "total_cost": 0.0,
-                "avg_latency": 0.0,
-                "requests_count": 0,
-                "rag_requests": 0,
-                "search_requests": 0,
-                "refused_requests": 0,
-            }
+        if messages is None or metrics is None:
+            if st is None or "messages" not in st.session_state or "metrics" not in st.session_state:
+                return self._empty_session_metrics()
+            messages = st.session_state.messages
+            metrics = st.session_state.metrics
         
         # Count different types of messages
         assistant_messages = [
-            msg for msg in st.session_state.messages 
+            msg for msg in messages
             if msg.get("role") == "assistant"
         ]
         
         if not assistant_messages:
-            return {
-                "total_requests": 0,
-                "total_tokens_in": 0,
-                "total_tokens_out": 0,
-                "total_tokens": 0,
-                "total_cost": 0.0,
-                "avg_latency": 0.0,
-                "requests_count": 0,
-                "rag_requests": 0,
-                "search_requests": 0,
-                "refused_requests": 0,
-            }
+            return self._empty_session_metrics()
         
         # Calculate metrics from messages
         latencies = []
@@ -144,9 +181,6 @@ class SessionObserver:
             if meta.get("refused", False):
                 refused_count += 1
         
-        # Get totals from session state metrics
-        metrics = st.session_state.metrics
-        
         return {
             "total_requests": len(assistant_messages),
             "total_tokens_in": metrics.get("token_in", 0),
@@ -160,10 +194,28 @@ class SessionObserver:
             "refused_requests": refused_count,
         }
     
-    def check_token_limit(self) -> Dict[str, Any]:
+    @staticmethod
+    def _empty_session_metrics() -> Dict[str, Any]:
+        return {
+            "total_requests": 0,
+            "total_tokens_in": 0,
+            "total_tokens_out": 0,
+            "total_tokens": 0,
+            "total_cost": 0.0,
+            "avg_latency": 0.0,
+            "requests_count": 0,
+            "rag_requests": 0,
+            "search_requests": 0,
+            "refused_requests": 0,
+        }
+    
+    def check_token_limit(self, total_tokens: Optional[int] = None) -> Dict[str, Any]:
         """
         Check if session is approaching or exceeding token limit.
         
+        Args:
+            total_tokens: Tokens used so far; read from the Streamlit session if None
+        
         Returns:
             Dictionary with:
                 - exceeded: bool
@@ -172,8 +224,8 @@ class SessionObserver:
                 - percentage: float
                 - message: str
         """
-        metrics = self.get_session_metrics()
-        total_tokens = metrics["total_tokens"]
+        if total_tokens is None:
+            total_tokens = self.get_session_metrics()["total_tokens"]
         
         percentage = total_tokens / MAX_TOKENS_PER_SESSION
         remaining = MAX_TOKENS_PER_SESSION - total_tokens
@@ -207,6 +259,78 @@ class SessionObserver:
             "total_tokens": total_tokens,
         }
 
+    
+    def plan_turn_budget(self, prompt_tokens: int, total_tokens: Optional[int] = None,
+                         model: str = "gpt-4o-mini",
+                         max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Predict how many output tokens the next answer may use.
+        
+        Caps max_tokens to whatever remains of the session budget and of the
+        model's context window after the prompt, so a single answer can't
+        overshoot. Only the answer is limited: a long prompt is fine as long
+        as the model can take it.
+        
+        Args:
+            prompt_tokens: Tokens in the composed prompt for this turn
+            total_tokens: Session tokens used so far; read from the Streamlit session if None
+            model: Model the turn is routed to (for its context window)
+            max_output_tokens: Per-turn answer cap; MAX_OUTPUT_TOKENS_PER_TURN if None
+        
+        Returns:
+            Dictionary with:
+                - allowed: bool (False if not even a short answer fits)
+                - max_tokens: int to pass to the LLM call
+                - capped_by: 'session', 'context' or 'output'
+                - message: str to show if the answer is cut short by the cap
+                           (or why no answer can be started)
+        """
+        session_room = self.check_token_limit(total_tokens)["remaining"] - prompt_tokens
+        context_room = get_context_window(model) - prompt_tokens
+        
+        max_tokens, capped_by = max_output_tokens or MAX_OUTPUT_TOKENS_PER_TURN, "output"
+        if context_room < max_tokens:
+            max_tokens, capped_by = context_room, "context"
+        if session_room < max_tokens:
+            max_tokens, capped_by = session_room, "session"
+        
+        allowed = max_tokens >= MIN_ANSWER_TOKENS
+        
+        if not allowed and capped_by == "session":
+            message = (
+                f"⚠️ **Session token limit reached ({MAX_TOKENS_PER_SESSION:,} tokens).**\n\n"
+                f"There isn't enough of your session budget left for a complete answer. "
+                f"Please clear your chat history to continue.\n\n"
+                f"Click the **🗑️ Clear Chat** button in the sidebar to start fresh."
+            )
+        elif not allowed:
+            message = (
+                f"⚠️ **This conversation no longer fits {model}'s context window.**\n\n"
+                "Please clear your chat history or ask a shorter question."
+            )
+        elif capped_by == "session":
+            message = (
+                "✂️ This answer was shortened to fit the rest of your session token budget. "
+                "Clear the chat to start a fresh session."
+            )
+        elif capped_by == "context":
+            message = (
+                "✂️ This answer was shortened because the conversation nearly fills the model's context window. "
+                "Clear the chat or ask a more specific question."
+            )
+        else:
+            message = (
+                "✂️ This answer reached the maximum length for a single reply. "
+                "Ask me to continue for more detail."
+            )
+        
+        return {
+            "allowed": allowed,
+            "max_tokens": max(0, max_tokens),
+            "capped_by": capped_by,
+            "message": message,
+        }
+
 
 # Global observer instance
 _observer = None
@@ -223,15 +347,25 @@ def log_turn(meta: Dict[str, Any]):
     observer = get_observer()
     observer.log_turn(meta)
 
-def get_session_metrics() -> Dict[str, Any]:
+def get_session_metrics(
+    messages: Optional[List[Dict[str, Any]]] = None,
+    metrics: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
     """Convenience function to get session metrics."""
     observer = get_observer()
-    return observer.get_session_metrics()
+    return observer.get_session_metrics(messages, metrics)
 
-def check_token_limit() -> Dict[str, Any]:
+def check_token_limit(total_tokens: Optional[int] = None) -> Dict[str, Any]:
     """Convenience function to check token limit."""
     observer = get_observer()
-    return observer.check_token_limit()
+    return observer.check_token_limit(total_tokens)
+
+def plan_turn_budget(prompt_tokens: int, total_tokens: Optional[int] = None,
+                     model: str = "gpt-4o-mini",
+                     max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+    """Convenience function to plan the output budget for a turn."""
+    observer = get_observer()
+    return observer.plan_turn_budget(prompt_tokens, total_tokens, model, max_output_tokens)
 
 def should_allow_streaming() -> bool:
     """Check if streaming should be allowed based on token limit."""
@@ -0,0 +1,203 @@
+"""
+Output-side safety guard for WellNavigator.
+Watches the streamed LLM answer for prescriptive dosing or diagnostic
+language and either annotates the answer or stops it.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Any, List, Optional
+
+from .keywords import KeywordAutomaton, KeywordMatch
+from .safety import (
+    OUTPUT_GUARD_CATEGORY_KEYWORDS,
+    OUTPUT_DOSING_LEAD_INS,
+    OUTPUT_DOSE_PATTERN,
+    OUTPUT_DOSE_WINDOW,
+)
+
+# "annotate" adds a caution to flagged answers, "stop" ends the answer at the
+# flagged phrase, "off" disables the guard
+OUTPUT_GUARD_MODE = os.getenv("OUTPUT_GUARD_MODE", "annotate").lower()
+
+OUTPUT_GUARD_ANNOTATION = (
+    "\n\n---\n⚠️ *Parts of this answer may read like specific dosing or diagnostic advice. "
+    "Only your healthcare provider can diagnose you or tell you what to take and how much.*"
+)
+OUTPUT_GUARD_STOP_MESSAGE = (
+    "\n\n*⚠️ I stopped this answer because it was heading toward specific dosing or "
+    "diagnostic advice, which I can't give. Please ask your doctor or pharmacist.*"
+)
+
+
+# Automaton category of dosing lead-ins (confirmed by a dose after them)
+_LEAD_IN = "dosing_lead_in"
+
+_automaton = None
+_automaton_lock = threading.Lock()
+
+def get_output_automaton(rebuild: bool = False) -> KeywordAutomaton:
+    """Get the keyword automaton for output categories and dosing lead-ins, built on first use."""
+    global _automaton
+    with _automaton_lock:
+        if _automaton is None or rebuild:
+            _automaton = KeywordAutomaton(OUTPUT_GUARD_CATEGORY_KEYWORDS + [(_LEAD_IN, OUTPUT_DOSING_LEAD_INS)])
+    return _automaton
+
+
+class OutputGuard:
+    """
+    Incremental check of one streamed answer.
+
+    Each token is fed to a KeywordStream, so phrases split across tokens are
+    caught without rescanning the text streamed so far. A dosing lead-in
+    ("you should take") is only flagged once a dose follows it within
+    OUTPUT_DOSE_WINDOW characters; the match then spans lead-in and dose.
+    """
+
+    def __init__(self, mode: Optional[str] = None):
+        self.mode = mode or OUTPUT_GUARD_MODE
+        automaton = get_output_automaton()
+        self._stream = automaton.stream()
+        self._keep = automaton.max_length + OUTPUT_DOSE_WINDOW
+        self._recent = ""  # Last _keep characters streamed, for dose checks
+        self._recent_start = 0  # Stream offset of _recent[0]
+        self._lead_ins: List[KeywordMatch] = []  # Waiting for a dose
+        # In stop mode, text a flagged match could still start in is not shown yet
+        self.holdback = self._keep if self.mode == "stop" else 0
+        self.matches: List[KeywordMatch] = []
+        self.tokens = 0
+        self.scan_time = 0.0
+        self.stopped = False
+        self.action = None
+
+    def feed(self, token: str) -> bool:
+        """
+        Check the next streamed token.
+
+        Returns:
+            True if the stream should stop (mode "stop" and a phrase matched)
+        """
+        start = time.perf_counter()
+        found = len(self.matches)
+        self._add(self._stream.feed(token))
+        self._recent += token
+        if len(self._recent) > self._keep:
+            cut = len(self._recent) - self._keep
+            self._recent = self._recent[cut:]
+            self._recent_start += cut
+        if self._lead_ins:
+            self._check_doses(final=False)
+        self.scan_time += time.perf_counter() - start
+        self.tokens += 1
+        if len(self.matches) > found and self.mode == "stop":
+            self.stopped = True
+        return self.stopped
+
+    def releasable(self, length: int) -> int:
+        """How much of a response streamed up to `length` characters may be shown now."""
+        return max(0, length - self.holdback)
+
+    def _add(self, matches: List[KeywordMatch]):
+        for match in matches:
+            if match.category == _LEAD_IN:
+                self._lead_ins.append(match)
+            else:
+                self.matches.append(match)
+
+    def _check_doses(self, final: bool):
+        """Flag lead-ins followed by a dose; drop those whose window has passed."""
+        waiting = []
+        for lead_in in self._lead_ins:
+            begin = lead_in.end - self._recent_start
+            dose = OUTPUT_DOSE_PATTERN.search(self._recent[begin:begin + OUTPUT_DOSE_WINDOW])
+            if dose:
+                self.matches.append(KeywordMatch(lead_in.keyword, "dosing", lead_in.start, lead_in.end + dose.end()))
+            elif not final and self._stream.position < lead_in.end + OUTPUT_DOSE_WINDOW:
+                waiting.append(lead_in)
+        self._lead_ins = waiting
+
+    @property
+    def flagged(self) -> bool:
+        return bool(self.matches)
+
+    def finish(self, response: str) -> str:
+        """
+        Apply the guard's action to the complete (or stopped) response.
+
+        Returns:
+            The response to show: cut at the first flagged phrase in stop
+            mode, with a caution appended in annotate mode
+        """
+        self._add(self._stream.flush())
+        if self._lead_ins:
+            self._check_doses(final=True)
+        if self.matches and self.mode == "stop":
+            self.action = "stopped"
+            cut = min(match.start for match in self.matches)
+            response = response[:cut].rstrip() + OUTPUT_GUARD_STOP_MESSAGE
+        elif self.matches:
+            self.action = "annotated"
+            response = response + OUTPUT_GUARD_ANNOTATION
+
+        _guard_metrics.record(self)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-answer stats for the turn log (phrases only, no surrounding text)."""
+        return {
+            "mode": self.mode,
+            "flagged": self.flagged,
+            "action": self.action,
+            "categories": sorted({match.category for match in self.matches}),
+            "phrases": sorted({match.keyword for match in self.matches}),
+            "tokens": self.tokens,
+            "overhead_us_per_token": (self.scan_time / self.tokens * 1e6) if self.tokens else 0.0,
+        }
+
+
+class OutputGuardMetrics:
+    """Process-wide totals: how often answers are flagged and what scanning costs."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.answers = 0
+        self.flagged = 0
+        self.stopped = 0
+        self.tokens = 0
+        self.scan_time = 0.0
+
+    def record(self, guard: OutputGuard):
+        with self._lock:
+            self.answers += 1
+            self.flagged += guard.flagged
+            self.stopped += guard.action == "stopped"
+            self.tokens += guard.tokens
+            self.scan_time += guard.scan_time
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": OUTPUT_GUARD_MODE,
+                "answers": self.answers,
+                "flagged": self.flagged,
+                "stopped": self.stopped,
+                "tokens": self.tokens,
+                "overhead_us_per_token": (self.scan_time / self.tokens * 1e6) if self.tokens else 0.0,
+            }
+
+
+# Global metrics instance
+_guard_metrics = OutputGuardMetrics()
+
+def create_output_guard(mode: Optional[str] = None) -> Optional[OutputGuard]:
+    """New guard for one answer, or None if the guard is off."""
+    mode = mode or OUTPUT_GUARD_MODE
+    if mode == "off":
+        return None
+    return OutputGuard(mode)
+
+def get_output_guard_metrics() -> Dict[str, Any]:
+    """Process-wide output guard metrics."""
+    return _guard_metrics.get_metrics()
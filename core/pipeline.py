@@ -0,0 +1,490 @@
+"""
+Chat pipeline for WellNavigator.
+Runs one chat turn (redact → analyze → safety → limits → context → prompt →
+route → budget → generate → record → log) independently of any UI.
+
+Each stage is a plain function taking the Turn; stages can be replaced or
+extended, and an optional on_stage hook receives per-stage timings.
+"""
+
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from .prompts import compose_chat_prompt
+from .safety import should_refuse, redact_pi_with_audit, medical_disclaimer, REFUSAL_TEMPLATES
+from .semantic_safety import check_semantic_safety
+from .text_analysis import TextAnalysis, analyze_text
+from .rag import is_rag_available
+from .search import is_search_available
+from .context import gather_context
+from .voice import add_to_listening_mode
+from .observe import log_turn, check_token_limit, plan_turn_budget, MAX_TOKENS_PER_SESSION
+from .llm import (
+    stream_chat_to_sink,
+    count_tokens,
+    extract_routing_features,
+    route_model,
+    CancellationToken
+)
+from .sinks import TokenSink
+
+
+# Default per-session settings (same keys the Streamlit sidebar edits)
+DEFAULT_SETTINGS = {
+    "model": "gpt-4o-mini",
+    "temperature": 0.7,
+    "auto_route": True,
+    "search_on": False,
+    "rag_on": False,
+    "voice_on": False
+}
+
+# Metadata keys copied from the LLM call into the turn's meta
+LLM_META_KEYS = (
+    "model", "usage_source", "finish_reason", "retries", "hedged", "hedge_won",
+    "ttft", "fallback_from", "cancelled", "cancel_reason", "tokens_saved", "cost_saved",
+    "output_guard"
+)
+
+
+class ChatSession:
+    """
+    Conversation state for one user.
+
+    The Streamlit app passes its session_state objects in, so both share the
+    same lists and dicts; other callers get fresh defaults.
+    """
+
+    def __init__(
+        self,
+        messages: Optional[List[Dict]] = None,
+        settings: Optional[Dict[str, Any]] = None,
+        metrics: Optional[Dict[str, Any]] = None,
+        listening_mode: bool = False
+    ):
+        self.messages = messages if messages is not None else []
+        self.settings = settings if settings is not None else dict(DEFAULT_SETTINGS)
+        self.metrics = metrics if metrics is not None else {
+            "token_in": 0,
+            "token_out": 0,
+            "cost": 0.0,
+            "latency": 0.0
+        }
+        self.listening_mode = listening_mode
+
+    @property
+    def total_tokens(self) -> int:
+        """Tokens used so far in this session."""
+        return self.metrics.get("token_in", 0) + self.metrics.get("token_out", 0)
+
+
+class Turn:
+    """State of a single chat turn as it moves through the pipeline."""
+
+    def __init__(
+        self,
+        user_input: str,
+        session: ChatSession,
+        sink: TokenSink,
+        cancel_token: Optional[CancellationToken] = None
+    ):
+        self.original_input = user_input
+        self.user_input = user_input
+        self.session = session
+        self.sink = sink
+        self.cancel_token = cancel_token
+
+        self.pi_redactions: Dict[str, int] = {}  # Count per PI type (never the values)
+        self.analysis: Optional[TextAnalysis] = None  # Keyword scan shared by later stages
+        self.refusal: Optional[str] = None
+        self.semantic_safety: Dict[str, Any] = {}
+        self.retrieved_docs: List[Dict] = []
+        self.web_results: List[Dict] = []
+        self.context: Dict[str, Any] = {}
+        self.messages: List[Dict[str, str]] = []
+        self.citations: List[Dict] = []
+        self.routing: Dict[str, Any] = {}
+        self.budget: Dict[str, Any] = {}
+
+        self.response: str = ""
+        self.metadata: Dict[str, Any] = {}
+        self.meta: Dict[str, Any] = {}
+        self.timings: Dict[str, float] = {}
+
+        # Set once the answer is final (refusal, limit message or LLM reply);
+        # the remaining non-final stages are skipped
+        self.finished = False
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        return self.session.settings
+
+    def finish(self, response: str):
+        """End the turn early with a fixed response (no LLM call)."""
+        self.response = response
+        self.finished = True
+        self.sink.on_complete(response)
+
+
+# ---------------------------------------------------------------------------
+# Stages
+# ---------------------------------------------------------------------------
+
+def stage_redact(turn: Turn):
+    """Redact PI and add the user message to the conversation."""
+    turn.user_input, audit = redact_pi_with_audit(turn.original_input)
+    turn.pi_redactions = {name: count for name, count in audit["counts"].items() if count}
+
+    turn.session.messages.append({
+        "role": "user",
+        "content": turn.user_input,
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "settings": turn.settings.copy(),
+            "redacted": turn.original_input != turn.user_input
+        }
+    })
+    turn.sink.on_user_message(turn.user_input)
+
+
+def stage_analyze(turn: Turn):
+    """Normalize and scan the message once for safety, search and listening mode."""
+    turn.analysis = analyze_text(turn.user_input)
+
+
+def stage_safety(turn: Turn):
+    """Refuse out-of-scope or unsafe requests without calling the LLM."""
+    refuse, refusal_message = should_refuse(turn.user_input, turn.analysis)
+    if not refuse:
+        # Second stage for paraphrases the keyword lists miss
+        turn.semantic_safety = check_semantic_safety(turn.user_input)
+        category = turn.semantic_safety["category"]
+        if category is None:
+            return
+        refusal_message = REFUSAL_TEMPLATES[category]
+
+    turn.refusal = refusal_message
+    turn.finish(refusal_message)
+    turn.sink.on_notice("info", medical_disclaimer())
+
+
+def stage_token_limit(turn: Turn):
+    """Stop when the session token limit has been reached."""
+    if not check_token_limit(turn.session.total_tokens)["exceeded"]:
+        return
+
+    turn.finish(
+        f"⚠️ **Session token limit reached ({MAX_TOKENS_PER_SESSION:,} tokens).**\n\n"
+        f"You've reached the session token limit to help maintain optimal performance "
+        f"and cost efficiency. Please clear your chat history to continue.\n\n"
+        f"Click the **🗑️ Clear Chat** button in the sidebar to start fresh."
+    )
+
+
+def stage_context(turn: Turn):
+    """Gather RAG and web search context concurrently, bounded by a deadline."""
+    turn.context = gather_context(
+        turn.user_input,
+        rag_on=turn.settings["rag_on"] and is_rag_available(),
+        search_on=turn.settings["search_on"] and is_search_available(),
+        analysis=turn.analysis
+    )
+    turn.retrieved_docs = turn.context["retrieved_docs"]
+    turn.web_results = turn.context["web_results"]
+
+    if "rag" in turn.context["errors"]:
+        turn.sink.on_notice("warning", f"RAG retrieval failed: {turn.context['errors']['rag']}")
+    if "search" in turn.context["errors"]:
+        turn.sink.on_notice("warning", f"Web search failed: {turn.context['errors']['search']}")
+
+
+def stage_compose(turn: Turn):
+    """Build the messages for the LLM."""
+    turn.messages, turn.citations = compose_chat_prompt(
+        history=turn.session.messages[:-1],  # Exclude current user message
+        user_input=turn.user_input,
+        retrieved=turn.retrieved_docs if turn.settings["rag_on"] else None,
+        web_results=turn.web_results if turn.settings["search_on"] else None,
+        settings=turn.settings
+    )
+
+
+def stage_route(turn: Turn):
+    """Pick the model for this turn."""
+    selected_model = turn.settings["model"]
+    routing_features = extract_routing_features(
+        turn.messages,
+        model=selected_model,
+        history_length=len(turn.session.messages) - 1,
+        retrieved=turn.retrieved_docs if turn.settings["rag_on"] else None,
+        web_results=turn.web_results if turn.settings["search_on"] else None,
+        # Refused turns never get here; this is the category an allowed turn came close to
+        safety_category=turn.semantic_safety.get("near_category")
+    )
+    turn.routing = route_model(
+        routing_features,
+        default_model=selected_model,
+        enabled=turn.settings.get("auto_route", True)
+    )
+
+
+def stage_budget(turn: Turn):
+    """Cap the answer to what remains of the session budget and the model's context window."""
+    turn.budget = plan_turn_budget(
+        turn.routing["features"]["prompt_tokens"],
+        total_tokens=turn.session.total_tokens,
+        model=turn.routing["model"],
+        max_output_tokens=turn.settings.get("max_tokens")
+    )
+
+    if not turn.budget["allowed"]:
+        # Not enough budget left for a useful answer - don't call the LLM
+        turn.metadata = {"model": turn.routing["model"]}
+        turn.finish(turn.budget["message"])
+
+
+def stage_generate(turn: Turn):
+    """Stream the answer from the LLM into the sink."""
+    turn.response, turn.metadata = stream_chat_to_sink(
+        messages=turn.messages,
+        sink=turn.sink,
+        model=turn.routing["model"],
+        temperature=turn.settings["temperature"],
+        max_tokens=turn.budget["max_tokens"],
+        fallback_models=turn.routing["fallbacks"],
+        cancel_token=turn.cancel_token
+    )
+    turn.finished = True
+
+    # Soft warning when the answer was cut short by the budget
+    if turn.metadata.get("finish_reason") == "length":
+        turn.sink.on_notice("warning", turn.budget["message"])
+
+    if turn.citations and turn.settings["rag_on"]:
+        turn.sink.on_citations(turn.citations)
+
+
+def stage_record(turn: Turn):
+    """Update session metrics and append the assistant message."""
+    settings = turn.settings
+    model = settings["model"]
+
+    if turn.metadata:
+        token_in = turn.metadata.get("tokens_in", 0)
+        token_out = turn.metadata.get("tokens_out", 0)
+    else:
+        # Minimal metrics for answers that never reached the LLM
+        token_in = count_tokens(turn.user_input, model)
+        token_out = count_tokens(turn.response, model)
+
+    call_stats = {}
+    if turn.routing:
+        call_stats = {
+            "routing_rule": turn.routing["rule"],
+            "requested_model": turn.routing["requested_model"],
+            "routing_features": turn.routing["features"],
+            "max_tokens": turn.budget.get("max_tokens"),
+            "budget_capped_by": turn.budget.get("capped_by"),
+            "context_timings": turn.context["timings"],
+            "context_timed_out": turn.context["timed_out"],
+            "context_wall_time": turn.context["wall_time"],
+        }
+        call_stats.update({key: turn.metadata[key] for key in LLM_META_KEYS if key in turn.metadata})
+
+    latency = turn.metadata.get("latency", 0.0)
+    turn.meta = {
+        "timestamp": time.time(),
+        "model": model,
+        "temperature": settings["temperature"],
+        "token_in": token_in,
+        "token_out": token_out,
+        "cost": turn.metadata.get("cost", 0.0),
+        "latency": latency,
+        "queue_wait": turn.metadata.get("queue_wait", 0.0),
+        **call_stats,
+        "search_used": settings["search_on"],
+        "rag_used": settings["rag_on"],
+        "rag_docs_retrieved": len(turn.retrieved_docs),
+        "search_results": len(turn.web_results),
+        "citations": turn.citations,
+        "refused": turn.refusal is not None,
+        "pi_redactions": turn.pi_redactions,
+        "semantic_safety": turn.semantic_safety,
+        "voice_used": settings.get("voice_on", False),
+        "listening_mode": turn.session.listening_mode,
+    }
+
+    turn.session.metrics["token_in"] += token_in
+    turn.session.metrics["token_out"] += token_out
+    turn.session.metrics["cost"] += turn.meta["cost"]
+    turn.session.metrics["latency"] = latency
+
+    turn.session.messages.append({
+        "role": "assistant",
+        "content": turn.response,
+        "meta": turn.meta
+    })
+
+
+def stage_log(turn: Turn):
+    """Log the turn to JSON lines."""
+    turn.meta["stage_timings"] = dict(turn.timings)
+    log_turn(turn.meta)
+
+
+def stage_listening(turn: Turn):
+    """Add the message to listening mode if enabled."""
+    if turn.session.listening_mode:
+        add_to_listening_mode(turn.user_input, turn.analysis)
+
+
+Stage = Tuple[str, Callable[[Turn], None]]
+
+DEFAULT_STAGES: List[Stage] = [
+    ("redact", stage_redact),
+    ("analyze", stage_analyze),
+    ("safety", stage_safety),
+    ("token_limit", stage_token_limit),
+    ("context", stage_context),
+    ("compose", stage_compose),
+    ("route", stage_route),
+    ("budget", stage_budget),
+    ("generate", stage_generate),
+    ("record", stage_record),
+    ("log", stage_log),
+    ("listening", stage_listening),
+]
+
+# Stages that run even after the answer is final
+FINAL_STAGES = {"record", "log", "listening"}
+
+
+class ChatPipeline:
+    """
+    Runs chat turns through a list of named stages.
+
+    Example:
+        pipeline = ChatPipeline()
+        turn = pipeline.run("What is a normal resting heart rate?", ChatSession(), CollectingSink())
+        print(turn.response)
+    """
+
+    def __init__(
+        self,
+        stages: Optional[List[Stage]] = None,
+        on_stage: Optional[Callable[[str, float, Turn], None]] = None
+    ):
+        """
+        Args:
+            stages: (name, function) pairs to run in order; DEFAULT_STAGES if None
+            on_stage: Called as on_stage(name, seconds, turn) after each stage
+        """
+        self.stages = list(stages if stages is not None else DEFAULT_STAGES)
+        self.on_stage = on_stage
+
+    def replace_stage(self, name: str, fn: Callable[[Turn], None]) -> "ChatPipeline":
+        """
+        Return a copy of this pipeline with one stage swapped out.
+
+        Args:
+            name: Name of the stage to replace (e.g. 'generate')
+            fn: New stage function
+
+        Returns:
+            New ChatPipeline
+        """
+        if name not in [stage_name for stage_name, _ in self.stages]:
+            raise ValueError(f"Unknown pipeline stage: {name}")
+        stages = [(stage_name, fn if stage_name == name else stage_fn) for stage_name, stage_fn in self.stages]
+        return ChatPipeline(stages=stages, on_stage=self.on_stage)
+
+    def run(
+        self,
+        user_input: str,
+        session: ChatSession,
+        sink: Optional[TokenSink] = None,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Turn:
+        """
+        Run one chat turn.
+
+        Args:
+            user_input: Raw user message
+            session: Conversation state to read and update
+            sink: Receives the streamed output (no-op sink if None)
+            cancel_token: Optional token to stop the generation
+
+        Returns:
+            The completed Turn (response, metadata and meta)
+        """
+        turn = Turn(user_input, session, sink or TokenSink(), cancel_token)
+
+        for name, fn in self.stages:
+            if turn.finished and name not in FINAL_STAGES:
+                continue
+            start_time = time.time()
+            fn(turn)
+            elapsed = time.time() - start_time
+            turn.timings[name] = elapsed
+            if self.on_stage:
+                self.on_stage(name, elapsed, turn)
+
+        return turn
+
+    def record_cancelled(self, session: ChatSession, token: CancellationToken) -> Optional[Dict[str, Any]]:
+        """
+        Record a turn whose generation was abandoned mid-stream, with the
+        partial answer and the tokens saved.
+
+        Args:
+            session: Conversation state the turn belonged to
+            token: The turn's cancellation token
+
+        Returns:
+            The logged meta, or None if nothing had been generated
+        """
+        if token.partial is None:
+            return None
+
+        response, metadata = token.partial
+        meta = {
+            "timestamp": time.time(),
+            "model": metadata["model"],
+            "temperature": session.settings["temperature"],
+            "token_in": metadata["tokens_in"],
+            "token_out": metadata["tokens_out"],
+            "cost": metadata["cost"],
+            "latency": metadata["latency"],
+            "queue_wait": metadata.get("queue_wait", 0.0),
+            "search_used": session.settings["search_on"],
+            "rag_used": session.settings["rag_on"],
+            "refused": False,
+            "cancelled": True,
+            # The first reason the token was cancelled for (e.g. new_action)
+            "cancel_reason": token.reason or metadata["cancel_reason"],
+            "tokens_saved": metadata["tokens_saved"],
+            "cost_saved": metadata["cost_saved"],
+        }
+
+        session.metrics["token_in"] += meta["token_in"]
+        session.metrics["token_out"] += meta["token_out"]
+        session.metrics["cost"] += meta["cost"]
+        session.messages.append({
+            "role": "assistant",
+            "content": response + "\n\n*⏹️ Generation stopped.*",
+            "meta": meta
+        })
+        log_turn(meta)
+        return meta
+
+
+# Global pipeline instance
+_pipeline = None
+
+def get_chat_pipeline() -> ChatPipeline:
+    """Get or create global chat pipeline instance."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ChatPipeline()
+    return _pipeline
@@ -5,16 +5,36 @@ Handles document retrieval from FAISS index for context injection.
 
 import os
 import json
+import threading
+import importlib.util
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
-import numpy as np
 
-try:
-    import faiss
-    from sentence_transformers import SentenceTransformer
-except ImportError:
-    faiss = None
-    SentenceTransformer = None
+# faiss and sentence-transformers (torch) take seconds to import, so they are
+# loaded on first retrieval rather than at import time (see _load_backends)
+faiss = None
+SentenceTransformer = None
+
+INDEX_FILES = ("faiss_index.bin", "metadata.json", "model_info.json")
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+def _backends_installed() -> bool:
+    """Check that faiss and sentence-transformers are installed, without importing them."""
+    return all(importlib.util.find_spec(name) is not None for name in ("faiss", "sentence_transformers"))
+
+
+def _load_backends() -> bool:
+    """Import faiss and sentence-transformers on first use."""
+    global faiss, SentenceTransformer
+    if faiss is None or SentenceTransformer is None:
+        try:
+            import faiss as faiss_module
+            from sentence_transformers import SentenceTransformer as transformer_class
+        except ImportError:
+            return False
+        faiss, SentenceTransformer = faiss_module, transformer_class
+    return True
 
 
 class RAGRetriever:
@@ -27,18 +47,72 @@ class RAGRetriever:
         self.embedder = None
         self.model_info = {}
         self._loaded = False
+        self._load_failed = False
+        self._failed_signature = None  # Index files as they were when loading failed
+        self._load_lock = threading.Lock()
+    
+    def index_exists(self) -> bool:
+        """Check that the index files are on disk (cheap; nothing is loaded)."""
+        return all((self.index_dir / name).exists() for name in INDEX_FILES)
+    
+    def _index_signature(self) -> Tuple:
+        """Modification time and size of each index file (None if missing)."""
+        signature = []
+        for name in INDEX_FILES:
+            try:
+                stat = (self.index_dir / name).stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+    
+    def _mark_failed(self):
+        """Remember a failed load until the index files change."""
+        self._load_failed = True
+        self._failed_signature = self._index_signature()
+    
+    def is_available(self) -> bool:
+        """
+        Check whether retrieval can work, without loading the index.
+        
+        True if the dependencies are installed and the index files exist, unless
+        an earlier load attempt failed and the index files have not changed
+        since (e.g. rebuilt with python ingest.py).
+        """
+        if self._loaded:
+            return True
+        if self._load_failed and self._index_signature() != self._failed_signature:
+            self._load_failed = False
+        return not self._load_failed and self.index_exists() and _backends_installed()
     
     def load_index(self) -> bool:
-        """Load FAISS index and metadata from disk."""
+        """Load FAISS index and metadata from disk (once)."""
+        if self._loaded:
+            return True
+        
+        # Background warm-up and the first query may race to load the index
+        with self._load_lock:
+            if self._loaded:
+                return True
+            return self._load_index()
+    
+    def _load_index(self) -> bool:
+        """Load the index, metadata and embedding model; caller holds _load_lock."""
         try:
             # Check if index files exist
             index_file = self.index_dir / "faiss_index.bin"
             metadata_file = self.index_dir / "metadata.json"
             model_info_file = self.index_dir / "model_info.json"
             
-            if not all(f.exists() for f in [index_file, metadata_file, model_info_file]):
+            if not self.index_exists():
                 print(f"❌ RAG index not found at {self.index_dir}")
                 print("Run 'python ingest.py' to create the index first")
+                self._mark_failed()
+                return False
+            
+            if not _load_backends():
+                print("❌ RAG dependencies not installed. Run: pip install faiss-cpu sentence-transformers")
+                self._mark_failed()
                 return False
             
             # Load FAISS index
@@ -52,9 +126,9 @@ class RAGRetriever:
             with open(model_info_file, 'r', encoding='utf-8') as f:
                 self.model_info = json.load(f)
             
-            # Load embedding model
-            model_name = self.model_info.get('model_name', 'all-MiniLM-L6-v2')
-            self.embedder = SentenceTransformer(model_name)
+            # Load embedding model (unless get_embedder already did)
+            if self.embedder is None:
+                self.embedder = SentenceTransformer(self.embedding_model_name())
             
             self._loaded = True
             print(f"✅ RAG index loaded: {self.index.ntotal} documents")
@@ -62,8 +136,42 @@ class RAGRetriever:
             
         except Exception as e:
             print(f"❌ Error loading RAG index: {e}")
+            self._mark_failed()
             return False
     
+    def embedding_model_name(self) -> str:
+        """Name of the model the index was built with."""
+        if not self.model_info:
+            model_info_file = self.index_dir / "model_info.json"
+            if model_info_file.exists():
+                with open(model_info_file, 'r', encoding='utf-8') as f:
+                    self.model_info = json.load(f)
+        return self.model_info.get('model_name', DEFAULT_EMBEDDING_MODEL)
+    
+    def get_embedder(self):
+        """
+        Get the sentence embedding model, loading it (without the index) if needed.
+        
+        Shared with the semantic safety check so the model is only loaded once.
+        
+        Returns:
+            SentenceTransformer instance, or None if sentence-transformers is
+            not installed or the model failed to load
+        """
+        if self.embedder is not None:
+            return self.embedder
+        
+        with self._load_lock:
+            if self.embedder is None:
+                if not _load_backends():
+                    return None
+                try:
+                    self.embedder = SentenceTransformer(self.embedding_model_name())
+                except Exception as e:
+                    print(f"❌ Error loading embedding model: {e}")
+                    return None
+        return self.embedder
+    
     def retrieve(self, query: str, k: int = 5) -> List[Dict[str, any]]:
         """
         Retrieve top-k most relevant documents for a query.
@@ -232,11 +340,16 @@ def retrieve_documents(query: str, k: int = 5) -> List[Dict[str, any]]:
     return retriever.retrieve_with_text(query, k)
 
 def is_rag_available() -> bool:
-    """Check if RAG system is available and loaded."""
+    """
+    Check if the RAG system can be used.
+    
+    Cheap enough to call on every render: checks for the index files and
+    dependencies; the index itself is loaded on the first retrieval.
+    """
     try:
         retriever = get_retriever()
-        return retriever.load_index()
-    except:
+        return retriever.is_available()
+    except Exception:
         return False
 
 def get_rag_stats() -> Dict[str, any]:
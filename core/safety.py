@@ -3,8 +3,19 @@ Safety checks and compliance helpers for WellNavigator.
 Implements guardrails, refusal patterns, and privacy protections.
 """
 
+import os
 import re
-from typing import Tuple, Optional
+import sys
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Tuple, Optional, List, Dict, Any, Iterable, Iterator, NamedTuple, TYPE_CHECKING
+
+from .keywords import KeywordAutomaton, KeywordMatch
+
+if TYPE_CHECKING:
+    from .text_analysis import TextAnalysis
 
 
 # Refusal templates for different scenarios
@@ -154,94 +165,561 @@ OUT_OF_SCOPE_KEYWORDS = [
 ]
 
 
-# Patterns to detect potential personal information
+# Self-harm keywords (overlap with emergency, which takes priority)
+HARM_KEYWORDS = [
+    "harm myself", "hurt myself", "kill myself", "end my life",
+    "want to die", "commit suicide"
+]
+
+
+# Requests to interpret personal medical records
+RECORD_KEYWORDS = [
+    "analyze my results", "look at my test", "interpret my labs",
+    "read my mri", "analyze this image", "what does my x-ray",
+    "what do my labs mean", "interpret my bloodwork"
+]
+
+
+# Refusal categories in priority order: when several match, the first wins
+REFUSAL_CATEGORY_KEYWORDS = [
+    ("emergency", EMERGENCY_KEYWORDS),
+    ("illicit", ILLICIT_KEYWORDS),
+    ("harmful", HARM_KEYWORDS),
+    ("diagnosis", DIAGNOSTIC_KEYWORDS),
+    ("prescription", PRESCRIPTION_KEYWORDS),
+    ("no_medical_records", RECORD_KEYWORDS),
+    ("out_of_scope", OUT_OF_SCOPE_KEYWORDS),
+]
+
+# Model output that reads as prescriptive dosing or a diagnosis; checked while
+# the answer streams (see core/output_guard.py). Dose units match after any
+# number ("500 mg twice daily", "2 tablets every 4 hours").
+OUTPUT_DOSING_KEYWORDS = [
+    "i would prescribe", "i prescribe",
+    "mg twice a day", "mg twice daily", "mg once a day", "mg once daily",
+    "mg three times a day", "mg every", "mg per day", "mg a day",
+    "tablets every", "pills every", "capsules every"
+]
+
+# Advice phrases that only count as dosing when a dose follows within
+# OUTPUT_DOSE_WINDOW characters: "you should take 500 mg" is flagged, "you
+# should take a list of questions to your appointment" is not
+OUTPUT_DOSING_LEAD_INS = [
+    "you should take", "i recommend taking", "i recommend you take",
+    "you should start taking", "increase your dose to", "decrease your dose to"
+]
+OUTPUT_DOSE_PATTERN = re.compile(
+    r"\b(?:\d+(?:[.,]\d+)?|one|two|three|four)\s*"
+    r"(?:mg|mcg|ml|milligrams?|micrograms?|milliliters?|units?|iu|tablets?|pills?|capsules?|puffs?|drops?)\b",
+    re.IGNORECASE
+)
+OUTPUT_DOSE_WINDOW = 40
+
+OUTPUT_DIAGNOSIS_KEYWORDS = [
+    "you definitely have", "you probably have", "you most likely have",
+    "you likely have", "you clearly have", "you are suffering from",
+    "you're suffering from", "your diagnosis is", "i diagnose you",
+    "this confirms you have", "you have a case of", "my diagnosis is"
+]
+
+OUTPUT_GUARD_CATEGORY_KEYWORDS = [
+    ("dosing", OUTPUT_DOSING_KEYWORDS),
+    ("diagnosis", OUTPUT_DIAGNOSIS_KEYWORDS),
+]
+
+# Only match whole words ("trauma" no longer matches "traumatic"); off by
+# default to keep substring matching
+SAFETY_WORD_BOUNDARY = os.getenv("SAFETY_WORD_BOUNDARY", "false").lower() == "true"
+
+
+# Patterns to detect potential personal information, in priority order: where
+# two could match at the same position the earlier one wins (a card number
+# also contains a phone-shaped run of digits). Digit-led patterns are tried
+# before the others; every pattern must start with \b (see _compile_pi_regex)
 PI_PATTERNS = {
     "ssn": r"\b\d{3}-\d{2}-\d{4}\b",
     "credit_card": r"\b\d{4}[\s-]?\d{4}[\s-]?\d{4}[\s-]?\d{4}\b",
+    # Conservative: only standalone numbers (some medical contexts need numbers)
     "phone": r"\b\d{3}[-.]?\d{3}[-.]?\d{4}\b",
-    "email": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b",
+    "email": r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b",
 }
 
+PI_REPLACEMENTS = {
+    "ssn": "[SSN_REDACTED]",
+    "credit_card": "[CARD_REDACTED]",
+    "phone": "[PHONE_REDACTED]",
+    "email": "[EMAIL_REDACTED]",
+}
 
-def should_refuse(user_input: str) -> Tuple[bool, Optional[str]]:
+
+def _compile_pi_regex() -> "re.Pattern":
+    """
+    Fuse PI_PATTERNS into one alternation with a named group per type.
+    
+    re tries alternatives one at a time at every position, so the shared
+    leading \\b is tested once and digit-led patterns are only tried where a
+    digit starts (about 3x faster than a plain alternation).
+    """
+    boundary = r"\b"
+    numeric, other = [], []
+    for name, pattern in PI_PATTERNS.items():
+        if not pattern.startswith(boundary):
+            raise ValueError(f"PI pattern {name!r} must start with \\b")
+        body = pattern[len(boundary):]
+        (numeric if body.startswith(r"\d") else other).append(f"(?P<{name}>{body})")
+    
+    alternatives = ([rf"(?=\d)(?:{'|'.join(numeric)})"] if numeric else []) + other
+    return re.compile(rf"{boundary}(?:{'|'.join(alternatives)})")
+
+
+# All PI types in one alternation, so redaction is a single scan
+PI_REGEX = _compile_pi_regex()
+
+# Streaming redaction holds back this many characters so PI split across
+# chunks is still caught (longer than any SSN/card/phone or realistic email)
+PI_STREAM_HOLDBACK = 256
+
+
+class PIMatch(NamedTuple):
+    """Location of one redacted item (the value itself is never kept)."""
+    type: str
+    start: int
+    end: int
+
+
+_automaton = None
+_automaton_lock = threading.Lock()
+
+def get_keyword_automaton(rebuild: bool = False) -> KeywordAutomaton:
+    """
+    Get the keyword automaton for all refusal categories, built on first use.
+    
+    Args:
+        rebuild: Rebuild after the keyword lists have been changed
+    
+    Returns:
+        Shared KeywordAutomaton instance
+    """
+    global _automaton, _rules_version
+    with _automaton_lock:
+        if _automaton is None or rebuild:
+            _automaton = KeywordAutomaton(REFUSAL_CATEGORY_KEYWORDS, word_boundary=SAFETY_WORD_BOUNDARY)
+    if rebuild:
+        # Decisions made under the old lists no longer apply
+        _rules_version = None
+        _refusal_cache.clear()
+        _redaction_cache.clear()
+    return _automaton
+
+
+def find_refusal_matches(user_input: str, word_boundary: Optional[bool] = None) -> List[KeywordMatch]:
+    """
+    Find every refusal keyword in the input, with category and span.
+    
+    Args:
+        user_input: The user's message
+        word_boundary: Override SAFETY_WORD_BOUNDARY for this call
+    
+    Returns:
+        List of KeywordMatch (keyword, category, start, end)
+    """
+    return get_keyword_automaton().find_all(user_input, word_boundary)
+
+
+def get_refusal_category(user_input: str, analysis: Optional["TextAnalysis"] = None) -> Optional[str]:
+    """
+    Classify the user input into a refusal category, in priority order.
+    
+    Args:
+        user_input: The user's message
+        analysis: The turn's TextAnalysis of user_input, to reuse its scan
+    
+    Returns:
+        Key of REFUSAL_TEMPLATES for the matched category, or None if the
+        request is allowed
+    """
+    if analysis is not None:
+        return analysis.refusal_category
+    # Emergencies first, then illicit, self-harm, diagnosis, prescription,
+    # medical records and out-of-scope (see REFUSAL_CATEGORY_KEYWORDS)
+    categories = get_keyword_automaton().find_categories(user_input)
+    return categories[0] if categories else None
+
+
+def should_refuse(user_input: str, analysis: Optional["TextAnalysis"] = None) -> Tuple[bool, Optional[str]]:
     """
     Check if the user input should be refused based on safety rules.
     
     Args:
         user_input: The user's message
+        analysis: The turn's TextAnalysis of user_input, to reuse its scan
     
     Returns:
         Tuple of (should_refuse: bool, refusal_message: str | None)
         If should_refuse is True, refusal_message contains the appropriate response
     """
-    user_input_lower = user_input.lower()
+    if SAFETY_CACHE_SIZE > 0:
+        category = _cached_refusal_category(user_input, analysis)
+    else:
+        category = get_refusal_category(user_input, analysis)
+    if category is None:
+        return False, None
+    return True, REFUSAL_TEMPLATES[category]
+
+
+def _pi_replacement(match) -> str:
+    return PI_REPLACEMENTS[match.lastgroup]
+
+
+def redact_pi(user_input: str) -> str:
+    """
+    Redact potential personal information from user input.
+    
+    Args:
+        user_input: The user's message
+    
+    Returns:
+        Text with PI redacted (replaced with [SSN_REDACTED], [EMAIL_REDACTED], ...)
+    """
+    if SAFETY_CACHE_SIZE <= 0:
+        return _redact_pi(user_input)
+    return _cached_redaction(user_input)[0]
+
+
+def _redact_pi(user_input: str) -> str:
+    return PI_REGEX.sub(_pi_replacement, user_input)
+
+
+def _new_pi_audit() -> Dict[str, Any]:
+    return {"counts": {name: 0 for name in PI_PATTERNS}, "spans": []}
+
+
+def _redact_pi_range(text: str, pos: int, cutoff: int, audit: Optional[Dict[str, Any]],
+                     offset: int) -> Tuple[str, int]:
+    """
+    Redact matches in text that start before cutoff, scanning from pos.
     
-    # Check for emergencies (highest priority)
-    for keyword in EMERGENCY_KEYWORDS:
-        if keyword in user_input_lower:
-            return True, REFUSAL_TEMPLATES["emergency"]
+    Characters before pos are context only (so word boundaries see the previous
+    character). Returns the redacted text and the index it was emitted up to:
+    cutoff, or the end of a match that runs past it.
+    """
+    parts = []
+    for match in PI_REGEX.finditer(text, pos):
+        if match.start() >= cutoff:
+            break
+        parts.append(text[pos:match.start()])
+        parts.append(PI_REPLACEMENTS[match.lastgroup])
+        if audit is not None:
+            audit["counts"][match.lastgroup] += 1
+            audit["spans"].append(PIMatch(match.lastgroup, offset + match.start(), offset + match.end()))
+        pos = match.end()
+    end = max(pos, cutoff)
+    parts.append(text[pos:end])
+    return "".join(parts), end
+
+
+def redact_pi_with_audit(user_input: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Redact PI and report what was redacted, for auditing.
     
-    # Check for illicit/harmful requests
-    for keyword in ILLICIT_KEYWORDS:
-        if keyword in user_input_lower:
-            return True, REFUSAL_TEMPLATES["illicit"]
+    Args:
+        user_input: The user's message
     
-    # Check for self-harm keywords (redundant with emergency but more specific)
-    harm_keywords = ["harm myself", "hurt myself", "kill myself", "end my life", 
-                     "want to die", "commit suicide"]
-    if any(keyword in user_input_lower for keyword in harm_keywords):
-        return True, REFUSAL_TEMPLATES["harmful"]
+    Returns:
+        Tuple of (redacted text, audit) where audit has per-type "counts" and
+        "spans" (PIMatch type/start/end in the original text)
+    """
+    if SAFETY_CACHE_SIZE <= 0:
+        return _redact_pi_with_audit(user_input)
+    redacted, counts, spans = _cached_redaction(user_input)
+    return redacted, {"counts": dict(counts), "spans": list(spans)}
+
+
+def _redact_pi_with_audit(user_input: str) -> Tuple[str, Dict[str, Any]]:
+    audit = _new_pi_audit()
+    redacted, _ = _redact_pi_range(user_input, 0, len(user_input), audit, 0)
+    return redacted, audit
+
+
+def redact_pi_stream(chunks: Iterable[str], audit: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Redact PI from a large input read in chunks (e.g. a file object).
     
-    # Check for diagnostic requests
-    if any(keyword in user_input_lower for keyword in DIAGNOSTIC_KEYWORDS):
-        return True, REFUSAL_TEMPLATES["diagnosis"]
+    Output is delayed by up to PI_STREAM_HOLDBACK characters so PI split
+    across chunk boundaries is still redacted; memory stays bounded by the
+    chunk size plus the holdback.
     
-    # Check for prescription/medication advice
-    if any(keyword in user_input_lower for keyword in PRESCRIPTION_KEYWORDS):
-        return True, REFUSAL_TEMPLATES["prescription"]
+    Args:
+        chunks: Iterable of text chunks
+        audit: Optional dict to fill with "counts" and "spans" (as in
+            redact_pi_with_audit); spans index the whole input
     
-    # Check for medical record interpretation requests
-    record_keywords = ["analyze my results", "look at my test", "interpret my labs",
-                       "read my mri", "analyze this image", "what does my x-ray",
-                       "what do my labs mean", "interpret my bloodwork"]
-    if any(keyword in user_input_lower for keyword in record_keywords):
-        return True, REFUSAL_TEMPLATES["no_medical_records"]
+    Yields:
+        Redacted text pieces
+    """
+    if audit is not None:
+        audit.update(_new_pi_audit())
     
-    # Check for out-of-scope requests
-    for keyword in OUT_OF_SCOPE_KEYWORDS:
-        if keyword in user_input_lower:
-            return True, REFUSAL_TEMPLATES["out_of_scope"]
+    pending = ""   # Text not yet emitted
+    context = ""   # Last emitted character, so word boundaries work across the seam
+    offset = 0     # Position of pending[0] in the whole input
+    for chunk in chunks:
+        pending += chunk
+        if len(pending) <= 2 * PI_STREAM_HOLDBACK:
+            continue
+        text = context + pending
+        redacted, end = _redact_pi_range(text, len(context), len(text) - PI_STREAM_HOLDBACK,
+                                         audit, offset - len(context))
+        yield redacted
+        consumed = end - len(context)
+        context = text[end - 1]
+        pending = pending[consumed:]
+        offset += consumed
     
-    # No refusal needed
-    return False, None
+    if pending:
+        text = context + pending
+        redacted, _ = _redact_pi_range(text, len(context), len(text), audit, offset - len(context))
+        yield redacted
 
 
-def redact_pi(user_input: str) -> str:
+# ---------------------------------------------------------------------------
+# Decision cache
+# ---------------------------------------------------------------------------
+
+SAFETY_CACHE_SIZE = int(os.getenv("SAFETY_CACHE_SIZE", "4096"))  # Entries per cache; 0 disables
+
+# Per-process hash key: cached digests can't be checked against guessed inputs
+# (e.g. every possible SSN) by anyone without this process's memory
+_CACHE_HASH_KEY = os.urandom(32)
+
+_MISS = object()
+
+
+class SafetyDecisionCache:
     """
-    Redact potential personal information from user input.
+    Bounded LRU of safety results, keyed by a keyed hash of the input and the
+    rules version.
     
-    Args:
-        user_input: The user's message
+    Only digests are stored as keys, never the input text; values are refusal
+    categories or redaction results (redacted text and PI offsets).
+    """
     
-    Returns:
-        Text with PI redacted (replaced with [REDACTED])
+    def __init__(self, max_entries: int = SAFETY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def key(text: str, version: str) -> bytes:
+        digest = hashlib.blake2b(version.encode("ascii"), digest_size=16, key=_CACHE_HASH_KEY)
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8", "surrogatepass"))
+        return digest.digest()
+    
+    def get(self, key: bytes) -> Any:
+        """Cached value, or _MISS."""
+        with self._lock:
+            value = self._entries.get(key, _MISS)
+            if value is _MISS:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: bytes, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Global cache instances
+_refusal_cache = SafetyDecisionCache()
+_redaction_cache = SafetyDecisionCache()
+
+_rules_version = None
+_rules_seen = None
+
+
+def _rules_signature() -> tuple:
     """
-    redacted = user_input
+    Cheap fingerprint of the rule lists, checked on every cached lookup.
     
-    # Redact SSN
-    redacted = re.sub(PI_PATTERNS["ssn"], "[SSN_REDACTED]", redacted)
+    Catches lists that were replaced or had keywords added or removed; an
+    edit that keeps a list's length is only seen by reload_safety_rules().
+    """
+    return (SAFETY_WORD_BOUNDARY, len(PI_PATTERNS)) + tuple(
+        (category, id(keywords), len(keywords)) for category, keywords in REFUSAL_CATEGORY_KEYWORDS
+    )
+
+
+def reload_safety_rules():
+    """
+    Rebuild every matcher from the current keyword lists and PI patterns,
+    re-hash their contents into a new rules version and drop cached
+    decisions. Call after editing the lists at runtime: adding or removing
+    keywords is also picked up on the next lookup, but replacing a keyword
+    in place is not.
+    """
+    global PI_REGEX, _rules_seen, _rules_version
+    PI_REGEX = _compile_pi_regex()
+    get_keyword_automaton(rebuild=True)
+    text_analysis = sys.modules.get(f"{__package__}.text_analysis")
+    if text_analysis is not None:
+        text_analysis.get_text_automaton(rebuild=True)
+    _rules_seen = _rules_signature()
+    _rules_version = _rules_digest()
+
+
+def _rules_digest() -> str:
+    """Hash of the keyword lists' contents, PI patterns and matching mode."""
+    payload = json.dumps([REFUSAL_CATEGORY_KEYWORDS, PI_PATTERNS, SAFETY_WORD_BOUNDARY])
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def get_rules_version() -> str:
+    """
+    Version of the safety rules: a hash of the keyword lists, PI patterns and
+    matching mode, computed on first use and by reload_safety_rules(). Part
+    of every cache key, so reloaded rules never reuse decisions made under
+    the old ones.
+    """
+    global _rules_version, _rules_seen
+    signature = _rules_signature()
+    if signature != _rules_seen:
+        if _rules_seen is not None:
+            reload_safety_rules()
+        _rules_seen = signature
+        _rules_version = None
+    if _rules_version is None:
+        _rules_version = _rules_digest()
+    return _rules_version
+
+
+def _cached_refusal_category(user_input: str, analysis: Optional["TextAnalysis"] = None) -> Optional[str]:
+    """get_refusal_category through the decision cache."""
+    # Matching is case-insensitive and unaffected by surrounding whitespace
+    key = _refusal_cache.key(user_input.strip().lower(), get_rules_version())
+    category = _refusal_cache.get(key)
+    if category is _MISS:
+        category = get_refusal_category(user_input, analysis)
+        _refusal_cache.put(key, category)
+    return category
+
+
+def _cached_redaction(user_input: str) -> Tuple[str, Dict[str, int], Tuple[PIMatch, ...]]:
+    """Redacted text, counts and spans through the decision cache (keyed on the exact text)."""
+    key = _redaction_cache.key(user_input, get_rules_version())
+    cached = _redaction_cache.get(key)
+    if cached is _MISS:
+        redacted, audit = _redact_pi_with_audit(user_input)
+        cached = (redacted, audit["counts"], tuple(audit["spans"]))
+        _redaction_cache.put(key, cached)
+    return cached
+
+
+def get_safety_cache_metrics() -> Dict[str, Any]:
+    """Hit rates and sizes of the refusal and redaction caches."""
+    return {
+        "enabled": SAFETY_CACHE_SIZE > 0,
+        "max_entries": SAFETY_CACHE_SIZE,
+        "rules_version": get_rules_version(),
+        "refusal": _refusal_cache.get_metrics(),
+        "redaction": _redaction_cache.get_metrics(),
+    }
+
+
+SAFETY_BATCH_CHUNKSIZE = 1024  # Messages sent to a worker process at a time
+
+
+def _map_batch(func, messages: Iterable[str], processes: int, chunksize: int) -> Iterator:
+    """
+    Apply func to each message in order, in this process or a process pool.
+    
+    Workers rebuild the automaton from the keyword lists in their own copy of
+    this module, so runtime edits to the lists only reach them with the
+    "fork" start method.
+    """
+    if processes is None or processes <= 1:
+        return map(func, messages)
     
-    # Redact credit card numbers
-    redacted = re.sub(PI_PATTERNS["credit_card"], "[CARD_REDACTED]", redacted)
+    import multiprocessing
     
-    # Redact phone numbers (be conservative - some medical contexts need numbers)
-    # Only redact if it looks like a standalone phone number
-    redacted = re.sub(r'\b(\d{3}[-.]?\d{3}[-.]?\d{4})\b', "[PHONE_REDACTED]", redacted)
+    def run():
+        with multiprocessing.Pool(processes) as pool:
+            yield from pool.imap(func, messages, chunksize)
+    return run()
+
+
+def get_refusal_categories_batch(messages: Iterable[str], processes: int = 1,
+                                 chunksize: int = SAFETY_BATCH_CHUNKSIZE) -> Iterator[Optional[str]]:
+    """
+    Classify many messages (e.g. historical logs) into refusal categories.
+    
+    Args:
+        messages: List or iterator of messages; consumed lazily
+        processes: Worker processes (1 = in this process)
+        chunksize: Messages per task sent to a worker
+    
+    Returns:
+        Iterator of REFUSAL_TEMPLATES keys (or None), in input order
+    """
+    return _map_batch(get_refusal_category, messages, processes, chunksize)
+
+
+def should_refuse_batch(messages: Iterable[str], processes: int = 1,
+                        chunksize: int = SAFETY_BATCH_CHUNKSIZE) -> Iterator[Tuple[bool, Optional[str]]]:
+    """
+    Batch version of should_refuse.
+    
+    Returns:
+        Iterator of (should_refuse, refusal_message) tuples, in input order
+    """
+    for category in get_refusal_categories_batch(messages, processes, chunksize):
+        if category is None:
+            yield False, None
+        else:
+            yield True, REFUSAL_TEMPLATES[category]
+
+
+def redact_pi_batch(messages: Iterable[str], processes: int = 1, audit: bool = False,
+                    chunksize: int = SAFETY_BATCH_CHUNKSIZE) -> Iterator[Any]:
+    """
+    Batch version of redact_pi.
     
-    # Redact email addresses
-    redacted = re.sub(PI_PATTERNS["email"], "[EMAIL_REDACTED]", redacted)
+    Args:
+        messages: List or iterator of messages; consumed lazily
+        processes: Worker processes (1 = in this process)
+        audit: Yield (redacted text, audit) tuples as redact_pi_with_audit does
+        chunksize: Messages per task sent to a worker
     
-    return redacted
+    Returns:
+        Iterator of redacted texts (or tuples with audit), in input order
+    """
+    # Batches are mostly distinct messages, so they bypass the decision cache
+    func = _redact_pi_with_audit if audit else _redact_pi
+    return _map_batch(func, messages, processes, chunksize)
 
 
 def medical_disclaimer() -> str:
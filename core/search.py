@@ -5,13 +5,338 @@ Provides interface for web search with stubbed implementation.
 
 import os
 import time
-from typing import List, Dict, Optional
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import List, Dict, Optional, Any
 import json
+import importlib.util
 
-try:
-    import requests
-except ImportError:
-    requests = None
+from .text_analysis import TextAnalysis, analyze_text
+
+# requests is imported on the first live search (see _load_requests)
+requests = None
+
+
+def _load_requests() -> bool:
+    """Import requests on first use."""
+    global requests
+    if requests is None:
+        try:
+            import requests as requests_module
+        except ImportError:
+            return False
+        requests = requests_module
+    return True
+
+
+# HTTP settings for live search: one pooled session, separate connect/read
+# timeouts, bounded retries with exponential backoff
+SEARCH_CONNECT_TIMEOUT = float(os.getenv("SEARCH_CONNECT_TIMEOUT", "3.05"))
+SEARCH_READ_TIMEOUT = float(os.getenv("SEARCH_READ_TIMEOUT", "5"))
+SEARCH_MAX_RETRIES = int(os.getenv("SEARCH_MAX_RETRIES", "2"))
+SEARCH_RETRY_BACKOFF = float(os.getenv("SEARCH_RETRY_BACKOFF", "0.25"))  # Seconds, doubled per retry
+# Longest sleep before a retry, for backoff and for a server's Retry-After alike,
+# so a 429 asking for minutes can't hold a search worker past the turn deadline
+SEARCH_RETRY_WAIT_MAX = float(os.getenv("SEARCH_RETRY_WAIT_MAX", "1.0"))
+SEARCH_POOL_SIZE = int(os.getenv("SEARCH_POOL_SIZE", "10"))  # Connections kept per host
+SEARCH_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _build_retry():
+    """urllib3 Retry policy for live search, with every wait capped at SEARCH_RETRY_WAIT_MAX."""
+    from urllib3.util.retry import Retry
+    
+    class CappedRetry(Retry):
+        def get_backoff_time(self) -> float:
+            return min(super().get_backoff_time(), SEARCH_RETRY_WAIT_MAX)
+        
+        def get_retry_after(self, response) -> Optional[float]:
+            retry_after = super().get_retry_after(response)
+            return None if retry_after is None else min(retry_after, SEARCH_RETRY_WAIT_MAX)
+    
+    return CappedRetry(
+        total=SEARCH_MAX_RETRIES,
+        connect=SEARCH_MAX_RETRIES,
+        read=False,
+        status=SEARCH_MAX_RETRIES,
+        backoff_factor=SEARCH_RETRY_BACKOFF,
+        status_forcelist=SEARCH_RETRY_STATUSES,
+        allowed_methods=frozenset(["GET"]),
+        raise_on_status=False,
+    )
+
+
+class SearchHTTPMetrics:
+    """Process-wide counters for live search calls: retries, failures, connection reuse."""
+    
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self.window = window
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.connection_errors = 0
+        self._latencies: List[float] = []
+    
+    def record(self, latency: float, retries: int = 0, error: Optional[Exception] = None):
+        with self._lock:
+            self.calls += 1
+            self.retries += retries
+            if error is not None:
+                self.failures += 1
+                if isinstance(error, requests.Timeout):
+                    self.timeouts += 1
+                elif isinstance(error, requests.ConnectionError):
+                    self.connection_errors += 1
+            self._latencies.append(latency)
+            if len(self._latencies) > self.window:
+                self._latencies = self._latencies[-self.window:]
+    
+    def get_metrics(self, pool_stats: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = {
+                "calls": self.calls,
+                "failures": self.failures,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "connection_errors": self.connection_errors,
+                "avg_latency_ms": (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+                "p95_latency_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+            }
+        # HTTP requests (retries included) vs. connections opened by the pool
+        pool_stats = pool_stats or {"http_requests": 0, "connections_opened": 0}
+        reused = max(0, pool_stats["http_requests"] - pool_stats["connections_opened"])
+        metrics.update(pool_stats)
+        metrics["connections_reused"] = reused
+        metrics["reuse_rate"] = reused / pool_stats["http_requests"] if pool_stats["http_requests"] else 0.0
+        return metrics
+
+
+# Background fetches for deadline-bounded searches (late ones finish here and fill the cache)
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "4"))
+
+
+class SearchDeadlineMetrics:
+    """Process-wide counters for deadline-bounded searches: misses, late completions, fetch times."""
+    
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self.window = window
+        self.calls = 0
+        self.misses = 0
+        self.joined = 0
+        self.late_completions = 0
+        self._fetch_times: List[float] = []
+    
+    def record_call(self, joined: bool = False):
+        with self._lock:
+            self.calls += 1
+            self.joined += joined
+    
+    def record_miss(self):
+        with self._lock:
+            self.misses += 1
+    
+    def record_late(self):
+        with self._lock:
+            self.late_completions += 1
+    
+    def record_fetch(self, seconds: float):
+        with self._lock:
+            self._fetch_times.append(seconds)
+            if len(self._fetch_times) > self.window:
+                self._fetch_times = self._fetch_times[-self.window:]
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            times = sorted(self._fetch_times)
+            return {
+                "calls": self.calls,
+                "misses": self.misses,
+                "miss_rate": self.misses / self.calls if self.calls else 0.0,
+                "joined_in_flight": self.joined,
+                "late_completions": self.late_completions,
+                # Fetch times to weigh the budget against (what a miss would have waited)
+                "p50_fetch_ms": times[int(0.5 * (len(times) - 1))] * 1000 if times else 0.0,
+                "p95_fetch_ms": times[int(0.95 * (len(times) - 1))] * 1000 if times else 0.0,
+            }
+
+
+# Result cache for live searches, shared by all worker processes via SQLite (WAL)
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE", "true").lower() == "true"
+SEARCH_CACHE_PATH = Path(os.getenv("SEARCH_CACHE_PATH", "data/cache/search_cache.sqlite3"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", "86400"))  # Seconds
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# Hits only touch memory; their last_used/hit counts are written in one
+# transaction at most this often (and before every store)
+SEARCH_CACHE_TOUCH_INTERVAL = float(os.getenv("SEARCH_CACHE_TOUCH_INTERVAL", "30"))  # Seconds
+
+
+class SearchCache:
+    """
+    TTL + LRU cache of live search results in SQLite.
+    
+    WAL mode lets every worker process read while one writes, and the file
+    survives restarts. Entries are keyed by a hash of the normalized query
+    and k (the query text itself is not stored); each remembers how long the
+    original fetch took, so hits can be reported as latency saved.
+    
+    Lookups never write: hits are batched in memory and written every
+    SEARCH_CACHE_TOUCH_INTERVAL seconds, and expired rows are left for the
+    prune in put(), so readers don't queue on the database write lock.
+    """
+    
+    def __init__(self, path: Path = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL,
+                 max_entries: int = SEARCH_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        self._touches: Dict[str, List[float]] = {}  # Key -> [last_used, hits] not yet written
+        self._touched_at = time.time()
+        
+        # This process's counters
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.evictions = 0
+        self.latency_saved = 0.0
+    
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            " key TEXT PRIMARY KEY,"
+            " results TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " fetch_ms REAL NOT NULL DEFAULT 0,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS search_cache_last_used ON search_cache (last_used)")
+        conn.execute("CREATE INDEX IF NOT EXISTS search_cache_created_at ON search_cache (created_at)")
+        return conn
+    
+    @staticmethod
+    def key(query: str, k: int) -> str:
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha256(f"{k}\0{normalized}".encode("utf-8")).hexdigest()
+    
+    def get(self, query: str, k: int) -> Optional[List[Dict[str, str]]]:
+        """
+        Cached results for the query, if present and fresh.
+        
+        Returns:
+            List of results, or None on a miss
+        """
+        key = self.key(query, k)
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT results, created_at, fetch_ms FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[1] > self.ttl:
+                    self.expired += 1  # Deleted by the next prune
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                touch = self._touches.setdefault(key, [now, 0])
+                touch[0] = now
+                touch[1] += 1
+                self.hits += 1
+                self.latency_saved += row[2] / 1000
+                if now - self._touched_at >= SEARCH_CACHE_TOUCH_INTERVAL:
+                    self._flush_touches(now)
+            return json.loads(row[0])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Search cache read failed: {e}")
+            return None
+    
+    def _flush_touches(self, now: float):
+        """Write batched hits in one transaction; caller holds _lock."""
+        touches, self._touches = self._touches, {}
+        self._touched_at = now
+        if not touches:
+            return
+        try:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE search_cache SET last_used = MAX(last_used, ?), hits = hits + ? WHERE key = ?",
+                [(last_used, hits, key) for key, (last_used, hits) in touches.items()]
+            )
+            self._conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            print(f"⚠️ Search cache hit counts not saved: {e}")
+    
+    def put(self, query: str, k: int, results: List[Dict[str, str]], fetch_seconds: float = 0.0):
+        """Store live results, then drop expired entries and the least recently used over the limit."""
+        now = time.time()
+        try:
+            with self._lock:
+                self._flush_touches(now)  # Eviction below orders by last_used
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (key, results, created_at, last_used, fetch_ms, hits) "
+                    "VALUES (?, ?, ?, ?, ?, 0)",
+                    (self.key(query, k), json.dumps(results), now, now, fetch_seconds * 1000)
+                )
+                self.stores += 1
+                self._conn.execute("DELETE FROM search_cache WHERE created_at < ?", (now - self.ttl,))
+                excess = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    self._conn.execute(
+                        "DELETE FROM search_cache WHERE key IN "
+                        "(SELECT key FROM search_cache ORDER BY last_used LIMIT ?)", (excess,)
+                    )
+                    self.evictions += excess
+        except sqlite3.Error as e:
+            print(f"⚠️ Search cache write failed: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit rate, quota and latency saved (this process), plus totals shared by all processes."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "enabled": True,
+                "path": str(self.path),
+                "ttl_seconds": self.ttl,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "quota_saved": self.hits,  # One API request per hit
+                "latency_saved_ms": self.latency_saved * 1000,
+            }
+            self._flush_touches(time.time())
+            try:
+                entries, total_hits, total_saved = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(hits), 0), COALESCE(SUM(hits * fetch_ms), 0) FROM search_cache"
+                ).fetchone()
+                stats["shared"] = {"entries": entries, "hits": total_hits, "latency_saved_ms": total_saved}
+            except sqlite3.Error as e:
+                stats["shared"] = {"error": str(e)}
+        return stats
+    
+    def clear(self):
+        with self._lock:
+            self._touches.clear()
+            self._conn.execute("DELETE FROM search_cache")
 
 
 class WebSearchInterface:
@@ -20,19 +345,89 @@ class WebSearchInterface:
     def __init__(self):
         self.api_key = os.getenv("GOOGLE_API_KEY")
         self.cse_id = os.getenv("GOOGLE_CSE_ID")
+        # Overridable so load tests can use the local mock (mock_openai.py)
+        self.search_url = os.getenv("GOOGLE_SEARCH_URL", "https://www.googleapis.com/customsearch/v1")
         self._configured = bool(self.api_key and self.cse_id)
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.http_metrics = SearchHTTPMetrics()
+        self._cache = None
+        self._cache_failed = not SEARCH_CACHE_ENABLED
+        self._executor = None
+        self._in_flight: Dict[str, Dict[str, Any]] = {}  # Key -> {"future", "missed"}
+        self.deadline_metrics = SearchDeadlineMetrics()
+    
+    def _get_session(self):
+        """
+        Shared requests.Session with a pooled adapter and bounded retries.
+        
+        Connections are kept alive and reused across searches (and threads).
+        Connect errors and retryable statuses (429/5xx) are retried with
+        exponential backoff; read timeouts are not, so a slow backend costs
+        at most one read timeout. No wait between retries, including one a
+        Retry-After header asks for, is longer than SEARCH_RETRY_WAIT_MAX.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    from requests.adapters import HTTPAdapter
+                    
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SEARCH_POOL_SIZE, max_retries=_build_retry())
+                    session = requests.Session()
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+    
+    def _pool_stats(self) -> Dict[str, int]:
+        """Requests sent and connections opened by the session's pools."""
+        stats = {"http_requests": 0, "connections_opened": 0}
+        if self._session is None:
+            return stats
+        pools = self._session.get_adapter(self.search_url).poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                stats["http_requests"] += pool.num_requests
+                stats["connections_opened"] += pool.num_connections
+        return stats
+    
+    def get_http_metrics(self) -> Dict[str, Any]:
+        """Live search call, retry and connection-reuse metrics."""
+        return self.http_metrics.get_metrics(self._pool_stats())
+    
+    def get_cache(self) -> Optional[SearchCache]:
+        """The result cache, opened on first use (None if disabled or unavailable)."""
+        if self._cache is None and not self._cache_failed:
+            with self._session_lock:
+                if self._cache is None and not self._cache_failed:
+                    try:
+                        self._cache = SearchCache()
+                    except (sqlite3.Error, OSError) as e:
+                        print(f"⚠️ Search cache unavailable: {e}")
+                        self._cache_failed = True
+        return self._cache
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Result cache statistics (hit rate, quota and latency saved)."""
+        if not self._configured:
+            return {"enabled": False}
+        cache = self.get_cache()
+        return cache.get_stats() if cache is not None else {"enabled": False}
     
     def is_available(self) -> bool:
         """Check if web search is properly configured."""
         return self._configured
     
-    def search(self, query: str, k: int = 3) -> List[Dict[str, str]]:
+    def search(self, query: str, k: int = 3, deadline: Optional[float] = None) -> List[Dict[str, str]]:
         """
         Perform web search and return results.
         
         Args:
             query: Search query string
             k: Number of results to return
+            deadline: Seconds to wait for live results; None waits for the
+                request to finish or fail
             
         Returns:
             List of dictionaries with 'title', 'snippet', 'url' keys
@@ -40,20 +435,82 @@ class WebSearchInterface:
         if not self._configured:
             return self._get_stub_results(query, k)
         
+        cache = self.get_cache()
+        if cache is not None:
+            cached = cache.get(query, k)
+            if cached is not None:
+                return cached
+        
+        if deadline is not None:
+            return self._search_with_deadline(query, k, deadline)
+        
         try:
             return self._google_search(query, k)
         except Exception as e:
             print(f"Search error: {e}")
             return self._get_stub_results(query, k)
     
+    def _search_with_deadline(self, query: str, k: int, deadline: float) -> List[Dict[str, str]]:
+        """
+        Run the live search in the background and wait at most `deadline` seconds.
+        
+        A search that misses the deadline returns stub results but keeps
+        running, and its results are written to the cache when they arrive.
+        Concurrent searches for the same query wait on the same request.
+        """
+        key = SearchCache.key(query, k)
+        with self._session_lock:
+            entry = self._in_flight.get(key)
+            joined = entry is not None
+            if entry is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="search")
+                entry = {"future": self._executor.submit(self._timed_google_search, query, k), "missed": False}
+                self._in_flight[key] = entry
+        self.deadline_metrics.record_call(joined)
+        future = entry["future"]
+        if not joined:
+            future.add_done_callback(lambda done: self._finish_in_flight(key, entry))
+        
+        try:
+            return future.result(timeout=max(0.0, deadline))
+        except FutureTimeout:
+            self.deadline_metrics.record_miss()
+            with self._session_lock:
+                entry["missed"] = True  # Counted once as late when the search finishes
+            return self._get_stub_results(query, k)
+        except Exception as e:
+            print(f"Search error: {e}")
+            return self._get_stub_results(query, k)
+    
+    def _timed_google_search(self, query: str, k: int) -> List[Dict[str, str]]:
+        start_time = time.time()
+        try:
+            return self._google_search(query, k)
+        finally:
+            self.deadline_metrics.record_fetch(time.time() - start_time)
+    
+    def _finish_in_flight(self, key: str, entry: Dict[str, Any]):
+        """Drop a finished search; it completed late if any caller gave up waiting for it."""
+        with self._session_lock:
+            if self._in_flight.get(key) is entry:
+                del self._in_flight[key]
+            late = entry["missed"]
+        if late:
+            self.deadline_metrics.record_late()
+    
+    def get_deadline_metrics(self) -> Dict[str, Any]:
+        """Deadline misses, late completions and fetch times of deadline-bounded searches."""
+        return self.deadline_metrics.get_metrics()
+    
     def _google_search(self, query: str, k: int) -> List[Dict[str, str]]:
         """Perform actual Google Custom Search."""
-        if not requests:
+        if not _load_requests():
             print("❌ requests library not available")
             return self._get_stub_results(query, k)
         
         # Google Custom Search API endpoint
-        url = "https://www.googleapis.com/customsearch/v1"
+        url = self.search_url
         
         params = {
             'key': self.api_key,
@@ -64,9 +521,9 @@ class WebSearchInterface:
             'fields': 'items(title,snippet,link)'
         }
         
+        start_time = time.time()
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            response = self._get(url, params)
             
             data = response.json()
             results = []
@@ -79,6 +536,9 @@ class WebSearchInterface:
                     'source': self._extract_domain(item.get('link', ''))
                 })
             
+            cache = self.get_cache()
+            if cache is not None:
+                cache.put(query, k, results, time.time() - start_time)
             return results
             
         except requests.RequestException as e:
@@ -88,6 +548,26 @@ class WebSearchInterface:
             print(f"Unexpected API response format: {e}")
             return self._get_stub_results(query, k)
     
+    def _get(self, url: str, params: Dict[str, Any]):
+        """GET through the pooled session, recording latency, retries and failures."""
+        start_time = time.time()
+        retries = 0
+        try:
+            response = self._get_session().get(
+                url, params=params, timeout=(SEARCH_CONNECT_TIMEOUT, SEARCH_READ_TIMEOUT)
+            )
+            retry_state = getattr(response.raw, "retries", None)
+            if retry_state is not None:
+                retries = len(retry_state.history)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if e.response is None and isinstance(e, requests.ConnectionError):
+                retries = SEARCH_MAX_RETRIES  # Connect retries were used up
+            self.http_metrics.record(time.time() - start_time, retries, e)
+            raise
+        self.http_metrics.record(time.time() - start_time, retries)
+        return response
+    
     def _extract_domain(self, url: str) -> str:
         """Extract domain name from URL for source attribution."""
         if not url:
@@ -215,19 +695,33 @@ def get_search_interface() -> WebSearchInterface:
         _search_interface = WebSearchInterface()
     return _search_interface
 
-def web_search(query: str, k: int = 3) -> List[Dict[str, str]]:
+def web_search(query: str, k: int = 3, deadline: Optional[float] = None) -> List[Dict[str, str]]:
     """
     Convenience function to perform web search.
     
     Args:
         query: Search query string
         k: Number of results to return
+        deadline: Seconds to wait for live results before falling back to
+            cached or stub results (None waits for the request)
         
     Returns:
         List of search results with title, snippet, url, and source
     """
     search_interface = get_search_interface()
-    return search_interface.search(query, k)
+    return search_interface.search(query, k, deadline=deadline)
+
+def get_search_http_metrics() -> Dict[str, Any]:
+    """Live search call, retry and connection-reuse metrics."""
+    return get_search_interface().get_http_metrics()
+
+def get_search_cache_stats() -> Dict[str, Any]:
+    """Search result cache hit rate, quota and latency saved."""
+    return get_search_interface().get_cache_stats()
+
+def get_search_deadline_metrics() -> Dict[str, Any]:
+    """Deadline misses and late completions of deadline-bounded searches."""
+    return get_search_interface().get_deadline_metrics()
 
 def is_search_available() -> bool:
     """Check if web search is available and configured."""
@@ -242,34 +736,34 @@ def get_search_status() -> Dict[str, any]:
         "configured": search_interface.is_available(),
         "api_key_set": bool(os.getenv("GOOGLE_API_KEY")),
         "cse_id_set": bool(os.getenv("GOOGLE_CSE_ID")),
-        "requests_available": requests is not None
+        "requests_available": requests is not None or importlib.util.find_spec("requests") is not None,
+        "http": search_interface.get_http_metrics(),
+        "cache": search_interface.get_cache_stats(),
+        "deadline": search_interface.get_deadline_metrics()
     }
 
-def reformulate_query_for_search(user_query: str, context: str = "") -> str:
+def reformulate_query_for_search(user_query: str, context: str = "",
+                                 analysis: Optional[TextAnalysis] = None) -> str:
     """
     Reformulate user query for better web search results.
     
     Args:
         user_query: Original user query
         context: Optional context from conversation
+        analysis: The turn's TextAnalysis of user_query, to reuse its scan
         
     Returns:
         Reformulated search query
     """
     # Basic query enhancement for health searches
     query = user_query.strip()
+    if analysis is None:
+        analysis = analyze_text(user_query)
     
-    # Add health context if not present
-    if not any(term in query.lower() for term in ['health', 'medical', 'doctor', 'treatment', 'symptoms', 'condition']):
-        # Check if it's likely a health query based on keywords
-        health_keywords = [
-            'diabetes', 'blood pressure', 'hypertension', 'cholesterol', 'heart',
-            'pain', 'symptoms', 'medication', 'treatment', 'diagnosis', 'test',
-            'appointment', 'visit', 'specialist', 'insurance', 'bill', 'cost'
-        ]
-        
-        if any(keyword in query.lower() for keyword in health_keywords):
-            query = f"{query} health medical information"
+    # Add health context if not present and it's likely a health query
+    # (see SEARCH_CONTEXT_TERMS and SEARCH_HEALTH_KEYWORDS)
+    if not analysis.has("search", "health_context") and analysis.has("search", "health"):
+        query = f"{query} health medical information"
     
     # Add site preferences for reliable sources
     reliable_sites = [
@@ -0,0 +1,316 @@
+"""
+Embedding-similarity safety check for WellNavigator.
+Second stage after the keyword pass: catches paraphrases the keyword lists
+miss ("my chest feels like an elephant is sitting on it") by comparing the
+query's embedding with labeled exemplars for each refusal category.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from .safety import REFUSAL_CATEGORY_KEYWORDS
+from .rag import get_retriever
+
+# auto: run only when the RAG embedding model is already loaded (adds no model
+# load); true: load the model for this if needed; false: off
+SEMANTIC_SAFETY = os.getenv("SEMANTIC_SAFETY", "auto").lower()
+# report: log the category a query would be refused for, without refusing;
+# refuse: refuse it. Only switch to refuse after calibrating the threshold with
+# python benchmarks/safety_eval.py --semantic against the deployed encoder
+SEMANTIC_SAFETY_ACTION = os.getenv("SEMANTIC_SAFETY_ACTION", "report").lower()
+SEMANTIC_SAFETY_THRESHOLD = float(os.getenv("SEMANTIC_SAFETY_THRESHOLD", "0.7"))  # Cosine similarity
+# Allowed queries scoring within this margin below the threshold are reported
+# as a near miss ('near_category'), which the model router can use
+SEMANTIC_SAFETY_NEAR_MARGIN = float(os.getenv("SEMANTIC_SAFETY_NEAR_MARGIN", "0.1"))
+SEMANTIC_SAFETY_CACHE = Path(os.getenv("SEMANTIC_SAFETY_CACHE", "data/cache/safety_exemplars.npz"))
+
+# Paraphrases of each refusal category that keyword matching can't catch
+SAFETY_EXEMPLARS = {
+    "emergency": [
+        "my chest feels like an elephant is sitting on it",
+        "there is a tight squeezing pressure in my chest spreading to my left arm",
+        "one side of my face suddenly went numb and my words are coming out wrong",
+        "I can't catch my breath and my lips are turning blue",
+        "my throat is swelling shut after a bee sting",
+        "he collapsed and won't wake up",
+        "I swallowed a whole bottle of my sleeping pills",
+        "the cut won't stop gushing blood no matter how hard I press",
+    ],
+    "harmful": [
+        "I don't see a reason to keep going anymore",
+        "everyone would be better off without me",
+        "I've been thinking about ending it all",
+        "I want to go to sleep and never wake up",
+        "I've been cutting myself to cope",
+        "how many of my pills would it take to not wake up",
+    ],
+    "illicit": [
+        "how can I get more oxycodone than my doctor gives me",
+        "which pills give the best buzz when crushed",
+        "how do I get someone else's prescription filled in my name",
+        "what can I mix with alcohol to feel really wasted",
+        "how to make a doctor's note look real",
+    ],
+    "diagnosis": [
+        "based on my symptoms, what illness am I dealing with",
+        "can you figure out what's going on with my body",
+        "I have a rash and a fever, which condition is it",
+        "does this sound like lupus to you",
+        "tell me what's causing my headaches",
+        "what am I suffering from",
+    ],
+    "prescription": [
+        "how many milligrams of ibuprofen should I be taking",
+        "is it fine to quit my antidepressants cold turkey",
+        "which antibiotic would clear up my infection",
+        "can you recommend a pill for my anxiety",
+        "should I double up on my blood pressure meds today",
+        "what's the right amount of insulin for me",
+    ],
+    "no_medical_records": [
+        "here are my blood test numbers, what do they mean",
+        "my cholesterol came back 260, is that bad for me",
+        "can you go through my MRI report",
+        "my A1C is 7.2, explain my results",
+        "look over my pathology report",
+    ],
+    "out_of_scope": [
+        "my dog ate chocolate, what should I do",
+        "write me a sick note for work",
+        "how can I get disability benefits without being disabled",
+        "what's a natural remedy that cures cancer",
+        "help me convince my doctor to sign off on something false",
+    ],
+}
+
+# Categories in keyword-pass priority order; the first one over the threshold wins
+CATEGORY_PRIORITY = [category for category, _ in REFUSAL_CATEGORY_KEYWORDS]
+
+
+class SemanticSafetyClassifier:
+    """
+    Nearest-exemplar classifier over sentence embeddings.
+
+    Exemplar embeddings are computed once per model and exemplar set and
+    cached to disk; classifying a query is one encode plus one matrix-vector
+    product against all exemplars.
+    """
+
+    def __init__(self, exemplars: Optional[Dict[str, List[str]]] = None,
+                 threshold: float = SEMANTIC_SAFETY_THRESHOLD,
+                 cache_path: Path = SEMANTIC_SAFETY_CACHE):
+        self.exemplars = exemplars if exemplars is not None else SAFETY_EXEMPLARS
+        self.threshold = threshold
+        self.cache_path = Path(cache_path)
+        self.categories = [c for c in CATEGORY_PRIORITY if c in self.exemplars]
+        self.categories += [c for c in self.exemplars if c not in self.categories]
+        self._matrix = None    # (n_exemplars, dim), L2-normalized
+        self._starts = None    # First row of each category (rows grouped by category)
+        self._texts: List[str] = []
+        self._lock = threading.Lock()
+
+    def _cache_key(self, model_name: str) -> str:
+        payload = json.dumps({"model": model_name, "exemplars": [[c, self.exemplars[c]] for c in self.categories]})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def prepare(self, encoder, model_name: str) -> bool:
+        """
+        Load the exemplar matrix from the disk cache, or encode and cache it.
+
+        Args:
+            encoder: SentenceTransformer used for queries too
+            model_name: Model name (part of the cache key)
+
+        Returns:
+            True once the matrix is ready
+        """
+        if self._matrix is not None:
+            return True
+
+        import numpy as np
+
+        with self._lock:
+            if self._matrix is not None:
+                return True
+
+            texts, starts = [], []
+            for category in self.categories:
+                starts.append(len(texts))
+                texts.extend(self.exemplars[category])
+
+            key = self._cache_key(model_name)
+            matrix = None
+            if self.cache_path.exists():
+                try:
+                    cached = np.load(self.cache_path, allow_pickle=False)
+                    if str(cached["key"]) == key:
+                        matrix = cached["embeddings"]
+                except Exception as e:
+                    print(f"⚠️ Ignoring unreadable safety exemplar cache: {e}")
+
+            if matrix is None:
+                matrix = self._normalize(np.asarray(encoder.encode(texts), dtype="float32"))
+                try:
+                    self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                    np.savez(self.cache_path, embeddings=matrix, key=np.array(key))
+                except OSError as e:
+                    print(f"⚠️ Could not cache safety exemplars: {e}")
+
+            self._texts = texts
+            self._starts = np.array(starts)
+            self._matrix = matrix
+        return True
+
+    @staticmethod
+    def _normalize(vectors):
+        import numpy as np
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def classify(self, text: str, encoder) -> Dict[str, Any]:
+        """
+        Score the text against every exemplar.
+
+        Returns:
+            Dict with 'category' (highest-priority category whose best
+            exemplar is over the threshold, or None), 'near_category' (the
+            same within SEMANTIC_SAFETY_NEAR_MARGIN below it, if not flagged),
+            'score' and 'exemplar' for it (else for the overall best match),
+            and per-category 'scores'
+        """
+        import numpy as np
+
+        query = self._normalize(np.asarray(encoder.encode([text]), dtype="float32"))[0]
+        similarities = self._matrix @ query
+        best = np.maximum.reduceat(similarities, self._starts)
+        scores = {category: float(score) for category, score in zip(self.categories, best)}
+
+        flagged = [c for c in self.categories if scores[c] >= self.threshold]
+        category = flagged[0] if flagged else None
+        near = [c for c in self.categories if scores[c] >= self.threshold - SEMANTIC_SAFETY_NEAR_MARGIN]
+        near_category = near[0] if near and category is None else None
+        if category is not None:
+            start = self._starts[self.categories.index(category)]
+            end = start + len(self.exemplars[category])
+            row = start + int(np.argmax(similarities[start:end]))
+        else:
+            row = int(np.argmax(similarities))
+        return {
+            "category": category,
+            "near_category": near_category,
+            "score": float(similarities[row]),
+            "exemplar": self._texts[row],
+            "scores": scores,
+        }
+
+
+class SemanticSafetyMetrics:
+    """Process-wide counts and added latency of the semantic check."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self.window = window
+        self.runs = 0
+        self.flagged = 0
+        self._latencies: List[float] = []
+
+    def record(self, latency: float, flagged: bool):
+        with self._lock:
+            self.runs += 1
+            self.flagged += flagged
+            self._latencies.append(latency)
+            if len(self._latencies) > self.window:
+                self._latencies = self._latencies[-self.window:]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        return {
+            "mode": SEMANTIC_SAFETY,
+            "action": SEMANTIC_SAFETY_ACTION,
+            "runs": self.runs,
+            "flagged": self.flagged,
+            "avg_latency_ms": (sum(latencies) / len(latencies) * 1000) if latencies else 0.0,
+            "p95_latency_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000 if latencies else 0.0,
+        }
+
+
+# Global instances
+_classifier = None
+_classifier_lock = threading.Lock()
+_metrics = SemanticSafetyMetrics()
+
+def get_semantic_classifier() -> SemanticSafetyClassifier:
+    """Get or create global semantic safety classifier."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = SemanticSafetyClassifier()
+    return _classifier
+
+def _get_encoder():
+    """The RAG embedding model, if the mode allows using (or loading) it."""
+    if SEMANTIC_SAFETY in ("false", "off"):
+        return None
+    retriever = get_retriever()
+    if SEMANTIC_SAFETY == "true":
+        return retriever.get_embedder()
+    return retriever.embedder  # auto: only if RAG already loaded it
+
+def prepare_semantic_safety() -> bool:
+    """Build (or load the cached) exemplar matrix now; used by warm-up."""
+    encoder = _get_encoder()
+    if encoder is None:
+        return False
+    return get_semantic_classifier().prepare(encoder, get_retriever().embedding_model_name())
+
+def check_semantic_safety(user_input: str) -> Dict[str, Any]:
+    """
+    Run the embedding-similarity check (call only when the keyword pass is clean).
+
+    Args:
+        user_input: The (redacted) user message
+
+    Returns:
+        Dict with 'ran' (False if the encoder isn't available), 'category'
+        (REFUSAL_TEMPLATES key to refuse with, or None; always None in report
+        mode), 'flagged_category' (category over the threshold, refused or
+        not), 'near_category' (category the query came close to or was only
+        reported for, or None), 'score', 'exemplar' and 'latency_ms'
+    """
+    encoder = _get_encoder()
+    if encoder is None:
+        return {"ran": False, "category": None, "flagged_category": None, "near_category": None}
+
+    start = time.perf_counter()
+    try:
+        classifier = get_semantic_classifier()
+        classifier.prepare(encoder, get_retriever().embedding_model_name())
+        result = classifier.classify(user_input, encoder)
+    except Exception as e:
+        print(f"⚠️ Semantic safety check failed: {e}")
+        return {"ran": False, "category": None, "flagged_category": None, "near_category": None, "error": str(e)}
+    latency = time.perf_counter() - start
+
+    flagged = result["category"]
+    category = flagged if SEMANTIC_SAFETY_ACTION == "refuse" else None
+    _metrics.record(latency, flagged is not None)
+    return {
+        "ran": True,
+        "category": category,
+        "flagged_category": flagged,
+        # Reported-only flags still count as near misses for the model router
+        "near_category": result["near_category"] or (flagged if category is None else None),
+        "score": round(result["score"], 4),
+        "exemplar": result["exemplar"] if flagged else None,
+        "latency_ms": latency * 1000,
+    }
+
+def get_semantic_safety_metrics() -> Dict[str, Any]:
+    """Process-wide semantic safety metrics (runs, flagged, added latency)."""
+    return _metrics.get_metrics()
@@ -0,0 +1,91 @@
+"""
+Output sinks for WellNavigator.
+A sink receives everything a chat turn produces, so the same pipeline can drive
+the Streamlit app, a CLI or a load-test harness.
+"""
+
+import time
+from typing import List, Dict, Optional
+
+
+class TokenSink:
+    """
+    UI-agnostic receiver for the output of one chat turn.
+
+    All methods are no-ops; subclasses override the events they care about.
+    """
+
+    def on_user_message(self, text: str):
+        """The (redacted) user message was accepted for this turn."""
+
+    def on_queued(self, depth: int, estimated_wait: float):
+        """The LLM request is waiting in the rate-limit queue."""
+
+    def on_token(self, token: str, response: str):
+        """A new token arrived; `response` is the text so far."""
+
+    def on_complete(self, response: str):
+        """Final text for the turn (answer, refusal, error or limit message)."""
+
+    def on_notice(self, level: str, message: str):
+        """An extra message for the user; level is 'info' or 'warning'."""
+
+    def on_citations(self, citations: List[Dict]):
+        """Sources used for the answer."""
+
+
+class PlaceholderSink(TokenSink):
+    """Streams into a single Streamlit placeholder (st.empty())."""
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+
+    def on_queued(self, depth: int, estimated_wait: float):
+        self.placeholder.markdown(
+            f"⏳ *Queued — high demand right now ({depth} request(s) waiting, "
+            f"about {max(1, round(estimated_wait))}s). Your answer will start shortly...*"
+        )
+
+    def on_token(self, token: str, response: str):
+        # Show accumulated response with a typing cursor
+        self.placeholder.markdown(response + "▌")
+
+    def on_complete(self, response: str):
+        self.placeholder.markdown(response)
+
+
+class CollectingSink(TokenSink):
+    """Collects a turn's output in memory and times the first token."""
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.first_token_time: Optional[float] = None
+        self.tokens: List[str] = []
+        self.response = ""
+        self.notices: List[Dict[str, str]] = []
+        self.citations: List[Dict] = []
+        self.queued = False
+
+    def on_queued(self, depth: int, estimated_wait: float):
+        self.queued = True
+
+    def on_token(self, token: str, response: str):
+        if self.first_token_time is None:
+            self.first_token_time = time.time()
+        self.tokens.append(token)
+
+    def on_complete(self, response: str):
+        self.response = response
+
+    def on_notice(self, level: str, message: str):
+        self.notices.append({"level": level, "message": message})
+
+    def on_citations(self, citations: List[Dict]):
+        self.citations = citations
+
+    @property
+    def ttft(self) -> Optional[float]:
+        """Seconds from sink creation to the first token, if any arrived."""
+        if self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
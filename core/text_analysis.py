@@ -0,0 +1,157 @@
+"""
+Shared per-turn text analysis for WellNavigator.
+Normalizes the user message once and scans it once with a single automaton
+holding every keyword set (safety categories, search health terms, listening
+mode topics); safety, search and listening mode read their hits from the
+result instead of rescanning the message.
+"""
+
+import re
+import threading
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+from .keywords import KeywordAutomaton, KeywordMatch, _is_word_char
+from .safety import REFUSAL_CATEGORY_KEYWORDS, SAFETY_WORD_BOUNDARY
+
+
+# Terms that mean a query already has health context (no need to add it for search)
+SEARCH_CONTEXT_TERMS = ["health", "medical", "doctor", "treatment", "symptoms", "condition"]
+
+# Terms that make a query health-related enough to add health context for search
+SEARCH_HEALTH_KEYWORDS = [
+    "diabetes", "blood pressure", "hypertension", "cholesterol", "heart",
+    "pain", "symptoms", "medication", "treatment", "diagnosis", "test",
+    "appointment", "visit", "specialist", "insurance", "bill", "cost"
+]
+
+# Listening mode coach topics (suggestions are in core/voice.py)
+COACH_TOPIC_KEYWORDS = [
+    ("diabetes", ["diabetes", "blood sugar", "insulin"]),
+    ("blood_pressure", ["blood pressure", "hypertension", "high bp"]),
+    ("appointment", ["doctor", "appointment", "visit", "see"]),
+    ("medication", ["medication", "medicine", "drug", "side effect"]),
+    ("test_results", ["test", "result", "lab", "blood work"]),
+    ("lifestyle", ["diet", "exercise", "sleep", "stress"]),
+    ("cost", ["insurance", "cost", "bill", "afford", "expensive"]),
+]
+
+# Keyword sets by namespace; safety comes first so its priority order holds
+KEYWORD_SETS: List[Tuple[str, List[Tuple[str, List[str]]]]] = [
+    ("safety", REFUSAL_CATEGORY_KEYWORDS),
+    ("search", [("health_context", SEARCH_CONTEXT_TERMS), ("health", SEARCH_HEALTH_KEYWORDS)]),
+    ("coach", COACH_TOPIC_KEYWORDS),
+]
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def _build_automaton() -> KeywordAutomaton:
+    # Keywords are lowercased here and texts once in TextAnalysis, so the
+    # automaton itself matches case-sensitively
+    categories = [
+        (f"{namespace}:{category}", [keyword.lower() for keyword in keywords])
+        for namespace, sets in KEYWORD_SETS
+        for category, keywords in sets
+    ]
+    return KeywordAutomaton(categories, case_sensitive=True)
+
+
+_automaton = None
+_automaton_lock = threading.Lock()
+
+def get_text_automaton(rebuild: bool = False) -> KeywordAutomaton:
+    """
+    Get the automaton over all keyword sets, built on first use.
+
+    Args:
+        rebuild: Rebuild after keyword lists have been changed
+
+    Returns:
+        Shared KeywordAutomaton with categories named "<namespace>:<category>"
+    """
+    global _automaton
+    with _automaton_lock:
+        if _automaton is None or rebuild:
+            _automaton = _build_automaton()
+    return _automaton
+
+
+class TextAnalysis:
+    """
+    One message, normalized and scanned once (on first use, so a turn whose
+    safety decision comes from the cache and that needs no other hits skips
+    the scan).
+
+    Matching is by substring (as each consumer did before); safety categories
+    additionally honor SAFETY_WORD_BOUNDARY.
+    """
+
+    def __init__(self, text: str, automaton: Optional[KeywordAutomaton] = None):
+        self.text = text
+        self.normalized = text.lower()
+        self._automaton = automaton or get_text_automaton()
+        self._categories: Dict[str, List[str]] = {}
+
+    @cached_property
+    def matches(self) -> List[KeywordMatch]:
+        """Every keyword hit, scanned on first use (spans index the normalized text)."""
+        matches = self._automaton.find_all(self.normalized, word_boundary=False)
+        if SAFETY_WORD_BOUNDARY:
+            matches = [
+                match for match in matches
+                if not match.category.startswith("safety:") or self._at_word_boundary(match)
+            ]
+        return matches
+
+    @cached_property
+    def _found(self) -> set:
+        return {match.category for match in self.matches}
+
+    def _at_word_boundary(self, match: KeywordMatch) -> bool:
+        text, keyword = self.normalized, match.keyword
+        if _is_word_char(keyword[0]) and match.start > 0 and _is_word_char(text[match.start - 1]):
+            return False
+        if _is_word_char(keyword[-1]) and match.end < len(text) and _is_word_char(text[match.end]):
+            return False
+        return True
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Lowercased word tokens."""
+        return _TOKEN_PATTERN.findall(self.normalized)
+
+    def categories(self, namespace: str) -> List[str]:
+        """Matched categories of a namespace, in the order they were declared."""
+        categories = self._categories.get(namespace)
+        if categories is None:
+            prefix = f"{namespace}:"
+            categories = self._categories[namespace] = [
+                category[len(prefix):] for category in self._automaton.categories
+                if category in self._found and category.startswith(prefix)
+            ]
+        return categories
+
+    def has(self, namespace: str, category: str) -> bool:
+        """Whether any keyword of the category occurs in the text."""
+        return f"{namespace}:{category}" in self._found
+
+    @property
+    def refusal_category(self) -> Optional[str]:
+        """Highest-priority refusal category (REFUSAL_TEMPLATES key), or None."""
+        categories = self.categories("safety")
+        return categories[0] if categories else None
+
+
+def analyze_text(text: str) -> TextAnalysis:
+    """
+    Analyze a message once for all consumers.
+
+    Args:
+        text: The (redacted) user message
+
+    Returns:
+        TextAnalysis to pass to should_refuse, reformulate_query_for_search
+        and add_to_listening_mode
+    """
+    return TextAnalysis(text)
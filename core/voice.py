@@ -8,12 +8,17 @@ import io
 import time
 import base64
 from typing import Optional, Dict, List, Any
-import streamlit as st
+import importlib.util
 
 try:
-    import openai
+    import streamlit as st
 except ImportError:
-    openai = None
+    st = None
+
+from .text_analysis import TextAnalysis, analyze_text
+
+# openai is imported when the first transcription needs a client
+openai = None
 
 
 class VoiceTranscriber:
@@ -21,26 +26,50 @@ class VoiceTranscriber:
     
     def __init__(self):
         self.client = None
-        self._initialize_client()
+        self._client_failed = False
     
     def _initialize_client(self):
         """Initialize OpenAI client for transcription."""
+        global openai
         if openai is None:
-            print("❌ OpenAI library not available")
-            return
+            try:
+                import openai as openai_module
+            except ImportError:
+                print("❌ OpenAI library not available")
+                self._client_failed = True
+                return
+            openai = openai_module
         
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             print("❌ OPENAI_API_KEY not found")
+            self._client_failed = True
             return
         
         try:
-            self.client = openai.OpenAI(api_key=api_key)
+            # OPENAI_BASE_URL lets tests point transcription at a local mock server
+            self.client = openai.OpenAI(api_key=api_key, base_url=os.getenv("OPENAI_BASE_URL") or None)
         except Exception as e:
             print(f"❌ Error initializing OpenAI client: {e}")
+            self._client_failed = True
     
     def is_available(self) -> bool:
-        """Check if transcription is available."""
+        """
+        Check if transcription is available.
+        
+        Cheap: checks that openai is installed and a key is set; the client is
+        created on the first transcription.
+        """
+        if self.client is not None:
+            return True
+        if self._client_failed or not os.getenv("OPENAI_API_KEY"):
+            return False
+        return openai is not None or importlib.util.find_spec("openai") is not None
+    
+    def connect(self) -> bool:
+        """Create the transcription client if needed; returns True if it exists."""
+        if self.client is None and not self._client_failed:
+            self._initialize_client()
         return self.client is not None
     
     def transcribe_audio(self, audio_data: bytes, filename: str = "audio.webm") -> Optional[str]:
@@ -54,7 +83,7 @@ class VoiceTranscriber:
         Returns:
             Transcribed text or None if failed
         """
-        if not self.is_available():
+        if not self.connect():
             return None
         
         try:
@@ -76,24 +105,83 @@ class VoiceTranscriber:
             return None
 
 
+# Coach suggestion per listening mode topic (keywords in COACH_TOPIC_KEYWORDS)
+COACH_SUGGESTIONS = {
+    # Health condition detection
+    "diabetes": {
+        "title": "Diabetes Management",
+        "content": "Consider asking about blood sugar monitoring, medication adherence, and lifestyle modifications.",
+        "icon": "🩺",
+        "priority": "high"
+    },
+    "blood_pressure": {
+        "title": "Blood Pressure Control",
+        "content": "Discuss lifestyle changes, medication timing, and home monitoring techniques.",
+        "icon": "❤️",
+        "priority": "high"
+    },
+    # Appointment preparation
+    "appointment": {
+        "title": "Appointment Preparation",
+        "content": "Prepare questions, bring medication list, and consider bringing a support person.",
+        "icon": "📅",
+        "priority": "medium"
+    },
+    # Medication concerns
+    "medication": {
+        "title": "Medication Review",
+        "content": "Discuss effectiveness, side effects, interactions, and adherence strategies.",
+        "icon": "💊",
+        "priority": "high"
+    },
+    # Test results
+    "test_results": {
+        "title": "Test Results Discussion",
+        "content": "Ask for explanations in plain language, understand normal ranges, and clarify next steps.",
+        "icon": "🔬",
+        "priority": "medium"
+    },
+    # Lifestyle factors
+    "lifestyle": {
+        "title": "Lifestyle Optimization",
+        "content": "Focus on sustainable changes, gradual improvements, and realistic goal setting.",
+        "icon": "🌱",
+        "priority": "medium"
+    },
+    # Insurance/cost concerns
+    "cost": {
+        "title": "Financial Resources",
+        "content": "Explore insurance benefits, patient assistance programs, and generic alternatives.",
+        "icon": "💰",
+        "priority": "medium"
+    },
+}
+
+
 class ListeningModeDemo:
     """Demo listening mode with live notes and coach suggestions."""
     
     def __init__(self):
         self.session_key = "listening_mode_data"
+        self._local_state: Dict[str, Any] = {}
         self._initialize_session_data()
     
+    @property
+    def _state(self):
+        """Streamlit session state, or a process-local dict without Streamlit (e.g. server.py)."""
+        return st.session_state if st is not None else self._local_state
+    
     def _initialize_session_data(self):
         """Initialize session data for listening mode."""
-        if self.session_key not in st.session_state:
-            st.session_state[self.session_key] = {
+        if self.session_key not in self._state:
+            self._state[self.session_key] = {
                 "live_notes": [],
                 "coach_suggestions": [],
                 "session_start_time": time.time(),
                 "total_messages": 0
             }
     
-    def add_user_message(self, message: str):
+    def add_user_message(self, message: str, analysis: Optional[TextAnalysis] = None):
         """Add user message to live notes."""
         if not message.strip():
             return
@@ -105,87 +193,27 @@ class ListeningModeDemo:
             "type": "user_message"
         }
         
-        st.session_state[self.session_key]["live_notes"].append(note)
-        st.session_state[self.session_key]["total_messages"] += 1
+        self._state[self.session_key]["live_notes"].append(note)
+        self._state[self.session_key]["total_messages"] += 1
         
         # Generate coach suggestions based on message content
-        self._generate_coach_suggestions(message)
+        self._generate_coach_suggestions(message, analysis)
     
-    def _generate_coach_suggestions(self, message: str):
-        """Generate coach suggestions based on message content."""
-        suggestions = []
-        message_lower = message.lower()
-        
-        # Health condition detection
-        if any(term in message_lower for term in ['diabetes', 'blood sugar', 'insulin']):
-            suggestions.append({
-                "title": "Diabetes Management",
-                "content": "Consider asking about blood sugar monitoring, medication adherence, and lifestyle modifications.",
-                "icon": "🩺",
-                "priority": "high"
-            })
-        
-        if any(term in message_lower for term in ['blood pressure', 'hypertension', 'high bp']):
-            suggestions.append({
-                "title": "Blood Pressure Control",
-                "content": "Discuss lifestyle changes, medication timing, and home monitoring techniques.",
-                "icon": "❤️",
-                "priority": "high"
-            })
-        
-        # Appointment preparation
-        if any(term in message_lower for term in ['doctor', 'appointment', 'visit', 'see']):
-            suggestions.append({
-                "title": "Appointment Preparation",
-                "content": "Prepare questions, bring medication list, and consider bringing a support person.",
-                "icon": "📅",
-                "priority": "medium"
-            })
-        
-        # Medication concerns
-        if any(term in message_lower for term in ['medication', 'medicine', 'drug', 'side effect']):
-            suggestions.append({
-                "title": "Medication Review",
-                "content": "Discuss effectiveness, side effects, interactions, and adherence strategies.",
-                "icon": "💊",
-                "priority": "high"
-            })
-        
-        # Test results
-        if any(term in message_lower for term in ['test', 'result', 'lab', 'blood work']):
-            suggestions.append({
-                "title": "Test Results Discussion",
-                "content": "Ask for explanations in plain language, understand normal ranges, and clarify next steps.",
-                "icon": "🔬",
-                "priority": "medium"
-            })
-        
-        # Lifestyle factors
-        if any(term in message_lower for term in ['diet', 'exercise', 'sleep', 'stress']):
-            suggestions.append({
-                "title": "Lifestyle Optimization",
-                "content": "Focus on sustainable changes, gradual improvements, and realistic goal setting.",
-                "icon": "🌱",
-                "priority": "medium"
-            })
-        
-        # Insurance/cost concerns
-        if any(term in message_lower for term in ['insurance', 'cost', 'bill', 'afford', 'expensive']):
-            suggestions.append({
-                "title": "Financial Resources",
-                "content": "Explore insurance benefits, patient assistance programs, and generic alternatives.",
-                "icon": "💰",
-                "priority": "medium"
-            })
+    def _generate_coach_suggestions(self, message: str, analysis: Optional[TextAnalysis] = None):
+        """Generate coach suggestions from the topics found in the message."""
+        if analysis is None:
+            analysis = analyze_text(message)
+        topics = analysis.categories("coach")
+        suggestions = [COACH_SUGGESTIONS[topic] for topic in topics if topic in COACH_SUGGESTIONS]
         
         # Add unique suggestions to session data
         for suggestion in suggestions:
-            if suggestion not in st.session_state[self.session_key]["coach_suggestions"]:
-                st.session_state[self.session_key]["coach_suggestions"].append(suggestion)
+            if suggestion not in self._state[self.session_key]["coach_suggestions"]:
+                self._state[self.session_key]["coach_suggestions"].append(dict(suggestion))
     
     def get_session_stats(self) -> Dict[str, Any]:
         """Get listening mode session statistics."""
-        data = st.session_state[self.session_key]
+        data = self._state[self.session_key]
         session_duration = time.time() - data["session_start_time"]
         
         return {
@@ -197,7 +225,7 @@ class ListeningModeDemo:
     
     def clear_session(self):
         """Clear listening mode session data."""
-        st.session_state[self.session_key] = {
+        self._state[self.session_key] = {
             "live_notes": [],
             "coach_suggestions": [],
             "session_start_time": time.time(),
@@ -233,7 +261,7 @@ def transcribe_audio_file(audio_data: bytes, filename: str = "audio.webm") -> Op
     transcriber = get_transcriber()
     return transcriber.transcribe_audio(audio_data, filename)
 
-def add_to_listening_mode(message: str):
-    """Add message to listening mode live notes."""
+def add_to_listening_mode(message: str, analysis: Optional[TextAnalysis] = None):
+    """Add message to listening mode live notes (reusing the turn's TextAnalysis if given)."""
     listening_mode = get_listening_mode()
-    listening_mode.add_user_message(message)
+    listening_mode.add_user_message(message, analysis)
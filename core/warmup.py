@@ -0,0 +1,216 @@
+"""
+Background warm-up for WellNavigator.
+Loads the RAG index and embedder, pre-connects the OpenAI HTTP pool and
+prepares the tokenizer and safety matchers at process start, so the first
+query runs at steady-state latency. Opt-in via WARMUP_ON_START.
+"""
+
+import os
+import time
+import threading
+from typing import Dict, Any, Callable, Iterable, Optional
+
+# Opt-in: warm-up loads models and makes a request to the OpenAI API
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "false").lower() == "true"
+WARMUP_CONNECT_TIMEOUT = float(os.getenv("WARMUP_CONNECT_TIMEOUT", "5"))
+
+WARMUP_QUERY = "How can I prepare for my next doctor's appointment?"
+
+# Component states
+COLD = "cold"          # Not warmed (warm-up not started); loads on first use
+WARMING = "warming"
+READY = "ready"
+SKIPPED = "skipped"    # Not configured, nothing to warm
+FAILED = "failed"
+
+
+def _warm_safety() -> bool:
+    """Run the safety checks once so their matchers are compiled."""
+    from .safety import should_refuse, redact_pi
+    should_refuse(WARMUP_QUERY)
+    redact_pi(f"{WARMUP_QUERY} jane@example.com 555-123-4567")
+    return True
+
+
+def _warm_llm() -> bool:
+    """Create the shared OpenAI client, open its connection and load tokenizers."""
+    from .llm import get_openai_client, count_tokens, MODEL_ENCODINGS, DEFAULT_ENCODING
+    if not os.getenv("OPENAI_API_KEY"):
+        return False
+
+    # Tokenizers are used for budgeting on every turn (one per encoding is enough)
+    models_by_encoding = {encoding: model for model, encoding in MODEL_ENCODINGS.items()}
+    models_by_encoding.setdefault(DEFAULT_ENCODING, "gpt-3.5-turbo")
+    for model in models_by_encoding.values():
+        count_tokens(WARMUP_QUERY, model)
+
+    client = get_openai_client()
+    if client is None:
+        return False
+    # A cheap request opens the TLS connection the first chat call will reuse
+    client.with_options(timeout=WARMUP_CONNECT_TIMEOUT).models.list()
+    return True
+
+
+def _warm_search() -> bool:
+    """Import the HTTP library used for web search and create its pooled session."""
+    from .search import get_search_interface, _load_requests
+    search_interface = get_search_interface()
+    if not search_interface.is_available() or not _load_requests():
+        return False
+    search_interface._get_session()
+    return True
+
+
+def _warm_voice() -> bool:
+    """Create the transcription client."""
+    from .voice import get_transcriber
+    transcriber = get_transcriber()
+    if not transcriber.is_available():
+        return False
+    return transcriber.connect()
+
+
+def _warm_rag() -> bool:
+    """Load the index and embedder, then run one query (first inference is slow)."""
+    from .rag import get_retriever
+    retriever = get_retriever()
+    if not retriever.is_available():
+        return False
+    if not retriever.load_index():
+        raise RuntimeError("RAG index failed to load")
+    retriever.retrieve(WARMUP_QUERY, k=1)
+
+    # The semantic safety check shares the encoder; build its exemplar matrix too
+    from .semantic_safety import prepare_semantic_safety
+    prepare_semantic_safety()
+    return True
+
+
+WARMUP_TASKS: Dict[str, Callable[[], bool]] = {
+    "safety": _warm_safety,
+    "llm": _warm_llm,
+    "search": _warm_search,
+    "voice": _warm_voice,
+    "rag": _warm_rag,
+}
+
+
+class Warmer:
+    """Runs warm-up tasks in background threads and tracks their readiness."""
+
+    def __init__(self, tasks: Optional[Dict[str, Callable[[], bool]]] = None):
+        self.tasks = dict(tasks if tasks is not None else WARMUP_TASKS)
+        self._status = {name: {"state": COLD, "seconds": None, "error": None} for name in self.tasks}
+        self._threads = []
+        self._lock = threading.Lock()
+        self.started_at = None
+
+    def start(self, components: Optional[Iterable[str]] = None) -> bool:
+        """
+        Start warming components that are still cold (idempotent).
+
+        Args:
+            components: Component names to warm (default: all)
+
+        Returns:
+            True if any warm-up thread was started
+        """
+        started = False
+        with self._lock:
+            for name in components or self.tasks:
+                if name not in self.tasks or self._status[name]["state"] != COLD:
+                    continue
+                self._status[name]["state"] = WARMING
+                thread = threading.Thread(target=self._run, args=(name,), name=f"warmup-{name}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+                started = True
+            if started and self.started_at is None:
+                self.started_at = time.time()
+        return started
+
+    def _run(self, name: str):
+        """Run one task, recording its outcome."""
+        start = time.time()
+        try:
+            state = READY if self.tasks[name]() else SKIPPED
+            error = None
+        except Exception as e:
+            print(f"⚠️ Warm-up of {name} failed: {e}")
+            state, error = FAILED, str(e)
+        with self._lock:
+            self._status[name] = {"state": state, "seconds": time.time() - start, "error": error}
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until started tasks finish.
+
+        Returns:
+            True if nothing is still warming
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in list(self._threads):
+            thread.join(None if deadline is None else max(0.0, deadline - time.time()))
+        return not self.is_warming()
+
+    def state(self, name: str) -> str:
+        """State of one component (cold, warming, ready, skipped or failed)."""
+        with self._lock:
+            return self._status.get(name, {}).get("state", COLD)
+
+    def is_warming(self, name: Optional[str] = None) -> bool:
+        """Check whether a component (or any component) is still warming."""
+        with self._lock:
+            if name is not None:
+                return self._status.get(name, {}).get("state") == WARMING
+            return any(status["state"] == WARMING for status in self._status.values())
+
+    def get_status(self) -> Dict[str, Any]:
+        """Per-component state and duration, plus overall readiness."""
+        with self._lock:
+            components = {name: dict(status) for name, status in self._status.items()}
+        return {
+            "enabled": WARMUP_ON_START,
+            "started_at": self.started_at,
+            "warming": any(c["state"] == WARMING for c in components.values()),
+            "components": components,
+        }
+
+
+# Global warmer instance
+_warmer = None
+_warmer_lock = threading.Lock()
+
+def get_warmer() -> Warmer:
+    """Get or create global warmer instance."""
+    global _warmer
+    with _warmer_lock:
+        if _warmer is None:
+            _warmer = Warmer()
+    return _warmer
+
+def start_warmup(components: Optional[Iterable[str]] = None, force: bool = False) -> bool:
+    """
+    Start background warm-up if enabled (WARMUP_ON_START) or forced.
+
+    Safe to call on every Streamlit rerun; components only warm once per process.
+
+    Args:
+        components: Component names to warm (default: all)
+        force: Warm up even if WARMUP_ON_START is off
+
+    Returns:
+        True if any warm-up thread was started
+    """
+    if not (WARMUP_ON_START or force):
+        return False
+    return get_warmer().start(components)
+
+def get_warmup_state(name: str) -> str:
+    """State of one component: cold, warming, ready, skipped or failed."""
+    return get_warmer().state(name)
+
+def get_warmup_status() -> Dict[str, Any]:
+    """Warm-up status for all components."""
+    return get_warmer().get_status()
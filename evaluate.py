@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Offline batch evaluation for WellNavigator.
+Replays a JSONL file of questions through the full chat pipeline (redact, safety,
+RAG, search, compose, route, LLM) with bounded concurrency, writes one result
+line per question and prints throughput and latency percentiles.
+
+Input lines:
+    {"id": "q1", "query": "Can you diagnose my rash?", "expected_refusal": true}
+    ("message" is accepted instead of "query"; "id" defaults to the line number)
+
+Usage:
+    python evaluate.py questions.jsonl --output results.jsonl --concurrency 8
+    python evaluate.py questions.jsonl --mock            # no API calls
+    python evaluate.py questions.jsonl --rag --search --model gpt-4o
+
+Runs are resumable: questions whose id is already in the output file are skipped;
+errored ones are run again and replace their earlier line.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+from core import ChatPipeline, ChatSession, CollectingSink, redact_pi
+from core.pipeline import DEFAULT_SETTINGS, DEFAULT_STAGES, Turn
+from core.llm import count_message_tokens, count_tokens
+
+
+# Mock LLM configuration
+MOCK_TTFT = float(os.getenv("EVAL_MOCK_TTFT", "0.2"))  # Seconds to first token
+MOCK_TOKEN_DELAY = float(os.getenv("EVAL_MOCK_TOKEN_DELAY", "0.01"))  # Seconds per token
+MOCK_ANSWER_WORDS = 60
+
+
+def mock_generate(turn: Turn):
+    """
+    Stand-in for the generate stage: streams a canned answer with realistic
+    timing instead of calling the OpenAI API.
+    """
+    start_time = time.time()
+    model = turn.routing["model"]
+    time.sleep(MOCK_TTFT)
+
+    words = [f"[mock answer from {model}]"]
+    words += ["General", "health", "information", "about:"] + turn.user_input.split()
+    words = (words * (MOCK_ANSWER_WORDS // len(words) + 1))[:MOCK_ANSWER_WORDS]
+
+    response = ""
+    ttft = None
+    for word in words:
+        if turn.cancel_token is not None and turn.cancel_token.cancelled:
+            break
+        token = word + " "
+        response += token
+        if ttft is None:
+            ttft = time.time() - start_time
+        turn.sink.on_token(token, response)
+        time.sleep(MOCK_TOKEN_DELAY)
+
+    turn.sink.on_complete(response)
+    turn.response = response
+    turn.metadata = {
+        "tokens_in": count_message_tokens(turn.messages, model),
+        "tokens_out": count_tokens(response, model),
+        "cost": 0.0,
+        "latency": time.time() - start_time,
+        "model": model,
+        "usage_source": "mock",
+        "finish_reason": "stop",
+        "ttft": ttft,
+    }
+    turn.finished = True
+
+
+def _skip_stage(turn: Turn):
+    """No-op stage."""
+
+
+def build_pipeline(mock: bool = False, log_turns: bool = False) -> ChatPipeline:
+    """
+    Build the pipeline used for evaluation.
+
+    Args:
+        mock: Replace the LLM call with mock_generate
+        log_turns: Keep writing turns to logs/ (off by default so evaluation
+                   runs don't mix with real session logs)
+
+    Returns:
+        ChatPipeline
+    """
+    pipeline = ChatPipeline()
+    if mock:
+        pipeline = pipeline.replace_stage("generate", mock_generate)
+    if not log_turns:
+        pipeline = pipeline.replace_stage("log", _skip_stage)
+    return pipeline
+
+
+def load_queries(path: Path) -> List[Dict[str, Any]]:
+    """Read the input JSONL; each item gets an 'id' and a 'query'."""
+    queries = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            item["id"] = str(item.get("id", line_number))
+            item["query"] = item.get("query") or item.get("message", "")
+            queries.append(item)
+    return queries
+
+
+def load_completed(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Read results already in the output file, keyed by id (for resuming)."""
+    completed = {}
+    if not path.exists():
+        return completed
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # Partial line from an interrupted run
+            if not result.get("error"):
+                completed[result["id"]] = result
+    return completed
+
+
+def rewrite_completed(path: Path, completed: Dict[str, Dict[str, Any]]):
+    """
+    Rewrite the output file with one line per completed id before resuming.
+
+    Drops errored results (they are re-run) and any line an interrupted run
+    left half-written, so appended results start on a fresh line.
+    """
+    if not path.exists():
+        return
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "w") as f:
+        for result in completed.values():
+            f.write(json.dumps(result, default=str) + "\n")
+    os.replace(temp_path, path)
+
+
+def run_query(pipeline: ChatPipeline, item: Dict[str, Any], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run one question through the pipeline in a fresh session.
+
+    Returns:
+        Result dictionary written to the output file
+    """
+    session = ChatSession(settings={**settings, **item.get("settings", {})})
+    sink = CollectingSink()
+    start_time = time.time()
+
+    # Results never contain the raw question, only its redacted form
+    result = {"id": item["id"], "query": redact_pi(item["query"])}
+    try:
+        turn = pipeline.run(item["query"], session, sink)
+    except Exception as e:
+        result.update({"error": str(e), "total_time": time.time() - start_time})
+        return result
+
+    result.update({
+        "response": turn.response,
+        "refused": turn.refusal is not None,
+        "model": turn.metadata.get("model", turn.meta.get("model")),
+        "routing_rule": turn.meta.get("routing_rule"),
+        "tokens_in": turn.meta.get("token_in", 0),
+        "tokens_out": turn.meta.get("token_out", 0),
+        "cost": turn.meta.get("cost", 0.0),
+        "ttft": sink.ttft,
+        "total_time": time.time() - start_time,
+        "stage_timings": turn.timings,
+        "rag_docs_retrieved": turn.meta.get("rag_docs_retrieved", 0),
+        "search_results": turn.meta.get("search_results", 0),
+        "error": turn.meta.get("error") or turn.metadata.get("error"),
+    })
+    if "expected_refusal" in item:
+        result["expected_refusal"] = bool(item["expected_refusal"])
+        result["correct"] = result["refused"] == result["expected_refusal"]
+    return result
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[int(pct * (len(values) - 1))]
+
+
+def summarize(results: List[Dict[str, Any]], wall_time: float, run_count: int) -> Dict[str, Any]:
+    """
+    Aggregate throughput, latency and stage timings.
+
+    Args:
+        results: Result dictionaries (all of them, including resumed ones)
+        wall_time: Seconds spent by this run
+        run_count: Questions evaluated by this run (for throughput)
+
+    Returns:
+        Summary dictionary
+    """
+    ok = [r for r in results if not r.get("error")]
+    latencies = [r["total_time"] for r in ok]
+    ttfts = [r["ttft"] for r in ok if r.get("ttft") is not None]
+
+    stages: Dict[str, List[float]] = {name: [] for name, _ in DEFAULT_STAGES}
+    for r in ok:
+        for stage, seconds in r.get("stage_timings", {}).items():
+            stages.setdefault(stage, []).append(seconds)
+
+    labeled = [r for r in ok if "correct" in r]
+    return {
+        "queries": len(results),
+        "errors": len(results) - len(ok),
+        "refused": sum(1 for r in ok if r.get("refused")),
+        "wall_time": wall_time,
+        "throughput_qps": run_count / wall_time if wall_time > 0 else 0.0,
+        "latency": {p: percentile(latencies, q) for p, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))},
+        "ttft": {p: percentile(ttfts, q) for p, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))},
+        "stages": {
+            stage: {"p50": percentile(values, 0.50), "p95": percentile(values, 0.95)}
+            for stage, values in stages.items()
+            if values
+        },
+        "tokens_in": sum(r.get("tokens_in", 0) for r in ok),
+        "tokens_out": sum(r.get("tokens_out", 0) for r in ok),
+        "cost": sum(r.get("cost", 0.0) for r in ok),
+        "refusal_accuracy": (sum(r["correct"] for r in labeled) / len(labeled)) if labeled else None,
+    }
+
+
+def print_summary(summary: Dict[str, Any]):
+    """Print the summary in the same style as the other scripts."""
+    print("\n✅ Evaluation complete!")
+    print(f"📄 Queries: {summary['queries']} ({summary['errors']} errors, {summary['refused']} refused)")
+    print(f"⚡ Throughput: {summary['throughput_qps']:.2f} queries/s over {summary['wall_time']:.1f}s")
+    print(f"⏱️ Latency p50/p95/p99: {summary['latency']['p50']:.2f}s / "
+          f"{summary['latency']['p95']:.2f}s / {summary['latency']['p99']:.2f}s")
+    print(f"⏱️ TTFT p50/p95/p99: {summary['ttft']['p50']:.2f}s / "
+          f"{summary['ttft']['p95']:.2f}s / {summary['ttft']['p99']:.2f}s")
+    print(f"🪙 Tokens: {summary['tokens_in']:,} in / {summary['tokens_out']:,} out (${summary['cost']:.4f})")
+    if summary["refusal_accuracy"] is not None:
+        print(f"🛡️ Refusal accuracy: {summary['refusal_accuracy'] * 100:.1f}%")
+
+    print("\n📊 Stage timings (p50 / p95):")
+    for stage, values in summary["stages"].items():
+        print(f"  {stage}: {values['p50'] * 1000:.1f}ms / {values['p95'] * 1000:.1f}ms")
+
+
+def evaluate(
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 4,
+    mock: bool = False,
+    settings: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+    log_turns: bool = False
+) -> Dict[str, Any]:
+    """
+    Run a batch evaluation.
+
+    Args:
+        input_path: JSONL file of questions
+        output_path: JSONL file for results (appended to; existing ids are skipped)
+        concurrency: Questions in flight at once
+        mock: Use the mock LLM instead of the OpenAI API
+        settings: Session settings (model, temperature, rag_on, search_on, ...)
+        limit: Only evaluate the first N questions
+        log_turns: Also write turns to logs/
+
+    Returns:
+        Summary dictionary
+    """
+    queries = load_queries(input_path)[:limit]
+    completed = load_completed(output_path)
+    rewrite_completed(output_path, completed)
+    pending = [item for item in queries if item["id"] not in completed]
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    pipeline = build_pipeline(mock=mock, log_turns=log_turns)
+
+    print(f"🚀 Evaluating {len(pending)} of {len(queries)} queries "
+          f"({len(queries) - len(pending)} already done, concurrency {concurrency}"
+          f"{', mock LLM' if mock else ''})")
+
+    results = [completed[item["id"]] for item in queries if item["id"] in completed]
+    write_lock = threading.Lock()
+    start_time = time.time()
+
+    with open(output_path, "a") as out, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(run_query, pipeline, item, settings) for item in pending]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                result = future.result()
+                results.append(result)
+                with write_lock:
+                    out.write(json.dumps(result, default=str) + "\n")
+                    out.flush()
+                if result.get("error"):
+                    print(f"  ❌ {result['id']}: {result['error']}")
+                if done % 50 == 0 or done == len(futures):
+                    print(f"  {done}/{len(futures)} done")
+        except KeyboardInterrupt:
+            print("\n⚠️ Interrupted - finished results are saved; rerun to resume.")
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    summary = summarize(results, time.time() - start_time, len(pending))
+    print_summary(summary)
+    return summary
+
+
+def main():
+    """Parse arguments and run the evaluation."""
+    parser = argparse.ArgumentParser(description="Batch-evaluate the WellNavigator chat pipeline")
+    parser.add_argument("input", type=Path, help="JSONL file of questions")
+    parser.add_argument("--output", type=Path, help="Results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("--summary", type=Path, help="Also write the summary as JSON here")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions in flight at once")
+    parser.add_argument("--mock", action="store_true", help="Use a mock LLM instead of the OpenAI API")
+    parser.add_argument("--model", default=DEFAULT_SETTINGS["model"], help="Default model")
+    parser.add_argument("--no-route", action="store_true", help="Disable per-question model routing")
+    parser.add_argument("--rag", action="store_true", help="Use RAG retrieval")
+    parser.add_argument("--search", action="store_true", help="Use web search")
+    parser.add_argument("--limit", type=int, help="Only evaluate the first N questions")
+    parser.add_argument("--log-turns", action="store_true", help="Also write turns to logs/")
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        print(f"❌ Input file not found: {args.input}")
+        sys.exit(1)
+
+    output = args.output or args.input.with_suffix(".results.jsonl")
+    settings = {
+        "model": args.model,
+        "auto_route": not args.no_route,
+        "rag_on": args.rag,
+        "search_on": args.search,
+    }
+
+    try:
+        summary = evaluate(
+            args.input,
+            output,
+            concurrency=args.concurrency,
+            mock=args.mock,
+            settings=settings,
+            limit=args.limit,
+            log_turns=args.log_turns
+        )
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    print(f"\n💾 Results saved to: {output}")
+    if args.summary:
+        args.summary.write_text(json.dumps(summary, indent=2))
+        print(f"💾 Summary saved to: {args.summary}")
+
+
+if __name__ == "__main__":
+    main()
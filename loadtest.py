@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+"""
+Concurrent-session load test for WellNavigator.
+Simulates N chat sessions at once (think time between turns, RAG/search toggles,
+voice turns) against local mocks, steps N up, and reports throughput, turn
+latency and TTFT percentiles, CPU and RSS per process, and the knee of the curve.
+
+Targets:
+    pipeline   Drive core.ChatPipeline directly (default)
+    streamlit  Drive app.py through Streamlit's AppTest harness
+
+Usage:
+    python loadtest.py --sessions 1,2,4,8,16,32 --turns 5 --think-time 2
+    python loadtest.py --target streamlit --sessions 1,2,4 --rag-ratio 0.5 --voice-ratio 0.2
+    python loadtest.py --no-mock --sessions 1,2     # real APIs (costs money)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import resource
+import subprocess
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+# Knee detection: the knee is the last level before p95 latency exceeds
+# KNEE_LATENCY_FACTOR x the single-level baseline or throughput stops growing
+KNEE_LATENCY_FACTOR = 2.0
+KNEE_MIN_THROUGHPUT_GAIN = 0.10
+
+SAMPLE_QUERIES = [
+    "How can I prepare for my annual checkup?",
+    "What questions should I ask my doctor about high blood pressure?",
+    "What are common symptoms of type 2 diabetes?",
+    "How do I read my insurance explanation of benefits?",
+    "What does a cholesterol test measure?",
+    "How much sleep do adults need?",
+    "What should I bring to a specialist appointment?",
+    "How can I lower my sodium intake?",
+    "Can you diagnose my rash?",  # Refused: exercises the safety path
+    "What is the difference between an urgent care and an emergency room?",
+]
+
+VOICE_SAMPLE = b"RIFF" + b"\x00" * 2048  # Placeholder audio; the mock ignores content
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock(args) -> subprocess.Popen:
+    """
+    Start mock_openai.py in its own process and point the app's clients at it.
+
+    Runs out of process so the app's CPU and RSS are measured on their own.
+    """
+    port = _free_port()
+    command = [
+        sys.executable, str(Path(__file__).parent / "mock_openai.py"),
+        "--port", str(port),
+        "--ttft", str(args.mock_ttft),
+        "--tokens-per-sec", str(args.mock_tokens_per_sec),
+        "--output-tokens", str(args.mock_output_tokens),
+        "--error-rate", str(args.mock_error_rate),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{base}/v1/models", timeout=1)
+            break
+        except OSError:
+            time.sleep(0.1)
+    else:
+        process.kill()
+        print("❌ Mock server did not start")
+        sys.exit(1)
+
+    os.environ["OPENAI_BASE_URL"] = f"{base}/v1"
+    os.environ["OPENAI_API_KEY"] = "mock"
+    os.environ["GOOGLE_SEARCH_URL"] = f"{base}/customsearch/v1"
+    os.environ["GOOGLE_API_KEY"] = "mock"
+    os.environ["GOOGLE_CSE_ID"] = "mock"
+    print(f"🧪 Mock OpenAI/search server on {base} (pid {process.pid})")
+    return process
+
+
+# ---------------------------------------------------------------------------
+# Process stats
+# ---------------------------------------------------------------------------
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def _cpu_seconds(pid: Optional[int] = None) -> Optional[float]:
+    """User + system CPU seconds of this process or another one (Linux /proc)."""
+    if pid is None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+    try:
+        fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Current resident set size in MB (Linux /proc; peak RSS elsewhere)."""
+    try:
+        for line in Path(f"/proc/{pid or 'self'}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if pid is None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    return None
+
+
+class ProcessSampler:
+    """Tracks CPU (cores used) and peak RSS of a process over one level."""
+
+    def __init__(self, pid: Optional[int] = None, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, _rss_mb(self.pid) or 0.0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start_time = time.time()
+        self.start_cpu = _cpu_seconds(self.pid)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        end_cpu = _cpu_seconds(self.pid)
+        wall = time.time() - self.start_time
+        self.cpu_cores = (
+            (end_cpu - self.start_cpu) / wall
+            if end_cpu is not None and self.start_cpu is not None and wall > 0 else None
+        )
+
+
+# ---------------------------------------------------------------------------
+# Sessions
+# ---------------------------------------------------------------------------
+
+def _think(rng: random.Random, mean: float):
+    if mean > 0:
+        time.sleep(rng.expovariate(1.0 / mean))
+
+
+def run_pipeline_session(session_index: int, args, queries: List[str], results: List[Dict], lock: threading.Lock):
+    """One simulated user talking to the ChatPipeline."""
+    from core import ChatPipeline, ChatSession, CollectingSink, transcribe_audio_file
+    from core.pipeline import DEFAULT_SETTINGS
+
+    rng = random.Random(args.seed + session_index)
+    pipeline = ChatPipeline().replace_stage("log", lambda turn: None)
+    session = ChatSession(settings={
+        **DEFAULT_SETTINGS,
+        "rag_on": rng.random() < args.rag_ratio,
+        "search_on": rng.random() < args.search_ratio,
+    })
+
+    for turn_index in range(args.turns):
+        if turn_index:
+            _think(rng, args.think_time)
+
+        query = rng.choice(queries)
+        voice = rng.random() < args.voice_ratio
+        start_time = time.time()
+        record = {"session": session_index, "voice": voice, **{k: session.settings[k] for k in ("rag_on", "search_on")}}
+        try:
+            if voice:
+                transcript = transcribe_audio_file(VOICE_SAMPLE, "voice.wav")
+                record["voice_time"] = time.time() - start_time
+                query = transcript or query
+            session.settings["voice_on"] = voice
+
+            sink = CollectingSink()
+            sink.start_time = start_time
+            turn = pipeline.run(query, session, sink)
+            record.update({
+                "latency": time.time() - start_time,
+                "ttft": sink.ttft,
+                "refused": turn.refusal is not None,
+                "error": turn.metadata.get("error"),
+            })
+        except Exception as e:
+            record.update({"latency": time.time() - start_time, "error": str(e)})
+
+        with lock:
+            results.append(record)
+
+
+def run_streamlit_session(session_index: int, args, queries: List[str], results: List[Dict], lock: threading.Lock):
+    """One simulated user driving app.py through Streamlit's AppTest."""
+    from streamlit.testing.v1 import AppTest
+    from core import transcribe_audio_file
+
+    rng = random.Random(args.seed + session_index)
+    rag_on = rng.random() < args.rag_ratio
+    search_on = rng.random() < args.search_ratio
+    try:
+        app = AppTest.from_file(str(Path(__file__).parent / "app.py"), default_timeout=args.turn_timeout)
+        app.run()
+        for toggle in app.toggle:
+            if toggle.disabled:
+                continue  # Feature not available in this environment
+            if toggle.label.startswith("Use RAG"):
+                toggle.set_value(rag_on)
+            elif toggle.label.startswith("Use Google Search"):
+                toggle.set_value(search_on)
+        app.run()
+    except Exception as e:
+        with lock:
+            results.append({"session": session_index, "latency": 0.0, "error": f"App failed to start: {e}"})
+        return
+
+    for turn_index in range(args.turns):
+        if turn_index:
+            _think(rng, args.think_time)
+
+        query = rng.choice(queries)
+        voice = rng.random() < args.voice_ratio
+        start_time = time.time()
+        record = {"session": session_index, "voice": voice, "rag_on": rag_on, "search_on": search_on}
+        try:
+            if voice:
+                # The recorder widget can't be driven headlessly; transcribe
+                # directly and submit the transcript like the voice flow does
+                query = transcribe_audio_file(VOICE_SAMPLE, "voice.wav") or query
+                record["voice_time"] = time.time() - start_time
+            app.chat_input[0].set_value(query).run()
+            meta = app.session_state["messages"][-1].get("meta", {})
+            ttft = meta.get("ttft")
+            record.update({
+                "latency": time.time() - start_time,
+                # Approximate user-perceived TTFT: context stage + LLM TTFT
+                "ttft": ttft + meta.get("context_wall_time", 0.0) if ttft is not None else None,
+                "refused": meta.get("refused", False),
+                "error": app.exception[0].message if app.exception else None,
+            })
+        except Exception as e:
+            record.update({"latency": time.time() - start_time, "error": str(e)})
+
+        with lock:
+            results.append(record)
+
+
+# ---------------------------------------------------------------------------
+# Levels and reporting
+# ---------------------------------------------------------------------------
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0.0 for an empty list)."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[int(pct * (len(values) - 1))]
+
+
+def run_level(sessions: int, args, queries: List[str], mock_pid: Optional[int]) -> Dict[str, Any]:
+    """Run N concurrent sessions to completion and summarize the level."""
+    target = run_streamlit_session if args.target == "streamlit" else run_pipeline_session
+    results: List[Dict] = []
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=target, args=(i, args, queries, results, lock), daemon=True)
+        for i in range(sessions)
+    ]
+
+    with ProcessSampler() as app_stats, ProcessSampler(mock_pid) as mock_stats:
+        start_time = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.time() - start_time
+
+    ok = [r for r in results if not r.get("error")]
+    latencies = [r["latency"] for r in ok]
+    ttfts = [r["ttft"] for r in ok if r.get("ttft") is not None]
+    return {
+        "sessions": sessions,
+        "turns": len(results),
+        "errors": len(results) - len(ok),
+        "voice_turns": sum(1 for r in results if r.get("voice")),
+        "wall_time": wall_time,
+        "throughput": len(ok) / wall_time if wall_time > 0 else 0.0,
+        "latency": {p: percentile(latencies, q) for p, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))},
+        "ttft": {p: percentile(ttfts, q) for p, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))},
+        "app_cpu_cores": app_stats.cpu_cores,
+        "app_rss_mb": app_stats.peak_rss,
+        "mock_cpu_cores": mock_stats.cpu_cores if mock_pid else None,
+        "mock_rss_mb": mock_stats.peak_rss if mock_pid else None,
+    }
+
+
+def find_knee(levels: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Find the highest concurrency that still scales.
+
+    Returns:
+        Dictionary with the knee level's sessions and the reason the next level
+        was past it (None if every level scaled)
+    """
+    if not levels:
+        return {"sessions": None, "reason": None}
+
+    baseline_p95 = levels[0]["latency"]["p95"]
+    for previous, level in zip(levels, levels[1:]):
+        if baseline_p95 > 0 and level["latency"]["p95"] > KNEE_LATENCY_FACTOR * baseline_p95:
+            return {"sessions": previous["sessions"],
+                    "reason": f"p95 latency above {KNEE_LATENCY_FACTOR:g}x baseline at {level['sessions']} sessions"}
+        if level["throughput"] < previous["throughput"] * (1 + KNEE_MIN_THROUGHPUT_GAIN):
+            return {"sessions": previous["sessions"],
+                    "reason": f"throughput stopped growing at {level['sessions']} sessions"}
+        if level["errors"] > previous["errors"] and level["errors"] > 0.05 * level["turns"]:
+            return {"sessions": previous["sessions"],
+                    "reason": f"error rate above 5% at {level['sessions']} sessions"}
+    return {"sessions": levels[-1]["sessions"], "reason": None}
+
+
+def _fmt(value: Optional[float], spec: str) -> str:
+    return "-" if value is None else format(value, spec)
+
+
+def print_report(levels: List[Dict[str, Any]], knee: Dict[str, Any]):
+    """Print one row per level and the knee."""
+    print("\n📊 Results")
+    print(f"{'sessions':>8} {'turns':>6} {'err':>4} {'turns/s':>8} "
+          f"{'lat p50':>8} {'p95':>7} {'p99':>7} {'ttft p50':>9} {'p95':>7} {'p99':>7} "
+          f"{'app cpu':>8} {'app MB':>7} {'mock cpu':>9} {'mock MB':>8}")
+    for level in levels:
+        print(f"{level['sessions']:>8} {level['turns']:>6} {level['errors']:>4} {level['throughput']:>8.2f} "
+              f"{level['latency']['p50']:>8.2f} {level['latency']['p95']:>7.2f} {level['latency']['p99']:>7.2f} "
+              f"{level['ttft']['p50']:>9.2f} {level['ttft']['p95']:>7.2f} {level['ttft']['p99']:>7.2f} "
+              f"{_fmt(level['app_cpu_cores'], '.2f'):>8} {_fmt(level['app_rss_mb'], '.0f'):>7} "
+              f"{_fmt(level['mock_cpu_cores'], '.2f'):>9} {_fmt(level['mock_rss_mb'], '.0f'):>8}")
+
+    if knee["reason"]:
+        print(f"\n📈 Knee: {knee['sessions']} concurrent sessions ({knee['reason']})")
+    else:
+        print(f"\n📈 No knee found up to {knee['sessions']} sessions - try higher levels")
+
+
+def main():
+    """Parse arguments and run the load test."""
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for WellNavigator")
+    parser.add_argument("--target", choices=["pipeline", "streamlit"], default="pipeline")
+    parser.add_argument("--sessions", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--turns", type=int, default=5, help="Turns per session")
+    parser.add_argument("--think-time", type=float, default=2.0, help="Mean seconds between a user's turns")
+    parser.add_argument("--rag-ratio", type=float, default=0.5, help="Fraction of sessions with RAG on")
+    parser.add_argument("--search-ratio", type=float, default=0.3, help="Fraction of sessions with search on")
+    parser.add_argument("--voice-ratio", type=float, default=0.1, help="Fraction of turns sent by voice")
+    parser.add_argument("--queries", type=Path, help="JSONL of questions ('query' field); built-in set if omitted")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--turn-timeout", type=float, default=120.0, help="Streamlit AppTest timeout per run")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON here")
+    parser.add_argument("--no-mock", action="store_true", help="Use the real OpenAI/Google APIs")
+    parser.add_argument("--mock-ttft", type=float, default=0.3)
+    parser.add_argument("--mock-tokens-per-sec", type=float, default=50)
+    parser.add_argument("--mock-output-tokens", type=int, default=150)
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    levels_to_run = [int(n) for n in args.sessions.split(",") if n.strip()]
+    queries = SAMPLE_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [item.get("query") or item.get("message") for item in map(json.loads, filter(str.strip, f))]
+
+    mock = None if args.no_mock else start_mock(args)
+    try:
+        print(f"🚀 Load test: target={args.target}, levels={levels_to_run}, {args.turns} turns/session, "
+              f"think {args.think_time}s, rag {args.rag_ratio:.0%}, search {args.search_ratio:.0%}, "
+              f"voice {args.voice_ratio:.0%}")
+        levels = []
+        for sessions in levels_to_run:
+            level = run_level(sessions, args, queries, mock.pid if mock else None)
+            levels.append(level)
+            print(f"  {sessions} sessions: {level['throughput']:.2f} turns/s, "
+                  f"p95 {level['latency']['p95']:.2f}s, {level['errors']} errors")
+    finally:
+        if mock:
+            mock.terminate()
+
+    knee = find_knee(levels)
+    print_report(levels, knee)
+
+    if args.output:
+        args.output.write_text(json.dumps({"levels": levels, "knee": knee, "args": vars(args)}, indent=2, default=str))
+        print(f"💾 Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
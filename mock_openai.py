@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Local mock of the OpenAI API for load and latency testing.
+Implements streaming (and non-streaming) chat completions and audio
+transcriptions with configurable time-to-first-token, token rate, error rate
+and 429 rate limiting. Also serves a Google Custom Search stand-in so
+search-enabled turns can run offline. Standard library only.
+
+Usage:
+    python mock_openai.py --port 8080 --ttft 0.4 --tokens-per-sec 60 --error-rate 0.02 --rpm 600
+
+Point WellNavigator at it:
+    OPENAI_BASE_URL=http://localhost:8080/v1 OPENAI_API_KEY=mock streamlit run app.py
+
+    # Optional: mock web search too
+    GOOGLE_SEARCH_URL=http://localhost:8080/customsearch/v1 GOOGLE_API_KEY=mock GOOGLE_CSE_ID=mock
+
+Endpoints:
+    POST /v1/chat/completions
+    POST /v1/audio/transcriptions
+    GET  /v1/models
+    GET  /customsearch/v1   Google Custom Search format
+    GET  /mock/stats      Request counters
+    POST /mock/config     Change settings at runtime (JSON body with any MockConfig field)
+"""
+
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, List, Optional
+
+
+# Defaults (overridable by environment or command line)
+MOCK_TTFT = float(os.getenv("MOCK_TTFT", "0.3"))
+MOCK_TTFT_JITTER = float(os.getenv("MOCK_TTFT_JITTER", "0.1"))
+MOCK_TOKENS_PER_SEC = float(os.getenv("MOCK_TOKENS_PER_SEC", "50"))
+MOCK_OUTPUT_TOKENS = int(os.getenv("MOCK_OUTPUT_TOKENS", "200"))
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0.0"))
+MOCK_RATE_LIMIT_RATE = float(os.getenv("MOCK_RATE_LIMIT_RATE", "0.0"))
+MOCK_RPM = int(os.getenv("MOCK_RPM", "0"))  # 0 = no limit
+MOCK_RETRY_AFTER = float(os.getenv("MOCK_RETRY_AFTER", "1"))
+MOCK_TRANSCRIBE_LATENCY = float(os.getenv("MOCK_TRANSCRIBE_LATENCY", "0.5"))
+MOCK_SEARCH_LATENCY = float(os.getenv("MOCK_SEARCH_LATENCY", "0.3"))
+MOCK_SEARCH_ERROR_RATE = float(os.getenv("MOCK_SEARCH_ERROR_RATE", "0.0"))
+
+MOCK_WORDS = (
+    "This is general health information from the mock server . Staying hydrated , "
+    "sleeping well and regular activity support overall health . Please talk to your "
+    "healthcare provider about your specific situation ."
+).split()
+
+
+class MockConfig:
+    """Runtime settings of the mock server."""
+
+    def __init__(
+        self,
+        ttft: float = MOCK_TTFT,
+        ttft_jitter: float = MOCK_TTFT_JITTER,
+        tokens_per_sec: float = MOCK_TOKENS_PER_SEC,
+        output_tokens: int = MOCK_OUTPUT_TOKENS,
+        error_rate: float = MOCK_ERROR_RATE,
+        rate_limit_rate: float = MOCK_RATE_LIMIT_RATE,
+        rpm: int = MOCK_RPM,
+        retry_after: float = MOCK_RETRY_AFTER,
+        transcribe_latency: float = MOCK_TRANSCRIBE_LATENCY,
+        search_latency: float = MOCK_SEARCH_LATENCY,
+        search_error_rate: float = MOCK_SEARCH_ERROR_RATE
+    ):
+        self.ttft = ttft
+        self.ttft_jitter = ttft_jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.output_tokens = output_tokens
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.retry_after = retry_after
+        self.transcribe_latency = transcribe_latency
+        self.search_latency = search_latency
+        self.search_error_rate = search_error_rate
+
+    def update(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            if hasattr(self, key):
+                setattr(self, key, type(getattr(self, key))(value))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+
+class MockState:
+    """Request counters and the sliding window used for the RPM limit."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.active_streams = 0
+        self._window: deque = deque()
+        self._lock = threading.Lock()
+
+    def count(self, key: str, delta: int = 1):
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + delta
+
+    def stream_started(self, delta: int):
+        with self._lock:
+            self.active_streams += delta
+
+    def over_rpm(self, rpm: int) -> bool:
+        """Record a request and check it against the requests-per-minute limit."""
+        if rpm <= 0:
+            return False
+        now = time.time()
+        with self._lock:
+            while self._window and now - self._window[0] > 60:
+                self._window.popleft()
+            if len(self._window) >= rpm:
+                return True
+            self._window.append(now)
+            return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"counts": dict(self.counts), "active_streams": self.active_streams}
+
+
+def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Rough prompt size (~4 characters per token plus per-message overhead)."""
+    return sum(len(str(message.get("content", ""))) // 4 + 3 for message in messages) + 3
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler; config and state live on the server object."""
+
+    protocol_version = "HTTP/1.1"  # Keep-alive, so clients can pool connections
+
+    def log_message(self, format, *args):
+        pass  # Quiet; use /mock/stats
+
+    @property
+    def config(self) -> MockConfig:
+        return self.server.config
+
+    @property
+    def state(self) -> MockState:
+        return self.server.state
+
+    # -- helpers -----------------------------------------------------------
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None):
+        self.state.count(f"status_{status}")
+        self._send_json(status, {"error": {"message": message, "type": error_type, "code": None}}, headers)
+
+    def _write_chunk(self, data: str):
+        encoded = data.encode()
+        self.wfile.write(f"{len(encoded):x}\r\n".encode() + encoded + b"\r\n")
+        self.wfile.flush()
+
+    def _injected_failure(self) -> bool:
+        """Send a 429 or 500 if the RPM limit or an injection rate says so."""
+        if self.state.over_rpm(self.config.rpm) or random.random() < self.config.rate_limit_rate:
+            self._send_error(
+                429, "Rate limit reached (mock)", "rate_limit_exceeded",
+                headers={"Retry-After": str(self.config.retry_after)}
+            )
+            return True
+        if random.random() < self.config.error_rate:
+            self._send_error(500, "Internal server error (mock)", "server_error")
+            return True
+        return False
+
+    # -- routes ------------------------------------------------------------
+
+    def do_GET(self):
+        if self.path.startswith("/customsearch/v1"):
+            self._custom_search()
+        elif self.path == "/v1/models":
+            models = ["gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-3.5-turbo", "whisper-1"]
+            self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in models]})
+        elif self.path == "/mock/stats":
+            self._send_json(200, {**self.state.snapshot(), "config": self.config.to_dict()})
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def do_POST(self):
+        body = self._read_body()
+        if self.path == "/v1/chat/completions":
+            self._chat_completions(body)
+        elif self.path == "/v1/audio/transcriptions":
+            self._transcriptions()
+        elif self.path == "/mock/config":
+            self.config.update(json.loads(body or b"{}"))
+            self._send_json(200, self.config.to_dict())
+        else:
+            self._send_error(404, f"Unknown path {self.path}", "invalid_request_error")
+
+    def _chat_completions(self, body: bytes):
+        self.state.count("chat_requests")
+        try:
+            request = json.loads(body)
+        except ValueError:
+            self._send_error(400, "Request body must be JSON", "invalid_request_error")
+            return
+
+        if self._injected_failure():
+            return
+
+        config = self.config
+        model = request.get("model", "gpt-4o-mini")
+        prompt_tokens = _estimate_tokens(request.get("messages", []))
+        max_tokens = request.get("max_tokens") or request.get("max_completion_tokens")
+        n_tokens = config.output_tokens
+        finish_reason = "stop"
+        if max_tokens is not None and max_tokens < n_tokens:
+            n_tokens, finish_reason = max_tokens, "length"
+        words = [MOCK_WORDS[i % len(MOCK_WORDS)] for i in range(n_tokens)]
+
+        time.sleep(max(0.0, config.ttft + random.uniform(-config.ttft_jitter, config.ttft_jitter)))
+        token_delay = 1.0 / config.tokens_per_sec if config.tokens_per_sec > 0 else 0.0
+
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": n_tokens,
+            "total_tokens": prompt_tokens + n_tokens,
+        }
+
+        if not request.get("stream"):
+            time.sleep(token_delay * n_tokens)
+            self.state.count("status_200")
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": usage,
+            })
+            return
+
+        def chunk(delta: Dict[str, Any], reason: Optional[str] = None) -> Dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+            }
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        self.state.stream_started(1)
+        try:
+            self._write_chunk(f"data: {json.dumps(chunk({'role': 'assistant', 'content': ''}))}\n\n")
+            for i, word in enumerate(words):
+                content = word if i == 0 else " " + word
+                self._write_chunk(f"data: {json.dumps(chunk({'content': content}))}\n\n")
+                time.sleep(token_delay)
+            self._write_chunk(f"data: {json.dumps(chunk({}, finish_reason))}\n\n")
+            if request.get("stream_options", {}).get("include_usage"):
+                final = {**chunk({}), "choices": [], "usage": usage}
+                self._write_chunk(f"data: {json.dumps(final)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            self.state.count("status_200")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client closed the stream (cancelled or hedged request lost)
+            self.state.count("client_disconnects")
+            self.close_connection = True
+        finally:
+            self.state.stream_started(-1)
+
+    def _transcriptions(self):
+        self.state.count("transcription_requests")
+        if self._injected_failure():
+            return
+        time.sleep(self.config.transcribe_latency)
+        self.state.count("status_200")
+        self._send_json(200, {"text": "What are the common symptoms of high blood pressure?"})
+
+
+    def _custom_search(self):
+        self.state.count("search_requests")
+        query = parse_qs(urlparse(self.path).query)
+        q = query.get("q", [""])[0]
+        num = int(query.get("num", ["3"])[0])
+        time.sleep(self.config.search_latency)
+        if random.random() < self.config.search_error_rate:
+            self.state.count("search_errors")
+            self._send_json(503, {"error": {"code": 503, "message": "Backend Error (mock)"}})
+            return
+        items = [
+            {
+                "title": f"Mock health result {i + 1}",
+                "snippet": f"General health information about {q} from a trusted source.",
+                "link": f"https://medlineplus.gov/mock/{i + 1}",
+            }
+            for i in range(num)
+        ]
+        self.state.count("status_200")
+        self._send_json(200, {"items": items})
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server carrying the mock config and counters."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, config: Optional[MockConfig] = None):
+        super().__init__(address, MockOpenAIHandler)
+        self.config = config or MockConfig()
+        self.state = MockState()
+
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, config: Optional[MockConfig] = None) -> MockOpenAIServer:
+    """
+    Start the mock server on a background thread (for scripts and load tests).
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 = pick a free port)
+        config: Mock settings (defaults from environment)
+
+    Returns:
+        Running server; its base URL is f"http://{host}:{server.server_port}/v1"
+    """
+    server = MockOpenAIServer((host, port), config)
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server
+
+
+def main():
+    """Run the mock server in the foreground."""
+    parser = argparse.ArgumentParser(description="Mock OpenAI API for load and latency testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("MOCK_PORT", "8080")))
+    parser.add_argument("--ttft", type=float, default=MOCK_TTFT, help="Seconds to first token")
+    parser.add_argument("--ttft-jitter", type=float, default=MOCK_TTFT_JITTER, help="± seconds of TTFT jitter")
+    parser.add_argument("--tokens-per-sec", type=float, default=MOCK_TOKENS_PER_SEC, help="Streaming token rate")
+    parser.add_argument("--output-tokens", type=int, default=MOCK_OUTPUT_TOKENS, help="Tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=MOCK_ERROR_RATE, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=MOCK_RATE_LIMIT_RATE, help="Fraction of requests answered with 429")
+    parser.add_argument("--rpm", type=int, default=MOCK_RPM, help="Requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=MOCK_RETRY_AFTER, help="Retry-After seconds on 429")
+    parser.add_argument("--transcribe-latency", type=float, default=MOCK_TRANSCRIBE_LATENCY, help="Seconds per transcription")
+    parser.add_argument("--search-latency", type=float, default=MOCK_SEARCH_LATENCY, help="Seconds per web search")
+    parser.add_argument("--search-error-rate", type=float, default=MOCK_SEARCH_ERROR_RATE, help="Fraction of searches answered with 503")
+    args = parser.parse_args()
+
+    config = MockConfig(
+        ttft=args.ttft,
+        ttft_jitter=args.ttft_jitter,
+        tokens_per_sec=args.tokens_per_sec,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        rpm=args.rpm,
+        retry_after=args.retry_after,
+        transcribe_latency=args.transcribe_latency,
+        search_latency=args.search_latency,
+        search_error_rate=args.search_error_rate
+    )
+    server = MockOpenAIServer((args.host, args.port), config)
+    print(f"🚀 Mock OpenAI API on http://{args.host}:{args.port}/v1")
+    print(f"⚙️ {json.dumps(config.to_dict())}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopped")
+        print(json.dumps(server.state.snapshot(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+Headless HTTP/SSE chat service for WellNavigator.
+Serves the same chat pipeline as the Streamlit app (redact, safety, RAG, search,
+compose, route, stream) over Server-Sent Events, so it can run behind a load
+balancer with several workers.
+
+Run:
+    uvicorn server:app --host 0.0.0.0 --port 8000 --workers 4
+    python server.py
+
+Endpoints:
+    POST   /v1/chat                  Stream one chat turn as SSE
+    DELETE /v1/sessions/{session_id} Drop a conversation
+    GET    /healthz                  Readiness (503 while draining)
+    GET    /metrics                  Per-process request metrics
+
+POST /v1/chat takes {"message", "session_id"?, "settings"?}; settings may set
+model, temperature, max_tokens, auto_route, search_on and rag_on. Turns on one
+session run one at a time: a new turn cancels the previous one and starts
+once it has finished. On SIGTERM the service drains first (503 from /healthz
+and for new turns) for up to SERVER_SHUTDOWN_GRACE seconds.
+"""
+
+import os
+import json
+import time
+import uuid
+import signal
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional
+
+from dotenv import load_dotenv
+
+try:
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+except ImportError:
+    print("❌ Missing dependencies. Install with: pip install starlette uvicorn")
+    exit(1)
+
+# Load environment variables
+load_dotenv()
+
+from core import (
+    is_rag_available,
+    is_search_available,
+    get_admission_metrics,
+    get_chat_pipeline,
+    ChatSession,
+    TokenSink,
+    start_warmup,
+    get_warmup_status
+)
+from core.llm import CancellationToken, MODEL_PRICING
+from core.observe import MIN_ANSWER_TOKENS, MAX_OUTPUT_TOKENS_PER_TURN
+from core.warmup import get_warmer
+from core.output_guard import get_output_guard_metrics
+from core.safety import get_safety_cache_metrics
+from core.search import get_search_http_metrics, get_search_cache_stats, get_search_deadline_metrics
+from core.semantic_safety import get_semantic_safety_metrics
+
+
+# Configuration
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_MAX_CONCURRENT_TURNS = int(os.getenv("SERVER_MAX_CONCURRENT_TURNS", "64"))
+SERVER_SESSION_TTL = float(os.getenv("SERVER_SESSION_TTL", "3600"))  # Idle seconds
+SERVER_MAX_SESSIONS = int(os.getenv("SERVER_MAX_SESSIONS", "10000"))
+SERVER_SHUTDOWN_GRACE = float(os.getenv("SERVER_SHUTDOWN_GRACE", "20"))
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# Settings a client may change per request
+CLIENT_SETTINGS = ("model", "temperature", "auto_route", "search_on", "rag_on", "max_tokens")
+
+# Turns run in worker threads: the pipeline, admission control and hedging are
+# thread-based and the OpenAI stream is blocking. The HTTP side stays async.
+_executor = ThreadPoolExecutor(max_workers=SERVER_MAX_CONCURRENT_TURNS, thread_name_prefix="turn")
+
+
+class SessionStore:
+    """In-memory conversations with idle expiry and an LRU size cap."""
+
+    def __init__(self, ttl: float = SERVER_SESSION_TTL, max_sessions: int = SERVER_MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> ChatSession:
+        """Get or create a session and mark it as recently used."""
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                entry = {"session": ChatSession(), "token": None, "lock": threading.Lock()}
+            entry["last_used"] = now
+            self._sessions[session_id] = entry
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return entry["session"]
+
+    def start_turn(self, session_id: str, token: CancellationToken) -> threading.Lock:
+        """
+        Register a turn's token, stopping the session's previous generation.
+
+        Returns:
+            The session's turn lock; hold it while running the turn so the
+            cancelled turn records its partial reply before the next one starts
+        """
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return threading.Lock()
+            previous, entry["token"] = entry["token"], token
+        if previous is not None:
+            previous.cancel("new_action")
+        return entry["lock"]
+
+    def end_turn(self, session_id: str, token: CancellationToken):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None and entry["token"] is token:
+                entry["token"] = None
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        if entry["token"] is not None:
+            entry["token"].cancel("new_action")
+        return True
+
+    def _expire(self, now: float):
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry["last_used"] < self.ttl or entry["token"] is not None:
+                break
+            del self._sessions[session_id]
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+class ServerMetrics:
+    """Per-process request counters and latency percentiles."""
+
+    def __init__(self, window: int = 1000):
+        self.started_at = time.time()
+        self.requests = 0
+        self.completed = 0
+        self.errors = 0
+        self.refused = 0
+        self.cancelled = 0
+        self.disconnected = 0
+        self.rejected = 0
+        self.active = 0
+        self._latency = deque(maxlen=window)
+        self._ttft = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self.requests += 1
+            self.active += 1
+
+    def finish(self, latency: float, ttft: Optional[float], meta: Dict[str, Any], status: str = "completed"):
+        """Record a finished request; status is 'completed', 'error' or 'disconnected'."""
+        with self._lock:
+            self.active -= 1
+            if status == "error":
+                self.errors += 1
+                return
+            if status == "disconnected":
+                self.disconnected += 1
+                return
+            self.completed += 1
+            self.refused += bool(meta.get("refused"))
+            self.cancelled += bool(meta.get("cancelled"))
+            self._latency.append(latency)
+            if ttft is not None:
+                self._ttft.append(ttft)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    @staticmethod
+    def _percentile(samples: List[float], pct: float) -> float:
+        if not samples:
+            return 0.0
+        samples = sorted(samples)
+        return samples[int(pct * (len(samples) - 1))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            latency = list(self._latency)
+            ttft = list(self._ttft)
+            counters = {
+                "requests": self.requests,
+                "completed": self.completed,
+                "errors": self.errors,
+                "refused": self.refused,
+                "cancelled": self.cancelled,
+                "disconnected": self.disconnected,
+                "rejected": self.rejected,
+                "active": self.active,
+            }
+        return {
+            **counters,
+            "uptime": time.time() - self.started_at,
+            "latency_p50": self._percentile(latency, 0.50),
+            "latency_p95": self._percentile(latency, 0.95),
+            "ttft_p50": self._percentile(ttft, 0.50),
+            "ttft_p95": self._percentile(ttft, 0.95),
+        }
+
+
+class AsyncQueueSink(TokenSink):
+    """Forwards pipeline events from the worker thread to an asyncio queue."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: "asyncio.Queue"):
+        self.loop = loop
+        self.queue = queue
+        self.start_time = time.time()
+        self.ttft: Optional[float] = None
+
+    def _emit(self, event: str, data: Dict[str, Any]):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+    def on_user_message(self, text: str):
+        self._emit("user_message", {"content": text})
+
+    def on_queued(self, depth: int, estimated_wait: float):
+        self._emit("queued", {"depth": depth, "estimated_wait": estimated_wait})
+
+    def on_token(self, token: str, response: str):
+        if self.ttft is None:
+            self.ttft = time.time() - self.start_time
+        self._emit("token", {"content": token})
+
+    def on_complete(self, response: str):
+        self._emit("complete", {"content": response})
+
+    def on_notice(self, level: str, message: str):
+        self._emit("notice", {"level": level, "message": message})
+
+    def on_citations(self, citations: List[Dict]):
+        self._emit("citations", {"citations": citations})
+
+
+_sessions = SessionStore()
+_metrics = ServerMetrics()
+_active_tokens: Dict[str, CancellationToken] = {}
+_draining = False
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _validate_settings(settings: Any) -> Optional[str]:
+    """Error message for client settings the pipeline must not run with, or None."""
+    if not isinstance(settings, dict):
+        return "'settings' must be an object"
+    if "model" in settings and settings["model"] not in MODEL_PRICING:
+        return f"'model' must be one of: {', '.join(MODEL_PRICING)}"
+    temperature = settings.get("temperature", 0.0)
+    if isinstance(temperature, bool) or not isinstance(temperature, (int, float)) or not 0.0 <= temperature <= 2.0:
+        return "'temperature' must be a number between 0 and 2"
+    max_tokens = settings.get("max_tokens", MIN_ANSWER_TOKENS)
+    if isinstance(max_tokens, bool) or not isinstance(max_tokens, int) or \
+            not MIN_ANSWER_TOKENS <= max_tokens <= MAX_OUTPUT_TOKENS_PER_TURN:
+        return f"'max_tokens' must be an integer between {MIN_ANSWER_TOKENS} and {MAX_OUTPUT_TOKENS_PER_TURN}"
+    for key in ("auto_route", "search_on", "rag_on"):
+        if key in settings and not isinstance(settings[key], bool):
+            return f"'{key}' must be true or false"
+    return None
+
+
+def _run_turn(turn_lock: threading.Lock, message: str, session: ChatSession, settings: Dict[str, Any],
+              sink: AsyncQueueSink, token: CancellationToken):
+    """Run a turn once the session's previous (now cancelled) turn has finished."""
+    with turn_lock:
+        for key in CLIENT_SETTINGS:
+            if key in settings:
+                session.settings[key] = settings[key]
+        return get_chat_pipeline().run(message, session, sink, token)
+
+
+async def _wait_for_turns(timeout: float):
+    """Wait up to timeout seconds for in-flight turns to finish."""
+    deadline = time.time() + timeout
+    while _active_tokens and time.time() < deadline:
+        await asyncio.sleep(0.1)
+
+
+def _drain_on_signal(loop: asyncio.AbstractEventLoop):
+    """
+    Start draining when SIGINT/SIGTERM arrives, before uvicorn stops accepting.
+
+    uvicorn captures these signals while serving. Its handler is wrapped so
+    /healthz returns 503 and new turns are rejected while in-flight turns
+    finish (up to SERVER_SHUTDOWN_GRACE); the signal is then handed on. A
+    second signal is handed on at once.
+    """
+    forwarded = set()
+
+    def forward(previous, signum):
+        if signum not in forwarded:
+            forwarded.add(signum)
+            previous(signum, None)
+
+    async def drain_then_forward(previous, signum):
+        await _wait_for_turns(SERVER_SHUTDOWN_GRACE)
+        forward(previous, signum)
+
+    def wrap(previous):
+        def handle(signum, frame):
+            global _draining
+            if _draining:
+                forwarded.discard(signum)
+                forward(previous, signum)
+                return
+            _draining = True
+            loop.call_soon_threadsafe(loop.create_task, drain_then_forward(previous, signum))
+        return handle
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous = signal.getsignal(sig)
+        if not callable(previous):
+            continue  # Not captured by uvicorn; lifespan shutdown still drains
+        try:
+            signal.signal(sig, wrap(previous))
+        except ValueError:
+            return  # Not the main thread
+
+
+def _warm_shared_resources():
+    """Load process-wide resources once so the first turns don't pay for them."""
+    # Always on for the server: it shouldn't accept turns until it is warm
+    start_warmup(force=True)
+    get_warmer().wait()
+
+
+async def chat(request: Request):
+    """Stream one chat turn as Server-Sent Events."""
+    if _draining:
+        _metrics.reject()
+        return JSONResponse({"error": "Server is shutting down"}, status_code=503)
+
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Request body must be JSON"}, status_code=400)
+    if not isinstance(body, dict):
+        return JSONResponse({"error": "Request body must be a JSON object"}, status_code=400)
+
+    message = body.get("message")
+    if not isinstance(message, str) or not message.strip():
+        return JSONResponse({"error": "'message' is required"}, status_code=400)
+
+    settings = body.get("settings", {})
+    error = _validate_settings(settings)
+    if error:
+        return JSONResponse({"error": error}, status_code=400)
+
+    session_id = body.get("session_id")
+    if session_id is not None and not isinstance(session_id, str):
+        return JSONResponse({"error": "'session_id' must be a string"}, status_code=400)
+    session_id = session_id or uuid.uuid4().hex
+    request_id = uuid.uuid4().hex
+    session = _sessions.get(session_id)
+
+    loop = asyncio.get_running_loop()
+    queue: "asyncio.Queue" = asyncio.Queue()
+    sink = AsyncQueueSink(loop, queue)
+    token = CancellationToken()
+    turn_lock = _sessions.start_turn(session_id, token)
+    _active_tokens[request_id] = token
+    _metrics.start()
+
+    future = loop.run_in_executor(_executor, _run_turn, turn_lock, message, session, settings, sink, token)
+
+    async def events():
+        start_time = time.time()
+        status = None
+        try:
+            yield _sse("session", {"session_id": session_id, "request_id": request_id})
+            while True:
+                getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, future}, timeout=SSE_KEEPALIVE_SECONDS, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter in done:
+                    event, data = getter.result()
+                    yield _sse(event, data)
+                    continue
+                getter.cancel()
+                if future in done:
+                    break
+                yield ": keep-alive\n\n"
+
+            # Flush events emitted right before the turn finished
+            while not queue.empty():
+                event, data = queue.get_nowait()
+                yield _sse(event, data)
+
+            turn = future.result()
+            latency = time.time() - start_time
+            status = "completed"
+            _metrics.finish(latency, sink.ttft, turn.meta)
+            yield _sse("done", {
+                "request_id": request_id,
+                "session_id": session_id,
+                "response": turn.response,
+                "meta": turn.meta,
+                "request": {
+                    "total_time": latency,
+                    "ttft": sink.ttft,
+                    "stage_timings": turn.timings,
+                },
+            })
+        except Exception as e:
+            status = "error"
+            _metrics.finish(time.time() - start_time, None, {}, status=status)
+            yield _sse("error", {"request_id": request_id, "message": str(e)})
+        finally:
+            if status is None:
+                # Client went away mid-turn: stop the generation
+                token.cancel("client_disconnected")
+                _metrics.finish(time.time() - start_time, sink.ttft, {}, status="disconnected")
+            _active_tokens.pop(request_id, None)
+            _sessions.end_turn(session_id, token)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Request-ID": request_id},
+    )
+
+
+async def delete_session(request: Request):
+    """Drop a conversation (the API equivalent of Clear Chat)."""
+    if _sessions.delete(request.path_params["session_id"]):
+        return JSONResponse({"deleted": True})
+    return JSONResponse({"deleted": False}, status_code=404)
+
+
+async def healthz(request: Request):
+    """Readiness for the load balancer."""
+    if _draining:
+        return JSONResponse({"status": "draining"}, status_code=503)
+    return JSONResponse({
+        "status": "ok",
+        "rag_available": is_rag_available(),
+        "search_available": is_search_available(),
+        "warmup": {name: c["state"] for name, c in get_warmup_status()["components"].items()},
+    })
+
+
+async def metrics(request: Request):
+    """Per-process request, session and rate-limit queue metrics."""
+    return JSONResponse({
+        "requests": _metrics.snapshot(),
+        "sessions": len(_sessions),
+        "admission": get_admission_metrics(),
+        "output_guard": get_output_guard_metrics(),
+        "semantic_safety": get_semantic_safety_metrics(),
+        "safety_cache": get_safety_cache_metrics(),
+        "search": get_search_http_metrics(),
+        "search_cache": get_search_cache_stats(),
+        "search_deadline": get_search_deadline_metrics(),
+    })
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Warm shared resources on startup; drain in-flight turns on shutdown."""
+    global _draining
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_executor, _warm_shared_resources)
+    _drain_on_signal(loop)
+    yield
+
+    # Already drained if a signal started the shutdown
+    _draining = True
+    await _wait_for_turns(SERVER_SHUTDOWN_GRACE)
+    for token in list(_active_tokens.values()):
+        token.cancel("shutdown")
+    _executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route("/v1/chat", chat, methods=["POST"]),
+        Route("/v1/sessions/{session_id}", delete_session, methods=["DELETE"]),
+        Route("/healthz", healthz, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
+
+
+def main():
+    """Run the service with uvicorn."""
+    print(f"🚀 WellNavigator chat service on http://{SERVER_HOST}:{SERVER_PORT}")
+    uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT, timeout_graceful_shutdown=int(SERVER_SHUTDOWN_GRACE))
+
+
+if __name__ == "__main__":
+    main()